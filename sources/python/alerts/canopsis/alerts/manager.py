@@ -23,7 +23,6 @@ from canopsis.configuration.configurable.decorator import conf_paths
 from canopsis.configuration.configurable.decorator import add_category
 from canopsis.configuration.model import Parameter
 
-from canopsis.timeserie.timewindow import get_offset_timewindow
 from canopsis.common.utils import ensure_iterable
 from canopsis.task.core import get_task
 
@@ -136,6 +135,68 @@ class Alerts(MiddlewareRegistry):
 
         self._extra_fields = value
 
+    @property
+    def current_alarms(self):
+        """
+        Current (unresolved) alarm documents by alarm id.
+
+        Loaded once from the alarm storage, then kept up to date by
+        ``make_alarm()`` and ``update_current_alarm()``. Therefore, this
+        manager is expected to be the only writer of unresolved alarms.
+        """
+
+        if self._current_alarms is None:
+            storage = self[Alerts.ALARM_STORAGE]
+
+            current_alarms = {}
+
+            alarms = storage.find(_filter={'resolved': None})
+
+            for alarm_id in alarms:
+                # keep the most recent alarm
+                alarm = max(
+                    alarms[alarm_id], key=lambda a: a[storage.TIMESTAMP]
+                )
+                alarm[storage.DATA_ID] = alarm_id
+                current_alarms[alarm_id] = alarm
+
+            self._current_alarms = current_alarms
+
+        return self._current_alarms
+
+    def _set_current_alarm(self, alarm_id, alarm_ts, value):
+        """
+        Update the current alarm map if already loaded.
+
+        :param alarm_id: Alarm entity ID
+        :type alarm_id: str
+
+        :param alarm_ts: Alarm timestamp
+        :type alarm_ts: int
+
+        :param value: Alarm value
+        :type value: dict
+        """
+
+        current_alarms = self._current_alarms
+
+        if current_alarms is not None:
+            storage = self[Alerts.ALARM_STORAGE]
+
+            if value['resolved'] is None:
+                current_alarms[alarm_id] = {
+                    storage.DATA_ID: alarm_id,
+                    storage.TIMESTAMP: alarm_ts,
+                    storage.VALUE: value
+                }
+
+            else:
+                current_alarm = current_alarms.get(alarm_id)
+
+                if current_alarm is not None \
+                        and current_alarm[storage.TIMESTAMP] == alarm_ts:
+                    del current_alarms[alarm_id]
+
     def __init__(
         self,
         extra_fields=None,
@@ -146,6 +207,8 @@ class Alerts(MiddlewareRegistry):
     ):
         super(Alerts, self).__init__(*args, **kwargs)
 
+        self._current_alarms = None
+
         if extra_fields is not None:
             self.extra_fields = extra_fields
 
@@ -222,25 +285,11 @@ class Alerts(MiddlewareRegistry):
         :param alarm_id: Alarm entity ID
         :type alarm_id: str
 
-        :returns: Alarm as dict if found, else None
+        :returns: Alarm as dict if found, else None. Changes of its value
+                  must be saved with ``update_current_alarm()``.
         """
 
-        storage = self[Alerts.ALARM_STORAGE]
-
-        result = storage.get(
-            alarm_id,
-            timewindow=get_offset_timewindow(),
-            _filter={
-                'resolved': None
-            },
-            limit=1
-        )
-
-        if result is not None:
-            result = result[0]
-            result[storage.DATA_ID] = alarm_id
-
-        return result
+        return self.current_alarms.get(alarm_id)
 
     def update_current_alarm(self, alarm, new_value, tags=None):
         """
@@ -266,7 +315,9 @@ class Alerts(MiddlewareRegistry):
                 if tag not in new_value['tags']:
                     new_value['tags'].append(tag)
 
-        storage.put(alarm_id, new_value, alarm_ts)
+        storage.update(alarm_id, new_value, alarm_ts)
+
+        self._set_current_alarm(alarm_id, alarm_ts, new_value)
 
     def get_events(self, alarm):
         """
@@ -538,13 +589,18 @@ class Alerts(MiddlewareRegistry):
 
             self[Alerts.ALARM_STORAGE].put(alarm_id, value, event['timestamp'])
 
+            self._set_current_alarm(alarm_id, event['timestamp'], value)
+
     def resolve_alarms(self):
         """
-        Loop over all unresolved alarms, and check if it can be resolved.
+        Loop over unresolved alarms in OFF status, and check if it can be
+        resolved.
         """
 
         storage = self[Alerts.ALARM_STORAGE]
-        result = self.get_alarms(resolved=False)
+        result = storage.find(_filter={'resolved': None, 'status.val': OFF})
+
+        now = int(time())
 
         for data_id in result:
             for docalarm in result[data_id]:
@@ -553,7 +609,6 @@ class Alerts(MiddlewareRegistry):
 
                 if get_last_status(alarm) == OFF:
                     t = alarm['status']['t']
-                    now = int(time())
 
                     if (now - t) > self.flapping_interval:
                         alarm['resolved'] = t
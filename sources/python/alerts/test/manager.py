@@ -155,6 +155,28 @@ class TestManager(BaseTest):
         self.assertTrue(value['state'] is not None)
         self.assertTrue('test' in value['tags'])
 
+        # in place changes are saved in the storage
+        value['state'] = {'val': 1}
+        self.manager.update_current_alarm(alarm, value)
+
+        alarm = storage.get(alarm_id, limit=1)[0]
+        self.assertEqual(alarm[storage.VALUE]['state'], {'val': 1})
+        self.assertTrue('test' in alarm[storage.VALUE]['tags'])
+
+    def test_current_alarms(self):
+        alarm_id = '/fake/alarm/id'
+        self.manager.make_alarm(alarm_id, {'timestamp': 0})
+
+        # current alarms are loaded from the storage
+        manager = Alerts()
+        manager[Alerts.ALARM_STORAGE] = self.alarm_storage
+
+        self.assertEqual(list(manager.current_alarms), [alarm_id])
+        self.assertEqual(
+            manager.get_current_alarm(alarm_id),
+            self.manager.get_current_alarm(alarm_id)
+        )
+
     def test_resolve_alarms(self):
         storage = self.manager[Alerts.ALARM_STORAGE]
 
@@ -20,17 +20,26 @@
 
 from time import time
 
+try:
+    from threading import Thread, Lock
+except ImportError:
+    from dummy_threading import Thread, Lock
+
+from Queue import Queue, Empty
+
 from canopsis.old.storage import get_storage
 from canopsis.old.account import Account
 from canopsis.old.record import Record
 from canopsis.old.rabbitmq import Amqp
 from canopsis.event import get_routingkey
+from canopsis.common.lru import LRUCache
 
 from canopsis.engines.core import publish
 from canopsis.configuration.configurable import Configurable
 from canopsis.configuration.configurable.decorator import (
     add_category, conf_paths
 )
+from canopsis.configuration.model import Parameter
 
 import pprint
 pp = pprint.PrettyPrinter(indent=2)
@@ -46,10 +55,29 @@ CANCELED = 4
 
 CONF_PATH = 'check/archiver.conf'
 CATEGORY = 'ARCHIVER'
+CONTENT = [
+    Parameter('bulk_amount', int),
+    Parameter('bulk_delay', float),
+    Parameter('pipeline', Parameter.bool),
+    Parameter('queue_size', int),
+    Parameter('cache_size', int),
+    Parameter('cache_warm', Parameter.bool)
+]
+
+#: event fields which are not kept in the devent cache
+CACHE_EXCLUDED_FIELDS = ('perf_data_array',)
+#: devent fields which are also written by other engines
+EXTERNAL_FIELDS = ('ack', 'cancel')
+#: types of events whose referenced event is written in the database by
+#: other engines, so that its cached devent is outdated
+EXTERNAL_EVENT_TYPES = (
+    'ack', 'ackremove', 'cancel', 'uncancel', 'declareticket',
+    'assocticket', 'changestate'
+)
 
 
 @conf_paths(CONF_PATH)
-@add_category(CATEGORY)
+@add_category(CATEGORY, content=CONTENT)
 class Archiver(Configurable):
 
     def __init__(
@@ -57,6 +85,19 @@ class Archiver(Configurable):
         *args, **kwargs
     ):
 
+        # How many events can be buffered
+        self.bulk_amount = 500
+        # What is the maximum duration until bulk insert
+        self.bulk_delay = 3
+        # Flush buffers in a background writer
+        self.pipeline = True
+        # How many buffers can wait for the writer
+        self.queue_size = 4
+        # How many previous events are cached, 0 disables the cache
+        self.cache_size = 100000
+        # Load stored events in cache at start
+        self.cache_warm = True
+
         super(Archiver, self).__init__(*args, **kwargs)
         self.namespace = namespace
         self.namespace_log = namespace + '_log'
@@ -64,11 +105,15 @@ class Archiver(Configurable):
         # Bulk operation configuration
         self.last_bulk_insert_date = time()
         self.bulk_ids = []
-        # How many events can be buffered
-        self.bulk_amount = 500
-        # What is the maximum duration until bulk insert
-        self.bulk_delay = 3
         self.incoming_events = {}
+        self.bulk_lock = Lock()
+        self.bulk_queue = None
+        self.writer = None
+        self.devents = LRUCache(max_size=self.cache_size) \
+            if self.cache_size > 0 else None
+        # ids invalidated since the last processed buffer
+        self.invalidated = set()
+        self.cache_lock = Lock()
 
         self.autolog = autolog
 
@@ -100,6 +145,158 @@ class Archiver(Configurable):
         self.reset_stealthy_event_duration = time()
         self.reset_stats()
 
+    def start(self):
+        """Start the background writer which flushes buffered events.
+
+        The writer also flushes buffers older than bulk_delay when no event
+        arrives.
+        """
+
+        if self.pipeline and self.writer is None:
+            self.bulk_queue = Queue(maxsize=max(1, self.queue_size))
+            self.writer = Thread(
+                target=self._write_loop, name='archiver-writer'
+            )
+            self.writer.daemon = True
+            self.writer.start()
+
+        elif not self.pipeline:
+            self.warm_cache()
+
+    def stop(self):
+        """Flush buffered events and stop the background writer."""
+
+        if self.writer is not None:
+            self.flush()
+            self.bulk_queue.put(None)
+            self.writer.join()
+            self.writer = None
+            self.bulk_queue = None
+
+        else:
+            self.flush()
+
+    def _write_loop(self):
+
+        # buffers are queued while the cache is loading
+        self.warm_cache()
+
+        while True:
+            try:
+                incoming_events = self.bulk_queue.get(
+                    timeout=self.bulk_delay
+                )
+
+            except Empty:
+                # time based flush of a quiet buffer
+                with self.bulk_lock:
+                    elapsed_time = time() - self.last_bulk_insert_date
+
+                    if elapsed_time > self.bulk_delay:
+                        incoming_events = self._swap_buffers()
+
+                    else:
+                        continue
+
+            if incoming_events is None:
+                break
+
+            if not incoming_events:
+                continue
+
+            try:
+                self.process_events(incoming_events)
+
+            except Exception as ex:
+                self.logger.error(
+                    u'Unable to flush {} events: {}'.format(
+                        len(incoming_events), ex
+                    )
+                )
+
+    def _swap_buffers(self):
+        """Replace the event buffer by a new one, bulk_lock must be held.
+
+        :return: previous event buffer.
+        :rtype: dict
+        """
+
+        result = self.incoming_events
+
+        self.bulk_ids = []
+        self.incoming_events = {}
+        self.last_bulk_insert_date = time()
+
+        return result
+
+    def flush(self):
+        """Swap event buffers and process the filled one.
+
+        With pipeline, buffers are processed by the writer, otherwise in the
+        current thread.
+        """
+
+        with self.bulk_lock:
+            incoming_events = self._swap_buffers()
+
+            if incoming_events and self.writer is not None:
+                # keep buffers ordered, blocks when the writer is late
+                self.bulk_queue.put(incoming_events)
+                return
+
+        if incoming_events:
+            self.process_events(incoming_events)
+
+    def warm_cache(self):
+        """Load the latest stored events in the devent cache."""
+
+        if self.devents is None or not self.cache_warm:
+            return
+
+        backend = self.storage.get_backend(self.namespace)
+
+        cursor = backend.find(
+            {'crecord_type': 'event'},
+            dict((field, 0) for field in CACHE_EXCLUDED_FIELDS)
+        ).sort('timestamp', -1).limit(self.cache_size).batch_size(1000)
+
+        try:
+            for devent in cursor:
+                # keep the latest events in the most recently used positions
+                if devent['_id'] not in self.devents:
+                    self.devents[devent['_id']] = devent
+
+        except Exception as ex:
+            self.logger.warning(u'Unable to warm cache: {}'.format(ex))
+
+        self.logger.info(u'{} events in cache'.format(len(self.devents)))
+
+    def cache_devent(self, _id, devent):
+        """Write through the cached state of a stored event.
+
+        Events invalidated while their buffer is processed are not cached.
+        """
+
+        if self.devents is not None:
+            for field in CACHE_EXCLUDED_FIELDS:
+                devent.pop(field, None)
+
+            with self.cache_lock:
+                if _id not in self.invalidated:
+                    self.devents[_id] = devent
+
+    def invalidate_devent(self, _id):
+        """Forget the cached state of a stored event, when other engines
+        write it in the database.
+
+        :param str _id: stored event id.
+        """
+
+        if self.devents is not None:
+            with self.cache_lock:
+                self.devents.pop(_id, None)
+                self.invalidated.add(_id)
+
     def reset_stats(self):
         self.stats = {
             'update': 0,
@@ -472,59 +669,105 @@ class Archiver(Configurable):
         # As this was not done until now... setting event primary key
         event['_id'] = _id
 
-        # Buffering event informations
-        self.bulk_ids.append(_id)
-        self.incoming_events[_id] = event
+        # Buffering event informations, the writer works on its own copy
+        # since the caller keeps using the event
+        with self.bulk_lock:
+            self.bulk_ids.append(_id)
+            self.incoming_events[_id] = event.copy()
 
-        # Processing many events condition computation
-        bulk_modulo = len(self.bulk_ids) % self.bulk_amount
-        elapsed_time = time() - self.last_bulk_insert_date
+            # Processing many events condition computation
+            bulk_modulo = len(self.bulk_ids) % self.bulk_amount
+            elapsed_time = time() - self.last_bulk_insert_date
 
         # When enough event buffered/time elapsed
         # processing events buffers
         if bulk_modulo == 0 or elapsed_time > self.bulk_delay:
+            self.flush()
 
-            insert_operations = []
-            update_operations = []
+        # Half useless retro compatibility
+        if 'state' in event and event['state']:
+            return _id
+
+    def process_events(self, incoming_events):
+        """Process a buffer of events by id against their previous states.
+
+        Previous states are read from the devent cache, and from the
+        database on cache misses. A cached devent is not used when the event
+        state changes, or when it was invalidated because other engines have
+        written it since.
+        """
+
+        insert_operations = []
+        update_operations = []
 
-            query = {'_id': {'$in': self.bulk_ids}}
+        devents = {}
+        cached = set()
 
-            devents = {}
+        if self.devents is not None:
+            # invalidated devents are not cached anymore, and are cached
+            # again once read from the database by this buffer
+            with self.cache_lock:
+                self.invalidated = set()
+
+            for _id in incoming_events:
+                devent = self.devents.get(_id)
+
+                if devent is not None and \
+                        devent.get('state') == incoming_events[_id]['state']:
+                    devents[_id] = devent.copy()
+                    cached.add(_id)
+
+        missing = [_id for _id in incoming_events if _id not in cached]
+
+        if missing:
+            query = {'_id': {'$in': missing}}
 
             # Put previous events in pretty data structure
             backend = self.storage.get_backend(self.namespace)
             for devent in backend.find(query):
                 devents[devent['_id']] = devent
 
-            # Try to match previous and new incoming event
-            for _id in self.incoming_events:
-                event = self.incoming_events[_id]
-                devent = None
-                if _id in devents:
-                    devent = devents[_id]
+        # Try to match previous and new incoming event
+        for _id in incoming_events:
+            event = incoming_events[_id]
+            devent = None
+            if _id in devents:
+                devent = devents[_id]
+                # process_an_event may change devent
+                stored = devent.copy()
+            else:
+                self.logger.info(
+                    u'Previous event for rk {} not found'.format(_id))
+
+            # Effective archiver processing call
+            operations = self.process_an_event(_id, event, devent)
+            for operation in operations:
+                if operation['type'] == 'insert':
+                    if operation['collection'] == 'events':
+                        self.cache_devent(_id, operation['event'].copy())
+
+                    insert_operations.append(operation)
+
                 else:
-                    self.logger.info(
-                        u'Previous event for rk {} not found'.format(_id))
-
-                # Effective archiver processing call
-                operations = self.process_an_event(_id, event, devent)
-                for operation in operations:
-                    if operation['type'] == 'insert':
-                        insert_operations.append(operation)
-                    else:
-                        update_operations.append(operation)
+                    change = operation['update']['$set']
 
-            self.process_insert_operations(insert_operations)
-            self.process_update_operations(update_operations)
+                    if _id in cached:
+                        # do not rewrite fields other engines may have changed
+                        for field in EXTERNAL_FIELDS:
+                            if field in change and \
+                                    change[field] is devent.get(field):
+                                del change[field]
 
-            # Buld processing done, reseting informations
-            self.bulk_ids = []
-            self.incoming_events = {}
-            self.last_bulk_insert_date = time()
+                    stored.update(change)
 
-        # Half useless retro compatibility
-        if 'state' in event and event['state']:
-            return _id
+                    if change:
+                        update_operations.append(operation)
+
+            if devent is not None:
+                self.cache_devent(_id, stored)
+
+        self.process_insert_operations(insert_operations)
+        self.process_update_operations(update_operations)
 
     def process_an_event(self, _id, event, devent):
 
@@ -20,7 +20,10 @@
 
 from unittest import TestCase, main
 
+from time import sleep
+
 from canopsis.check.archiver import Archiver
+from canopsis.common.lru import LRUCache
 
 ARCHIVER = None
 
@@ -105,6 +108,98 @@ class KnownValues(TestCase):
         self.assertEqual(event['status'], STEALTHY)
         devent = event.copy()
 
+    def test_02_pipeline(self):
+
+        processed = []
+        self.archiver.process_events = lambda events: processed.append(
+            sorted(events)
+        )
+        self.archiver.bulk_amount = 2
+        self.archiver.bulk_delay = 0.1
+
+        self.archiver.start()
+
+        for index in range(3):
+            self.archiver.check_event('rk{0}'.format(index), {'state': 0})
+
+        # last event is flushed by the writer without new events
+        sleep(0.5)
+        self.assertEqual(processed, [['rk0', 'rk1'], ['rk2']])
+
+        self.archiver.check_event('rk3', {'state': 0})
+        self.archiver.stop()
+        self.assertEqual(processed, [['rk0', 'rk1'], ['rk2'], ['rk3']])
+
+    def test_03_buffer_copy(self):
+
+        processed = []
+        self.archiver.process_events = processed.append
+        self.archiver.pipeline = False
+        self.archiver.bulk_amount = 2
+
+        event = {'state': 0}
+        self.archiver.check_event('rk0', event)
+
+        # the caller keeps on updating its event
+        event['event_id'] = 'rk0'
+
+        self.archiver.check_event('rk1', {'state': 0})
+
+        self.assertEqual(processed[0]['rk0'], {'_id': 'rk0', 'state': 0})
+        self.assertIsNot(processed[0]['rk0'], event)
+
+    def test_04_cancel_then_same_state(self):
+
+        # stored event cancelled by the cancel engine
+        cancelled = {
+            '_id': 'rk', 'rk': 'rk', 'crecord_type': 'event',
+            'state': 2, 'state_type': 1, 'status': CANCELED,
+            'timestamp': 100, 'last_state_change': 50,
+            'cancel': {'previous_status': ONGOING}
+        }
+
+        class Backend(object):
+            def find(self, query):
+                return [dict(cancelled)]
+
+        class Storage(object):
+            def get_backend(self, namespace):
+                return Backend()
+
+        updates = []
+        self.archiver.storage = Storage()
+        self.archiver.process_update_operations = updates.extend
+        self.archiver.process_insert_operations = lambda operations: None
+        self.archiver.devents = LRUCache(max_size=10)
+
+        # cached state before the cancellation
+        stale = dict(cancelled, status=ONGOING)
+        del stale['cancel']
+        self.archiver.cache_devent('rk', stale)
+
+        # the eventstore receives the cancel event
+        self.archiver.invalidate_devent('rk')
+
+        # same state again
+        self.archiver.process_events({
+            'rk': {
+                '_id': 'rk', 'rk': 'rk', 'event_type': 'check',
+                'state': 2, 'state_type': 1, 'timestamp': 200
+            }
+        })
+
+        for update in updates:
+            self.assertEqual(
+                update['update']['$set'].get('status', CANCELED), CANCELED
+            )
+
+        self.assertEqual(self.archiver.devents['rk']['status'], CANCELED)
+
+        # invalidations during a processing are not cached
+        self.archiver.invalidated.add('rk2')
+        self.archiver.cache_devent('rk2', dict(stale, _id='rk2'))
+        self.assertNotIn('rk2', self.archiver.devents)
+
 
 if __name__ == "__main__":
     main()
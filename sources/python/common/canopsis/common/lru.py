@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+# --------------------------------
+# Copyright (c) 2015 "Capensis" [http://www.capensis.com]
+#
+# This file is part of Canopsis.
+#
+# Canopsis is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Canopsis is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
+# ---------------------------------
+
+"""
+Size-bounded least recently used cache.
+"""
+
+from collections import OrderedDict
+
+try:
+    from threading import RLock
+except ImportError:
+    from dummy_threading import RLock
+
+_MISSING = object()  #: value of items which are not cached.
+
+
+class LRUCache(object):
+    """Thread-safe dictionary which keeps at most max_size items.
+
+    When full, the least recently read or written items are evicted.
+    """
+
+    def __init__(self, max_size=10000, sizeof=None, *args, **kwargs):
+        """
+        :param int max_size: maximal number of items, or maximal sum of item
+            sizes if sizeof is given. Unbounded if <= 0.
+        :param sizeof: function which returns the size of an item value
+            (optional).
+        """
+
+        super(LRUCache, self).__init__(*args, **kwargs)
+
+        self.max_size = max_size
+        self.sizeof = sizeof
+
+        self._items = OrderedDict()
+        self._lock = RLock()
+        self._size = 0  #: sum of item sizes if sizeof is given
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Get an item value and mark it as recently used.
+
+        :param key: item key.
+        :param default: value to return if key is not cached.
+        """
+
+        with self._lock:
+            try:
+                result = self._items.pop(key)
+
+            except KeyError:
+                self.misses += 1
+                result = default
+
+            else:
+                self.hits += 1
+                self._items[key] = result
+
+        return result
+
+    def __getitem__(self, key):
+
+        result = self.get(key, self)
+
+        if result is self:
+            raise KeyError(key)
+
+        return result
+
+    @property
+    def size(self):
+        """Number of items, or sum of item sizes if sizeof is given."""
+
+        return len(self._items) if self.sizeof is None else self._size
+
+    def _remove(self, key):
+        """Remove an item without lock.
+
+        :return: the item value, or _MISSING if key is not cached.
+        """
+
+        result = self._items.pop(key, _MISSING)
+
+        if self.sizeof is not None and result is not _MISSING:
+            self._size -= self.sizeof(result)
+
+        return result
+
+    def __setitem__(self, key, value):
+
+        with self._lock:
+            self._remove(key)
+            self._items[key] = value
+
+            if self.sizeof is not None:
+                self._size += self.sizeof(value)
+
+            # keep the new item even if it is bigger than max_size
+            while 0 < self.max_size < self.size and len(self._items) > 1:
+                self._remove(next(iter(self._items)))
+
+    def update(self, items):
+        """Set several items.
+
+        :param items: dict or iterable of (key, value).
+        """
+
+        if isinstance(items, dict):
+            items = items.items()
+
+        with self._lock:
+            for key, value in items:
+                self[key] = value
+
+    def pop(self, key, default=None):
+
+        with self._lock:
+            result = self._remove(key)
+
+        return default if result is _MISSING else result
+
+    def __delitem__(self, key):
+
+        with self._lock:
+            if self._remove(key) is _MISSING:
+                raise KeyError(key)
+
+    def __contains__(self, key):
+
+        return key in self._items
+
+    def __len__(self):
+
+        return len(self._items)
+
+    def clear(self):
+
+        with self._lock:
+            self._items.clear()
+            self._size = 0
+            self.hits = self.misses = 0
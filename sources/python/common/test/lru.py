@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# --------------------------------
+# Copyright (c) 2015 "Capensis" [http://www.capensis.com]
+#
+# This file is part of Canopsis.
+#
+# Canopsis is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Canopsis is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
+# ---------------------------------
+
+from unittest import TestCase, main
+
+from canopsis.common.lru import LRUCache
+
+
+class LRUCacheTest(TestCase):
+
+    def test_eviction(self):
+        cache = LRUCache(max_size=2)
+
+        cache['a'] = 1
+        cache['b'] = 2
+        # a becomes the most recently used item
+        self.assertEqual(cache.get('a'), 1)
+
+        cache['c'] = 3
+
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache['a'], 1)
+        self.assertEqual(cache['c'], 3)
+        self.assertRaises(KeyError, cache.__getitem__, 'b')
+        self.assertIsNone(cache.get('b'))
+
+    def test_update(self):
+        cache = LRUCache(max_size=0)
+
+        cache.update({'a': 1, 'b': None})
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache['b'])
+        self.assertEqual(cache.pop('a'), 1)
+        self.assertNotIn('a', cache)
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_sizeof(self):
+        cache = LRUCache(max_size=5, sizeof=len)
+
+        cache['a'] = [1, 2]
+        cache['b'] = [1, 2]
+        self.assertEqual(cache.size, 4)
+
+        # the least recently used items are evicted until size fits
+        cache['c'] = [1, 2, 3]
+        self.assertEqual(cache.size, 5)
+        self.assertNotIn('a', cache)
+
+        cache['c'] = [1]
+        self.assertEqual(cache.size, 3)
+
+        del cache['b']
+        self.assertEqual(cache.size, 1)
+        self.assertEqual(cache.pop('c'), [1])
+        self.assertEqual(cache.size, 0)
+
+        # an item bigger than max_size is kept alone
+        cache['a'] = [1, 2]
+        cache['d'] = range(6)
+        self.assertEqual(list(cache._items), ['d'])
+
+if __name__ == '__main__':
+    main()
@@ -23,16 +23,31 @@ from canopsis.configuration.configurable.decorator import (
 )
 from canopsis.configuration.model import Parameter
 
+from canopsis.common.init import basestring
+from canopsis.common.lru import LRUCache
 from canopsis.middleware.registry import MiddlewareRegistry
 from canopsis.event import Event, forger
 from canopsis.storage.composite import CompositeStorage
 
+from time import time
+
 CONF_RESOURCE = 'context/context.conf'  #: last context conf resource
 CATEGORY = 'CONTEXT'  #: context category
 CONTENT = [
-    Parameter('accept_event_types', Parameter.array())
+    Parameter('accept_event_types', Parameter.array()),
+    Parameter('entity_cache_size', int),
+    Parameter('entity_cache_ttl', float)
 ]
 
+#: default number of entities (existing or not) cached by id.
+DEFAULT_ENTITY_CACHE_SIZE = 250000
+
+#: default duration in seconds of cached entities (existing or not).
+DEFAULT_ENTITY_CACHE_TTL = 300
+
+#: value of entities which are not in the entity cache.
+_UNKNOWN = object()
+
 
 @add_category(CATEGORY, content=CONTENT)
 @conf_paths(CONF_RESOURCE)
@@ -72,7 +87,8 @@ class Context(MiddlewareRegistry):
     ENTITY = Event.ENTITY  #: entity id in event
 
     def __init__(
-        self, context=DEFAULT_CONTEXT, ctx_storage=None, *args, **kwargs
+        self, context=DEFAULT_CONTEXT, ctx_storage=None,
+        entity_cache_size=None, entity_cache_ttl=None, *args, **kwargs
     ):
 
         super(Context, self).__init__(self, *args, **kwargs)
@@ -81,6 +97,12 @@ class Context(MiddlewareRegistry):
         if ctx_storage is not None:
             self[Context.CTX_STORAGE] = ctx_storage
 
+        if entity_cache_size is not None:
+            self.entity_cache_size = entity_cache_size
+
+        if entity_cache_ttl is not None:
+            self.entity_cache_ttl = entity_cache_ttl
+
     @property
     def context(self):
         """List of context element name.
@@ -118,6 +140,108 @@ class Context(MiddlewareRegistry):
 
         self._accept_event_types = value
 
+    @property
+    def entity_cache_size(self):
+        """Maximal number of entities cached by id, missing entities
+        included. The cache is disabled if not greater than 0."""
+
+        if not hasattr(self, '_entity_cache_size'):
+            self.entity_cache_size = None
+
+        return self._entity_cache_size
+
+    @entity_cache_size.setter
+    def entity_cache_size(self, value):
+        if value is None:
+            value = DEFAULT_ENTITY_CACHE_SIZE
+
+        self._entity_cache_size = value
+        self._entity_cache = LRUCache(max_size=value) if value > 0 else None
+
+    @property
+    def entity_cache_ttl(self):
+        """Duration in seconds of cached entities, missing entities included,
+        in order to see entities changed by other processes."""
+
+        if not hasattr(self, '_entity_cache_ttl'):
+            self.entity_cache_ttl = None
+
+        return self._entity_cache_ttl
+
+    @entity_cache_ttl.setter
+    def entity_cache_ttl(self, value):
+        if value is None:
+            value = DEFAULT_ENTITY_CACHE_TTL
+
+        self._entity_cache_ttl = float(value)
+
+    @property
+    def entity_cache(self):
+        """Entity LRU cache by entity id, None if disabled. Values are
+        (expiration timestamp, entity), where entity is None for entities
+        known as missing."""
+
+        if not hasattr(self, '_entity_cache'):
+            self.entity_cache_size = None
+
+        return self._entity_cache
+
+    def _get_cached_entity(self, entity_id):
+        """Get a copy of a cached entity.
+
+        :return: entity, None if the entity is known as missing, or _UNKNOWN
+            if entity_id is not cached or expired.
+        """
+
+        result = _UNKNOWN
+
+        entity_cache = self.entity_cache
+
+        if entity_cache is not None:
+            cached = entity_cache.get(entity_id)
+
+            if cached is not None:
+                expiration, entity = cached
+
+                if expiration > time():
+                    result = None if entity is None else entity.copy()
+
+                else:
+                    entity_cache.pop(entity_id)
+
+        return result
+
+    def _cache_entity(self, entity_id, entity):
+        """Cache an entity, or a missing entity if entity is None."""
+
+        entity_cache = self.entity_cache
+
+        if entity_cache is not None:
+            entity_cache[entity_id] = (
+                time() + self.entity_cache_ttl,
+                None if entity is None else entity.copy()
+            )
+
+    def invalidate_cache(self, ids=None):
+        """Remove entities from the entity cache.
+
+        :param ids: entity id(s) to remove. All entities if None.
+        :type ids: list or str
+        """
+
+        entity_cache = self.entity_cache
+
+        if entity_cache is not None:
+            if ids is None:
+                entity_cache.clear()
+
+            else:
+                if isinstance(ids, basestring):
+                    ids = [ids]
+
+                for entity_id in ids:
+                    entity_cache.pop(entity_id)
+
     def get_entities(self, ids):
         """Get entities by id.
 
@@ -192,7 +316,146 @@ class Context(MiddlewareRegistry):
         :param bool cache: use query cache if True (False by default).
         """
 
-        result = {}
+        _type, ctx, name, entity_id = self._get_entity_path(event)
+
+        if from_db:
+            result = self._get_cached_entity(entity_id)
+
+            if result is _UNKNOWN:
+                result = self.get(_type=_type, names=name, context=ctx)
+                self._cache_entity(entity_id, result)
+
+            # if entity does not exists, create it if specified
+            if result is None and create_if_not_exists:
+                result = {Context.NAME: name}
+                self.put(_type=_type, entity=result, context=ctx, cache=cache)
+                result.update(ctx)
+                result[Context.TYPE] = _type
+        else:
+            result = ctx.copy()
+            result[Context.NAME] = name
+            result[Context.TYPE] = _type
+
+        return result
+
+    def get_entities_bulk(
+        self, events, create_if_not_exists=True, cache=False
+    ):
+        """Get entities of several events from db.
+
+        Entities which are not cached are retrieved with one request, and
+        missing entities and their missing parents are created with one bulk
+        upsert.
+
+        :param list events: events from where get entities.
+        :param bool create_if_not_exists: Create missing event entities (True
+            by default).
+        :param bool cache: use query cache if True (False by default).
+        :return: entity (None if missing and not created) per event.
+        :rtype: list
+        """
+
+        storage = self[Context.CTX_STORAGE]
+
+        entity_paths = [self._get_entity_path(event) for event in events]
+
+        entities = {}  # entities (None if missing) by id
+        to_get = set()  # ids of entities to get from db
+
+        def resolve(entity_id):
+            """Resolve an entity from the cache or prepare its retrieval."""
+
+            if entity_id not in entities:
+                entity = self._get_cached_entity(entity_id)
+                entities[entity_id] = entity
+
+                if entity is _UNKNOWN:
+                    to_get.add(entity_id)
+
+            return entities[entity_id]
+
+        for _type, ctx, name, entity_id in entity_paths:
+            entity = resolve(entity_id)
+
+            # parents are required only if the entity may be created
+            missing = entity is None or entity is _UNKNOWN
+            if create_if_not_exists and missing:
+                path = ctx.copy()
+                path[Context.TYPE] = _type
+
+                for parent_path, parent_name in self._get_parents(path):
+                    resolve(
+                        storage.get_absolute_path(
+                            path=parent_path, name=parent_name
+                        )
+                    )
+
+        if to_get:
+            for entity in storage.get_elements(ids=list(to_get)):
+                entity_id = entity[Context.DATA_ID]
+                entities[entity_id] = entity
+                self._cache_entity(entity_id, entity)
+                to_get.discard(entity_id)
+
+            # remaining entities are missing
+            for entity_id in to_get:
+                entities[entity_id] = None
+                self._cache_entity(entity_id, None)
+
+        if create_if_not_exists:
+            to_put = []
+
+            def create(path, name, entity_id):
+                """Prepare the creation of an entity."""
+
+                entity = {Context.NAME: name}
+                to_put.append((path, name, entity))
+
+                entity = entity.copy()
+                entity.update(path)
+                entity[Context.DATA_ID] = entity_id
+                entities[entity_id] = entity
+                self._cache_entity(entity_id, entity)
+
+            for _type, ctx, name, entity_id in entity_paths:
+                if entities[entity_id] is not None:
+                    continue
+
+                path = ctx.copy()
+                path[Context.TYPE] = _type
+
+                # create missing parents until the first existing one
+                for parent_path, parent_name in self._get_parents(path):
+                    parent_id = storage.get_absolute_path(
+                        path=parent_path, name=parent_name
+                    )
+
+                    if entities[parent_id] is None:
+                        create(parent_path, parent_name, parent_id)
+
+                    else:
+                        break
+
+                create(path, name, entity_id)
+
+            if to_put:
+                storage.put_many(to_put, cache=cache)
+
+        result = []
+
+        for _type, ctx, name, entity_id in entity_paths:
+            entity = entities[entity_id]
+            result.append(None if entity is None else entity.copy())
+
+        return result
+
+    def _get_entity_path(self, event):
+        """Get event entity type, context, name and id.
+
+        :param dict event: event from where get entity information.
+        :return: entity type, context without type, name and id.
+        :rtype: tuple
+        """
 
         _event = event.copy()
 
@@ -224,22 +487,39 @@ class Context(MiddlewareRegistry):
 
         ctx, name = self.get_entity_context_and_name(_event)
 
+        entity_id = self[Context.CTX_STORAGE].get_absolute_path(
+            path=ctx, name=name
+        )
+
         # remove type from ctx
         _type = ctx[Context.TYPE]
         del ctx[Context.TYPE]
 
-        if from_db:
-            result = self.get(_type=_type, names=name, context=ctx)
-            # if entity does not exists, create it if specified
-            if result is None and create_if_not_exists:
-                result = {Context.NAME: name}
-                self.put(_type=_type, entity=result, context=ctx, cache=cache)
-                result.update(ctx)
-                result[Context.TYPE] = _type
-        else:
-            result = ctx.copy()
-            result[Context.NAME] = name
-            result[Context.TYPE] = _type
+        result = _type, ctx, name, entity_id
+
+        return result
+
+    def _get_parents(self, path):
+        """Get paths and names of parent entities, from the nearest one.
+
+        :param dict path: entity path with type.
+        :return: list of (parent path, parent name).
+        :rtype: list
+        """
+
+        result = []
+
+        parent_path = path
+
+        # get key context without type
+        for key in reversed(self._context[1:]):
+            if key in path:
+                parent_path = parent_path.copy()
+                # update path type with input key
+                parent_path[Context.TYPE] = key
+                # parent name is path[key]
+                parent_name = parent_path.pop(key)
+                result.append((parent_path, parent_name))
 
         return result
 
@@ -421,39 +701,48 @@ class Context(MiddlewareRegistry):
 
         name = entity[Context.NAME]
 
-        entity_db = self.get(
-            _type=_type, names=name, context=context
-        )
+        storage = self[Context.CTX_STORAGE]
+
+        entity_id = storage.get_absolute_path(path=path, name=name)
+
+        entity_db = self._get_cached_entity(entity_id)
+        if entity_db is _UNKNOWN:
+            entity_db = self.get(
+                _type=_type, names=name, context=context
+            )
+            self._cache_entity(entity_id, entity_db)
+
         # check if entity exists in db
         if add_parents and context is not None and entity_db is None:
             # if entity does not exist in db
 
-            # check if parent entities exists
-            # path is a copy of context
-            parent_path = path.copy()
             # ensure all parent context exist, or create them if necessary
-            # get key context without type
-            keys = [k for k in reversed(self._context[1:]) if k in context]
-            for key in keys:
-                # update path type with input key
-                parent_path['type'] = key
-                # parent name is path[key]
-                parent_name = parent_path.pop(key)
-                # get entity
-                parent_entity = self[Context.CTX_STORAGE].get(
-                    path=parent_path, names=parent_name
+            for parent_path, parent_name in self._get_parents(path):
+                parent_id = storage.get_absolute_path(
+                    path=parent_path, name=parent_name
                 )
+                # get entity
+                parent_entity = self._get_cached_entity(parent_id)
+                if parent_entity is _UNKNOWN:
+                    parent_entity = storage.get(
+                        path=parent_path, names=parent_name
+                    )
                 # if entity does not exist
                 if parent_entity is None:
                     # put a new entity in DB
                     parent_entity = {Context.NAME: parent_name}
-                    self[Context.CTX_STORAGE].put(
+                    storage.put(
                         path=parent_path,
                         name=parent_name,
                         data=parent_entity,
                         cache=cache
                     )
+                    parent_entity = parent_entity.copy()
+                    parent_entity.update(parent_path)
+                    parent_entity[Context.DATA_ID] = parent_id
+                    self._cache_entity(parent_id, parent_entity)
                 else:
+                    self._cache_entity(parent_id, parent_entity)
                     break
 
         # initialize entity db for future update
@@ -471,13 +760,18 @@ class Context(MiddlewareRegistry):
 
         if to_update:
             # finally, put the entity if necessary
-            self[Context.CTX_STORAGE].put(
+            storage.put(
                 path=path,
                 name=name,
                 data=entity,
                 shared_id=extended_id,
                 cache=cache
             )
+            entity_db.update(path)
+            entity_db.update(entity)
+            entity_db[Context.NAME] = name
+            entity_db[Context.DATA_ID] = entity_id
+            self._cache_entity(entity_id, entity_db)
 
     def remove(
         self, ids=None, _type=None, context=None, extended=False, cache=False
@@ -502,12 +796,15 @@ class Context(MiddlewareRegistry):
             self[Context.CTX_STORAGE].remove(
                 path=path, shared=extended, cache=cache
             )
+            self.invalidate_cache()
 
         if ids is not None:
             self[Context.CTX_STORAGE].remove_elements(ids=ids, cache=cache)
+            self.invalidate_cache(ids=ids)
         # if all parameters are None, delete all elements
         elif (_type, context) == (None, None):
             self[Context.CTX_STORAGE].remove_elements()
+            self.invalidate_cache()
 
     def get_entity_context_and_name(self, entity):
         """
@@ -544,6 +841,51 @@ class Context(MiddlewareRegistry):
 
         return result
 
+    def get_metric_prefix(self, event):
+        """Get the id prefix of metrics of an event.
+
+        Equivalent to the id of a metric entity without its name, without
+        copying the event.
+
+        :param dict event: event which contains the metric context fields.
+        :rtype: str
+        """
+
+        result = ''
+
+        for field in self[Context.CTX_STORAGE].path:
+            value = 'metric' if field == Context.TYPE else event.get(field)
+
+            if value is None:
+                break
+
+            result = '%s%s%s' % (
+                result, CompositeStorage.PATH_SEPARATOR, value
+            )
+
+        return result
+
+    def get_metric_id(self, event, metric, prefix=None):
+        """Get the id of a metric of an event.
+
+        Equivalent to get_entity_id of the event with metric type and name.
+
+        :param dict event: event which contains the metric context fields.
+        :param str metric: metric name.
+        :param str prefix: metric prefix if already calculated with
+            get_metric_prefix.
+        :rtype: str
+        """
+
+        if prefix is None:
+            prefix = self.get_metric_prefix(event)
+
+        result = '%s%s%s' % (
+            prefix, CompositeStorage.PATH_SEPARATOR, metric
+        ) if prefix else prefix
+
+        return result
+
     def get_entity_id_context_name(self, entity):
         """
         Get the right id, context and name of input entity.
@@ -567,6 +909,13 @@ class Context(MiddlewareRegistry):
             data=entities, shared=extended, cache=cache
         )
 
+        self.invalidate_cache(
+            ids=[
+                entity[Context.DATA_ID] for entity in entities
+                if Context.DATA_ID in entity
+            ]
+        )
+
     def _configure(self, unified_conf, *args, **kwargs):
 
         super(Context, self)._configure(
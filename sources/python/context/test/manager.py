@@ -20,7 +20,7 @@
 # ---------------------------------
 
 from unittest import TestCase, main
-from canopsis.context.manager import Context
+from canopsis.context.manager import Context, _UNKNOWN
 
 
 class BaseContextTest(TestCase):
@@ -767,6 +767,158 @@ class GetEntityByIdTest(BaseContextTest):
         )
 
 
+class GetMetricId(BaseContextTest):
+    """Test get_metric_id method.
+    """
+
+    def test_get_metric_id(self):
+
+        event = {
+            'type': 'check',
+            'connector': 'c',
+            'connector_name': 'cn',
+            'component': 'k',
+            'resource': 'r'
+        }
+
+        entity = event.copy()
+        entity['type'] = 'metric'
+        entity[Context.NAME] = 'm'
+
+        metric_id = self.context.get_metric_id(event, 'm')
+
+        self.assertEqual(metric_id, '/metric/c/cn/k/r/m')
+        self.assertEqual(metric_id, self.context.get_entity_id(entity))
+
+    def test_get_metric_id_component(self):
+
+        event = {
+            'connector': 'c',
+            'connector_name': 'cn',
+            'component': 'k',
+            'resource': None
+        }
+
+        prefix = self.context.get_metric_prefix(event)
+
+        self.assertEqual(prefix, '/metric/c/cn/k')
+        self.assertEqual(
+            self.context.get_metric_id(event, 'm', prefix=prefix),
+            '/metric/c/cn/k/m'
+        )
+
+
+class GetEntitiesBulkTest(BaseContextTest):
+    """Test get_entities_bulk method and the entity cache.
+    """
+
+    def setUp(self):
+
+        super(GetEntitiesBulkTest, self).setUp()
+
+        self.events = [
+            {
+                'source_type': 'resource',
+                'event_type': 'check',
+                'connector': 'c',
+                'connector_name': 'cn',
+                'component': 'k',
+                'resource': 'r{0}'.format(i)
+            }
+            for i in range(3)
+        ]
+
+    def test_missing(self):
+
+        entities = self.context.get_entities_bulk(
+            self.events, create_if_not_exists=False
+        )
+
+        self.assertEqual(entities, [None] * len(self.events))
+
+        # missing entities are cached
+        self.assertIn('/resource/c/cn/k/r0', self.context.entity_cache)
+        self.assertIsNone(self.context.entity_cache['/resource/c/cn/k/r0'][1])
+
+    def test_create(self):
+
+        # cache a missing entity
+        self.context.get_entities_bulk(
+            self.events[:1], create_if_not_exists=False
+        )
+
+        entities = self.context.get_entities_bulk(self.events)
+
+        self.assertEqual(
+            [entity[Context.NAME] for entity in entities],
+            ['r0', 'r1', 'r2']
+        )
+
+        # entities and their parents are in db
+        self.context.invalidate_cache()
+
+        for event, entity in zip(self.events, entities):
+            self.assertEqual(
+                self.context.get_entity(event, from_db=True)[Context.NAME],
+                entity[Context.NAME]
+            )
+
+        component = self.context.get(
+            _type='component', names='k',
+            context={'connector': 'c', 'connector_name': 'cn'}
+        )
+        self.assertIsNotNone(component)
+
+        entities = self.context.find()
+        self.assertEqual(len(entities), len(self.events) + 3)
+
+    def test_cached_get_entity(self):
+
+        entity = self.context.get_entity(
+            self.events[0], from_db=True, create_if_not_exists=True
+        )
+
+        self.context.remove(
+            ids=[self.context.get_entity_id(entity)]
+        )
+
+        self.assertIsNone(self.context.get_entity(self.events[0], True))
+
+
+class EntityCacheTest(TestCase):
+    """Test the entity cache expiration.
+    """
+
+    def setUp(self):
+
+        self.context = Context(entity_cache_ttl=3600)
+
+    def test_cache(self):
+
+        entity = {'name': 'r0'}
+
+        self.context._cache_entity('r0', entity)
+        self.context._cache_entity('r1', None)
+
+        cached = self.context._get_cached_entity('r0')
+
+        self.assertEqual(cached, entity)
+        self.assertIsNot(cached, entity)
+        self.assertIsNone(self.context._get_cached_entity('r1'))
+        self.assertIs(self.context._get_cached_entity('r2'), _UNKNOWN)
+
+    def test_expiration(self):
+
+        self.context.entity_cache_ttl = 0
+
+        self.context._cache_entity('r0', {'name': 'r0'})
+        self.context._cache_entity('r1', None)
+
+        self.assertIs(self.context._get_cached_entity('r0'), _UNKNOWN)
+        self.assertIs(self.context._get_cached_entity('r1'), _UNKNOWN)
+        self.assertEqual(len(self.context.entity_cache), 0)
+
+
 class GetEvent(BaseContextTest):
     """Test get_event method.
     """
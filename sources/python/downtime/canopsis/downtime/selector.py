@@ -38,6 +38,28 @@ from datetime import datetime
 DEFAULT_SLA_TIMEWINDOW = 3600 * 24
 DELTA_PUBLICATION = 60 * 5
 
+#: event types selected by selectors
+CHECK_TYPES = ['check', 'eue', 'selector']
+
+#: status of events in bagot (see canopsis.check.archiver)
+BAGOT = 3
+
+
+def get_contribution(event):
+    """Get the contribution of an event to the state of selectors selecting
+    it.
+
+    :param dict event: stored check event.
+    :return: (state, acknowledged, infobagot).
+    :rtype: tuple
+    """
+
+    state = event.get('state')
+    ack = bool((event.get('ack') or {}).get('isAck'))
+    infobagot = state == 0 and event.get('status') == BAGOT
+
+    return state, ack, infobagot
+
 
 class Selector(Record):
     def __init__(
@@ -214,14 +236,8 @@ class Selector(Record):
 
         return self.get_percent_property('sla_critical', 80)
 
-    # Build MongoDB query to find every id matching event
-    def makeMfilter(self):
-
-        cfilter = self.cfilter.make_filter(
-            mfilter=self.mfilter,
-            includes=self.include_ids,
-            excludes=self.exclude_ids,
-        )
+    def has_downtime(self):
+        """Check if at least one known entity is in downtime."""
 
         query = PBehaviorManager.get_query(behaviors='downtime')
 
@@ -229,7 +245,26 @@ class Selector(Record):
 
         entities = self.context.get_entities(list(entityids))
 
-        if entities:
+        return bool(entities)
+
+    # Build MongoDB query to find every id matching event
+    def makeMfilter(self, downtime=None):
+        """
+        :param bool downtime: exclude events in downtime. If None, check
+            downtimes with has_downtime.
+        """
+
+        # copy avoids to modify the selector mfilter
+        cfilter = deepcopy(self.cfilter.make_filter(
+            mfilter=self.mfilter,
+            includes=self.include_ids,
+            excludes=self.exclude_ids,
+        ))
+
+        if downtime is None:
+            downtime = self.has_downtime()
+
+        if downtime:
             downtime = {
                 '$or': [
                     {DOWNTIME: False},
@@ -246,18 +281,20 @@ class Selector(Record):
 
         return cfilter
 
-    def getState(self):
+    def get_check_filter(self, downtime=None):
+        """Get the filter of check events selected by this selector.
 
-        self.logger.debug("getStates:")
+        :param bool downtime: exclude events in downtime (see makeMfilter).
+        :return: MongoDB filter, or None if the selector filter is invalid.
+        :rtype: dict
+        """
 
-        # Build MongoDB filter
-        mfilter = self.makeMfilter()
+        mfilter = self.makeMfilter(downtime=downtime)
 
         if not mfilter:
-            self.logger.debug(" + Invalid filter")
-            return ({}, 0, 0, 0, 0)
+            return None
 
-        include_check_types = {'$in': ['check', 'eue', 'selector']}
+        include_check_types = {'$in': CHECK_TYPES}
 
         # Adds default check clause as selector have to be done
         # on check event only
@@ -271,6 +308,46 @@ class Selector(Record):
         elif isinstance(mfilter, dict):
             mfilter['event_type'] = include_check_types
 
+        return mfilter
+
+    def get_contributions(self, downtime=None):
+        """Get contributions of selected events to the selector state, from
+        the database.
+
+        :param bool downtime: exclude events in downtime (see makeMfilter).
+        :return: contributions (see get_contribution) by event id, or None if
+            the selector filter is invalid.
+        :rtype: dict
+        """
+
+        mfilter = self.get_check_filter(downtime=downtime)
+
+        if mfilter is None:
+            return None
+
+        cursor = self.storage.get_backend(namespace=self.namespace).find(
+            mfilter, {'state': True, 'status': True, 'ack.isAck': True}
+        )
+
+        return dict(
+            (document['_id'], get_contribution(document))
+            for document in cursor
+        )
+
+    def getState(self, downtime=None):
+        """
+        :param bool downtime: exclude events in downtime (see makeMfilter).
+        """
+
+        self.logger.debug("getStates:")
+
+        # Build MongoDB filter
+        mfilter = self.get_check_filter(downtime=downtime)
+
+        if mfilter is None:
+            self.logger.debug(" + Invalid filter")
+            return ({}, 0, 0, 0, 0)
+
         # Main aggregation query, gets information about
         # how many events are in what state
         # information are aggregated for output computation
@@ -407,10 +484,17 @@ class Selector(Record):
         # selected event that are ack
         return states, state, ack_count, wstate_for_ack, infobagot
 
-    def event(self):
+    def event(self, state=None):
+        """
+        :param tuple state: selector state as returned by getState. If None,
+            it is computed with getState.
+        """
+
+        if state is None:
+            # Get state information form aggregation
+            state = self.getState()
 
-        # Get state information form aggregation
-        states, state, ack_count, wstate_for_ack, infobagot = self.getState()
+        states, state, ack_count, wstate_for_ack, infobagot = state
 
         information = None
 
@@ -563,3 +647,92 @@ class Selector(Record):
             self.logger.info('Selector event publication')
             self.last_publication_date = int(time())
             return True
+
+
+class SelectorState(object):
+    """In memory state of a selector, updated incrementally with
+    contributions (see get_contribution) of selected events.
+
+    :param dict contributions: initial contributions by event id.
+    """
+
+    def __init__(self, contributions=None):
+        super(SelectorState, self).__init__()
+
+        self.reset(contributions or {})
+
+    def reset(self, contributions):
+        """Replace all contributions.
+
+        :param dict contributions: contributions by event id.
+        """
+
+        self.contributions = {}
+        self.states = {}
+        self.unacked_states = {}
+        self.ack_count = 0
+        self.infobagot = 0
+
+        for _id in contributions:
+            self.update(_id, contributions[_id])
+
+    def _count(self, contribution, inc):
+        state, ack, infobagot = contribution
+
+        self.states[state] = self.states.get(state, 0) + inc
+
+        if ack:
+            self.ack_count += inc
+
+        else:
+            self.unacked_states[state] = \
+                self.unacked_states.get(state, 0) + inc
+
+        if infobagot:
+            self.infobagot += inc
+
+    def update(self, _id, contribution=None):
+        """Update the contribution of an event.
+
+        :param str _id: event id.
+        :param tuple contribution: new event contribution, None if the event
+            is not selected anymore.
+        """
+
+        old = self.contributions.get(_id)
+
+        if old == contribution:
+            return
+
+        if old is not None:
+            self._count(old, -1)
+            del self.contributions[_id]
+
+        if contribution is not None:
+            self._count(contribution, 1)
+            self.contributions[_id] = contribution
+
+    def get_state(self):
+        """Get the selector state like Selector.getState does.
+
+        :return: (states, state, ack_count, wstate_for_ack, infobagot).
+        :rtype: tuple
+        """
+
+        states = dict(
+            (state, count) for state, count in self.states.items() if count
+        )
+
+        state = -1
+        wstate_for_ack = 0
+
+        for s in [0, 1, 2, 3]:
+            if s in states:
+                state = s
+
+            if self.unacked_states.get(s):
+                wstate_for_ack = s
+
+        ack_count = self.ack_count if self.contributions else -1
+
+        return states, state, ack_count, wstate_for_ack, self.infobagot
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# --------------------------------
+# Copyright (c) 2015 "Capensis" [http://www.capensis.com]
+#
+# This file is part of Canopsis.
+#
+# Canopsis is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Canopsis is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
+# ---------------------------------
+
+from unittest import TestCase, main
+
+from canopsis.downtime.selector import SelectorState, get_contribution
+
+
+class GetContributionTest(TestCase):
+
+    def test_contribution(self):
+        self.assertEqual(
+            get_contribution({'state': 2, 'ack': {'isAck': True}}),
+            (2, True, False)
+        )
+        self.assertEqual(
+            get_contribution({'state': 0, 'status': 3}), (0, False, True)
+        )
+        self.assertEqual(
+            get_contribution({'state': 1, 'ack': {'wasAck': True}}),
+            (1, False, False)
+        )
+
+
+class SelectorStateTest(TestCase):
+
+    def test_empty(self):
+        self.assertEqual(SelectorState().get_state(), ({}, -1, -1, 0, 0))
+
+    def test_update(self):
+        state = SelectorState({
+            'a': (0, False, True),
+            'b': (2, True, False),
+            'c': (1, False, False)
+        })
+
+        self.assertEqual(
+            state.get_state(), ({0: 1, 1: 1, 2: 1}, 2, 1, 1, 1)
+        )
+
+        # b is not selected anymore, a is back to critical
+        state.update('b')
+        state.update('a', (3, False, False))
+
+        self.assertEqual(state.get_state(), ({1: 1, 3: 1}, 3, 0, 3, 0))
+
+        # a is acknowledged
+        state.update('a', (3, True, False))
+
+        self.assertEqual(state.get_state(), ({1: 1, 3: 1}, 3, 1, 1, 0))
+
+    def test_reset(self):
+        state = SelectorState({'a': (2, False, False)})
+
+        state.reset({'b': (1, False, False)})
+
+        self.assertEqual(state.get_state(), ({1: 1}, 1, 0, 1, 0))
+
+
+if __name__ == '__main__':
+    main()
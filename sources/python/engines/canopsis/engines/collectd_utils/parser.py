@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# --------------------------------
+# Copyright (c) 2015 "Capensis" [http://www.capensis.com]
+#
+# This file is part of Canopsis.
+#
+# Canopsis is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Canopsis is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
+# ---------------------------------
+
+"""Parser of collectd PUTVAL messages.
+
+Metric data sources are resolved once from the collectd types table and
+cached, in order to avoid lookups and string formatting per message.
+"""
+
+from canopsis.common.lru import LRUCache
+from canopsis.engines.collectd_utils import types as default_types
+
+import re
+
+#: PUTVAL message: ``PUTVAL <identifier> interval=<n> <timestamp>:<values>``
+PUTVAL = re.compile(r'^PUTVAL ("(.+)"|([^\s]+)) (interval=.+) ([^\s]+)$')
+
+#: undefined min/max value in collectd types.
+UNDEFINED = 'U'
+
+
+class PutvalParser(object):
+    """Parse collectd PUTVAL messages into perf data arrays.
+
+    :param dict types: collectd types by name (default collectd types).
+    :param int cache_size: maximal number of resolved metrics to keep.
+    :param logger: logger used to report invalid values.
+    """
+
+    def __init__(self, types=None, cache_size=10000, logger=None):
+        super(PutvalParser, self).__init__()
+
+        self.types = default_types if types is None else types
+        self.logger = logger
+        self._sources = LRUCache(cache_size)
+
+    def resolve(self, metric):
+        """Get data sources of a collectd metric.
+
+        :param str metric: metric name, i.e. ``<type>[-<type instance>]``.
+        :return: tuples ``(name, type, unit, min, max)`` by value index, or
+            None if metric type is unknown.
+        :rtype: tuple
+        """
+
+        if metric in self._sources:
+            return self._sources[metric]
+
+        result = None
+        name = metric
+        ctype = self.types.get(metric)
+
+        if ctype is None:
+            parts = metric.split('-')
+
+            if len(parts) > 1:
+                ctype = self.types.get(parts[0])
+                name = parts[1]
+
+        if ctype is not None:
+            result = []
+
+            for source in ctype:
+                sname = source['name']
+
+                if sname == 'value':
+                    sname = name
+
+                if sname != name:
+                    sname = '{0}-{1}'.format(name, sname)
+
+                vmin, vmax = source['min'], source['max']
+
+                result.append((
+                    sname,
+                    source['type'],
+                    source['unit'],
+                    None if vmin == UNDEFINED else vmin,
+                    None if vmax == UNDEFINED else vmax
+                ))
+
+            result = tuple(result)
+
+        self._sources[metric] = result
+
+        return result
+
+    def parse(self, body):
+        """Parse a PUTVAL message.
+
+        Parsing of values stops at the first invalid one, and values
+        parsed so far are kept.
+
+        :param str body: collectd message.
+        :return: ``(component, resource, timestamp, perf_data_array)``.
+        :rtype: tuple
+        :raises ValueError: if the message is not a valid PUTVAL message.
+        """
+
+        match = PUTVAL.match(body)
+
+        if match is None:
+            raise ValueError('Invalid collectd Message ({0})'.format(body))
+
+        cnode = (match.group(2) or match.group(3)).split('/')
+
+        if len(cnode) != 3:
+            raise ValueError('Invalid collectd identifier ({0})'.format(body))
+
+        component, resource, metric = cnode
+
+        sources = self.resolve(metric)
+
+        if sources is None:
+            raise ValueError('Unknown collectd type ({0})'.format(body))
+
+        values = match.group(5).split(':')
+
+        try:
+            timestamp = int(float(values[0]))
+
+        except ValueError as err:
+            raise ValueError(
+                'Impossible to get timestamp ({0}): {1}'.format(body, err)
+            )
+
+        values = values[1:]
+        perf_data_array = []
+
+        if len(values) > len(sources) and self.logger is not None:
+            self.logger.error(
+                'Too many values for {0}: {1}'.format(metric, values)
+            )
+
+        for source, value in zip(sources, values):
+            try:
+                value = float(value)
+
+            except ValueError as err:
+                if self.logger is not None:
+                    self.logger.error(
+                        'Impossible to parse values {0} ({1})'.format(
+                            values, err
+                        )
+                    )
+
+                break
+
+            name, data_type, unit, vmin, vmax = source
+
+            perf_data_array.append({
+                'metric': name, 'value': value,
+                'type': data_type, 'unit': unit,
+                'min': vmin, 'max': vmax
+            })
+
+        return component, resource, timestamp, perf_data_array
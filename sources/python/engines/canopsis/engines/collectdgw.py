@@ -18,18 +18,55 @@
 # along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
 # ---------------------------------
 
-from canopsis.engines.core import Engine, publish
+
+from canopsis.engines.core import Engine, publish_batch
+from canopsis.engines.collectd_utils.parser import PutvalParser
 from canopsis.event import forger
 
+from collections import OrderedDict
 from time import time
 
-from canopsis.engines.collectd_utils import types
+try:
+    from threading import Lock
+except ImportError:
+    from dummy_threading import Lock
 
-import re
 
 class engine(Engine):
+    """Forward collectd PUTVAL messages as perf events.
+
+    Values of a same host/plugin and timestamp received during
+    ``aggregation_window`` seconds are sent in a single event.
+
+    :param float aggregation_window: aggregation duration in seconds. 0
+        sends one event per message.
+    """
+
     etype = 'collectdgw'
 
+    DEFAULT_AGGREGATION_WINDOW = 1.0
+
+    def __init__(
+        self, aggregation_window=DEFAULT_AGGREGATION_WINDOW, *args, **kwargs
+    ):
+        super(engine, self).__init__(*args, **kwargs)
+
+        self.aggregation_window = aggregation_window
+        self.parser = PutvalParser(logger=self.logger)
+
+        self._pending = OrderedDict()
+        self._pending_lock = Lock()
+        self._window_start = time()
+
+    @property
+    def aggregation_window(self):
+        return self._aggregation_window
+
+    @aggregation_window.setter
+    def aggregation_window(self, value):
+        # value may be a string when set from the engine configuration
+        self._aggregation_window = float(value)
+
     def new_amqp_queue(self, *args, **kwargs):
         """
         Override AMQP queue creation (ignore possible parameters,
@@ -42,137 +79,65 @@ class engine(Engine):
 
     def on_collectd_event(self, body, msg):
         start = time()
-        error = False
+        errors = 0
 
-        prog = re.compile('^(PUTVAL) ("(.+)"|([^\s]+)) (interval=.+) ([^\s]+)$')
-        match = re.match(prog, body)
-        if match:
-            if match.group(3):
-                cnode = match.group(3)
-            else:
-                cnode = match.group(4)
-            collectd_info = [match.group(1),cnode,match.group(5),match.group(6)]
-            self.logger.debug(body)
-            action = collectd_info[0]
-            self.logger.debug(" + Action: %s" % action)
-
-            if len(collectd_info) == 4 and action == "PUTVAL":
-                cnode = collectd_info[1].split("/")
-                component = cnode[0]
-                resource = cnode[1]
-                metric = cnode[2]
-                options = collectd_info[2]
-                values = collectd_info[3]
-
-                self.logger.debug(" + Options: %s" % options)
-                self.logger.debug(" + Component: %s" % component)
-                self.logger.debug(" + Resource: %s" % resource)
-                self.logger.debug(" + Metric: %s" % metric)
-                self.logger.debug(" + Raw Values: %s" % values)
-
-                values = values.split(":")
-
-                perf_data_array = []
-
-                ctype = None
-                try:
-                    ## Know metric
-                    ctype = types[metric]
-                except:
-                    try:
-                        ctype = types[metric.split('-')[0]]
-                        metric = metric.split('-')[1]
-                    except Exception as err:
-                        self.logger.error(
-                            "Invalid format '%s' (%s)" % (body, err))
-                        return None
-
-                try:
-                    timestamp = int(float(values[0]))
-                    values = values[1:]
-                    self.logger.debug("   + Timestamp: %s" % timestamp)
-                    self.logger.debug("   + Values: %s" % values)
-
-                except Exception as err:
-                    self.logger.error(
-                        "Impossible to get timestamp or values (%s)" % err)
-                    return None
-
-                self.logger.debug(" + metric: %s" % metric)
-                self.logger.debug(" + ctype: %s" % ctype)
-
-                if ctype:
-                    try:
-                        i = 0
-                        for value in values:
-                            name = ctype[i]['name']
-                            unit = ctype[i]['unit']
-                            vmin = ctype[i]['min']
-                            vmax = ctype[i]['max']
-
-                            if vmin == 'U':
-                                vmin = None
-
-                            if vmax == 'U':
-                                vmax = None
-
-                            if name == "value":
-                                name = metric
-
-                            if metric != name:
-                                name = "%s-%s" % (metric, name)
-
-                            data_type = ctype[i]['type']
-
-                            value = float(value)
-
-                            self.logger.debug("     + %s" % name)
-                            self.logger.debug(
-                                "       -> %s (%s)" % (value, data_type))
-                            i += 1
-
-                            perf_data_array.append(
-                                {
-                                    'metric': name, 'value': value,
-                                    'type': data_type, 'unit': unit,
-                                    'min': vmin, 'max': vmax
-                                }
-                            )
-
-                    except Exception as err:
-                        self.logger.error(
-                            "Impossible to parse values '%s' (%s)" % (
-                                values, err))
-
-                if perf_data_array:
-                    self.logger.debug(
-                        ' + perf_data_array: %s', perf_data_array)
-
-                    event = forger(
-                        connector='collectd',
-                        connector_name='collectd2event',
-                        component=component,
-                        resource=resource,
-                        timestamp=timestamp,
-                        source_type='resource',
-                        event_type='perf',
-                        perf_data_array=perf_data_array
-                    )
-
-                    self.logger.debug("Send Event: %s" % event)
-
-                    ## send event on amqp
-                    publish(publisher=self.amqp, event=event)
+        try:
+            component, resource, timestamp, perf_data_array = \
+                self.parser.parse(body)
 
-            else:
-                error = True
-                self.logger.error("Invalid collectd Action (%s)" % body)
+        except ValueError as err:
+            self.logger.error(err)
+            errors = 1
 
         else:
-            self.logger.error("Invalid collectd Message (%s)" % body)
+            if perf_data_array:
+                self.aggregate(component, resource, timestamp, perf_data_array)
+
+            if start - self._window_start >= self.aggregation_window:
+                self.flush()
 
-        if error:
-            self.counter_error += 1
+        self.count(events=1, errors=errors, worktime=time() - start)
 
-        self.counter_event += 1
-        self.counter_worktime += time() - start
+    def aggregate(self, component, resource, timestamp, perf_data_array):
+        """Add perf data to the pending event of a host/plugin.
+
+        :param str component: collectd host.
+        :param str resource: collectd plugin (and plugin instance).
+        :param int timestamp: perf data timestamp.
+        :param list perf_data_array: perf data to add.
+        """
+
+        key = (component, resource, timestamp)
+
+        with self._pending_lock:
+            if key in self._pending:
+                self._pending[key]['perf_data_array'] += perf_data_array
+
+            else:
+                self._pending[key] = forger(
+                    connector='collectd',
+                    connector_name='collectd2event',
+                    component=component,
+                    resource=resource,
+                    timestamp=timestamp,
+                    source_type='resource',
+                    event_type='perf',
+                    perf_data_array=perf_data_array
+                )
+
+    def flush(self):
+        """Publish pending events and start a new aggregation window."""
+
+        with self._pending_lock:
+            events = self._pending.values()
+            self._pending = OrderedDict()
+            self._window_start = time()
+
+        if events:
+            publish_batch(publisher=self.amqp, events=events)
+
+    def beat(self):
+        self.flush()
+
+    def post_run(self):
+        self.flush()
@@ -87,6 +87,31 @@ class engine(Engine):
                     _type=_type, entity=entity, context=ctx
                 )
 
+    def work_batch(self, events, msgs):
+        """Resolve entities of events with one request before processing
+        them one by one."""
+
+        _events = []
+
+        for event in events:
+            _event = event.copy()
+            # same quick fix than work when an event has an empty resource
+            if 'resource' in _event and not _event['resource']:
+                del _event['resource']
+            _events.append(_event)
+
+        try:
+            # without the query cache, missing entities are put with one
+            # bulk upsert
+            self.context.get_entities_bulk(_events, cache=False)
+
+        except Exception as err:
+            self.logger.warning(
+                'Impossible to get entities of a batch: {0}'.format(err)
+            )
+
+        return super(engine, self).work_batch(events, msgs)
+
     def work(self, event, *args, **kwargs):
         mCrit = 'PROC_CRITICAL'
         mWarn = 'PROC_WARNING'
@@ -30,6 +30,13 @@ from traceback import format_exc, print_exc
 
 from itertools import cycle
 
+try:
+    from threading import Thread, Lock
+except ImportError:
+    from dummy_threading import Thread, Lock
+
+from Queue import Queue, Empty
+
 from logging import INFO, DEBUG, FileHandler, Formatter
 
 from time import time, sleep
@@ -57,8 +64,25 @@ class Engine(object):
         routing_keys=[],
         camqp_custom=None,
         max_retries=5,
+        batch_size=1,
+        batch_timeout=0.5,
+        batch_workers=1,
+        no_ack=True,
+        prefetch_count=0,
         *args, **kwargs
     ):
+        """
+        :param int batch_size: maximal number of events given to
+            ``work_batch`` at once. Batch mode is disabled if lower than 2.
+        :param float batch_timeout: maximal time in seconds to wait for a
+            batch to be filled before processing it.
+        :param int batch_workers: number of threads processing batches.
+        :param bool no_ack: if False, events are acknowledged once processed,
+            and delivered again by the broker if the engine crashes before.
+        :param int prefetch_count: maximal number of unacknowledged events
+            delivered to the engine (0 means no limit). Requires no_ack to be
+            False, and should be greater than batch_size.
+        """
 
         super(Engine, self).__init__()
 
@@ -111,6 +135,16 @@ class Engine(object):
         self.counter_error = 0
         self.counter_event = 0
         self.counter_worktime = 0
+        self.counter_lock = Lock()
+
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.batch_workers = batch_workers
+        self.batch_queue = None
+        self.batch_threads = []
+
+        self.no_ack = no_ack
+        self.prefetch_count = prefetch_count
 
         self.thd_warn_sec_per_evt = 0.6
         self.thd_crit_sec_per_evt = 0.9
@@ -126,6 +160,14 @@ class Engine(object):
 
         self.last_stat = int(time())
 
+        if prefetch_count and no_ack:
+            self.logger.warning('prefetch_count is ignored when no_ack is set')
+
+        elif 1 < batch_size and 0 < prefetch_count < batch_size:
+            self.logger.warning(
+                'prefetch_count lower than batch_size prevents full batches'
+            )
+
         self.logger.info("Engine initialized")
 
     def new_amqp_queue(
@@ -136,9 +178,10 @@ class Engine(object):
             routing_keys=routing_keys,
             callback=on_amqp_event,
             exchange_name=exchange_name,
-            no_ack=True,
+            no_ack=self.no_ack,
             exclusive=False,
-            auto_delete=False
+            auto_delete=False,
+            prefetch_count=0 if self.no_ack else self.prefetch_count
         )
 
     def pre_run(self):
@@ -168,10 +211,14 @@ class Engine(object):
                 self.exchange_name
             )
 
-        self.amqp.start()
-
+        # before batch threads, in order to let pre_run fork processes
         self.pre_run()
 
+        if self.batch_size > 1:
+            self.start_batch_workers()
+
+        self.amqp.start()
+
         while self.RUN:
             # Beat
             if self.beat_interval:
@@ -199,6 +246,11 @@ class Engine(object):
         self.logger.info("End of Engine")
 
     def on_amqp_event(self, event, msg):
+        if self.batch_queue is not None:
+            # blocks the consumer thread while workers are busy
+            self.batch_queue.put((event, msg))
+            return
+
         try:
             self._work(event, msg)
 
@@ -210,6 +262,37 @@ class Engine(object):
 
             self.next_queue(event)
 
+        finally:
+            self.ack([msg])
+
+    def ack(self, msgs):
+        """Acknowledge processed amqp messages if no_ack is not set.
+
+        With a single batch worker and a single consumed queue, messages are
+        processed in delivery order and are acknowledged at once with the
+        last one. Otherwise, the channel may have delivered messages of
+        other queues, which are not processed yet, so each message is
+        acknowledged alone.
+
+        :param list msgs: amqp messages in delivery order.
+        """
+
+        if self.no_ack:
+            return
+
+        msgs = [msg for msg in msgs if msg is not None]
+
+        if not msgs:
+            return
+
+        if len(msgs) > 1 and self.batch_workers == 1 \
+                and len(self.amqp.queues) == 1:
+            self.amqp.ack(msgs[-1], multiple=True, count=len(msgs))
+
+        else:
+            for msg in msgs:
+                self.amqp.ack(msg)
+
     def _work(self, event, msg=None, *args, **kargs):
         start = time()
         error = False
@@ -234,20 +317,165 @@ class Engine(object):
             self.logger.error("Worker raise exception: {0}".format(err))
             self.logger.error(format_exc())
 
-        if error:
-            self.counter_error += 1
-
         elapsed = time() - start
 
         if elapsed > 3:
             self.logger.warning("Elapsed time %.2f seconds" % elapsed)
 
-        self.counter_event += 1
-        self.counter_worktime += elapsed
+        self.count(events=1, errors=int(error), worktime=elapsed)
+
+    def count(self, events=0, errors=0, worktime=0):
+        """Update engine statistics counters in a thread-safe way."""
+
+        with self.counter_lock:
+            self.counter_event += events
+            self.counter_error += errors
+            self.counter_worktime += worktime
 
     def work(self, event, amqp_msg):
         return event
 
+    def start_batch_workers(self):
+        """Start threads in charge of processing batches of events."""
+
+        self.batch_queue = Queue(
+            maxsize=self.batch_size * self.batch_workers * 2
+        )
+
+        for i in range(self.batch_workers):
+            thread = Thread(
+                target=self._batch_loop,
+                name='{0}-batch-{1}'.format(self.name, i)
+            )
+            thread.daemon = True
+            thread.start()
+
+            self.batch_threads.append(thread)
+
+        self.logger.info(
+            "Batch mode: {0} worker(s), {1} event(s) per batch".format(
+                self.batch_workers, self.batch_size
+            )
+        )
+
+    def stop_batch_workers(self):
+        """Wait for batch workers to process remaining events."""
+
+        for thread in self.batch_threads:
+            thread.join()
+
+        self.batch_threads = []
+
+    def _batch_loop(self):
+        while self.RUN or not self.batch_queue.empty():
+            batch = self._next_batch()
+
+            if batch:
+                events = [item[0] for item in batch]
+                msgs = [item[1] for item in batch]
+
+                self._work_batch(events, msgs)
+
+    def _next_batch(self):
+        """Get at most batch_size events, waiting at most batch_timeout."""
+
+        batch = []
+        deadline = time() + self.batch_timeout
+
+        while len(batch) < self.batch_size:
+            timeout = deadline - time()
+
+            if timeout <= 0:
+                break
+
+            try:
+                batch.append(self.batch_queue.get(timeout=timeout))
+
+            except Empty:
+                break
+
+        return batch
+
+    def _work_batch(self, events, msgs):
+        start = time()
+        errors = 0
+
+        if self.debug:
+            for event in events:
+                event.setdefault('processing', {})[self.etype] = start
+
+        try:
+            wevents = self.work_batch(events, msgs)
+
+        except Exception as err:
+            errors = len(events)
+            wevents = []
+            self.logger.error("Worker raise exception: {0}".format(err))
+            self.logger.error(format_exc())
+
+        outgoing = []
+
+        for event, wevent in zip(events, wevents):
+            if wevent != DROP:
+                if isinstance(wevent, dict):
+                    event = wevent
+
+                outgoing.append(event)
+
+        if outgoing:
+            try:
+                self.next_queue_batch(outgoing)
+
+            except Exception as err:
+                self.logger.error(
+                    "Impossible to publish {0} event(s): {1}".format(
+                        len(outgoing), err
+                    )
+                )
+
+        elapsed = time() - start
+
+        if elapsed > 3:
+            self.logger.warning(
+                "Elapsed time %.2f seconds for %d events" % (
+                    elapsed, len(events)
+                )
+            )
+
+        self.count(events=len(events), errors=errors, worktime=elapsed)
+
+        self.ack(msgs)
+
+    def work_batch(self, events, msgs):
+        """Process a batch of events.
+
+        Default implementation calls ``work`` on every event. Engines able to
+        amortize their processing (bulk storage access, etc.) should override
+        it.
+
+        :param list events: events to process.
+        :param list msgs: amqp messages related to events.
+        :return: one ``work`` result per event (``DROP``, a new event or
+            anything else in order to forward the original event).
+        :rtype: list
+        """
+
+        result = []
+
+        for event, msg in zip(events, msgs):
+            try:
+                wevent = self.work(event, msg)
+
+            except Exception as err:
+                self.logger.error("Worker raise exception: {0}".format(err))
+                self.logger.error(format_exc())
+                self.count(errors=1)
+                wevent = DROP
+
+            result.append(wevent)
+
+        return result
+
     def next_queue(self, event):
         if self.next_balanced:
             queue_name = self.get_amqp_queue.next()
@@ -264,6 +492,22 @@ class Engine(object):
                     exchange="amq.direct"
                 )
 
+    def next_queue_batch(self, events):
+        if self.next_balanced:
+            queue_name = self.get_amqp_queue.next()
+            if queue_name:
+                publish_batch(
+                    publisher=self.amqp, events=events, rk=queue_name,
+                    exchange='amq.direct'
+                )
+
+        else:
+            for queue_name in self.next_amqp_queues:
+                publish_batch(
+                    publisher=self.amqp, events=events, rk=queue_name,
+                    exchange="amq.direct"
+                )
+
     def _beat(self):
         now = int(time())
 
@@ -305,6 +549,8 @@ class Engine(object):
                         'crit': self.thd_crit_sec_per_evt}
                 ]
 
+                perf_data_array += self.queue_perf_data()
+
                 self.logger.debug(" + State: {0}".format(state))
 
                 event = forger(
@@ -322,9 +568,10 @@ class Engine(object):
 
                 publish(event=event, publisher=self.amqp)
 
-            self.counter_error = 0
-            self.counter_event = 0
-            self.counter_worktime = 0
+            with self.counter_lock:
+                self.counter_error = 0
+                self.counter_event = 0
+                self.counter_worktime = 0
 
         try:
             self.beat()
@@ -336,6 +583,41 @@ class Engine(object):
         finally:
             self.beat_lock = False
 
+    def queue_perf_data(self):
+        """Get queue depth and consumer lag metrics.
+
+        The lag is the number of events received by the engine and not yet
+        processed.
+        """
+
+        result = []
+
+        stats = self.amqp.get_stats()
+        depth = stats['depths'].get(self.amqp_queue)
+
+        if depth is not None:
+            result.append({
+                'retention': self.perfdata_retention,
+                'metric': 'cps_queue_depth',
+                'value': depth, 'unit': 'evt'})
+
+        if not self.no_ack:
+            lag = stats['unacked']
+
+        elif self.batch_queue is not None:
+            lag = self.batch_queue.qsize()
+
+        else:
+            lag = None
+
+        if lag is not None:
+            result.append({
+                'retention': self.perfdata_retention,
+                'metric': 'cps_queue_lag',
+                'value': lag, 'unit': 'evt'})
+
+        return result
+
     def beat(self):
         pass
 
@@ -345,6 +627,9 @@ class Engine(object):
         # cancel self consumer
         self.amqp.cancel_queues()
 
+        # process buffered events before closing the connection
+        self.stop_batch_workers()
+
         self.amqp.stop()
         self.amqp.join()
         self.logger.debug(" + Stopped")
@@ -516,3 +801,30 @@ def publish(event, publisher, rk=None, exchange=None, logger=None, **kwargs):
     publisher.publish(
         event, rk, exchange
     )
+
+
+@register_task
+def publish_batch(
+    events, publisher, rk=None, exchange=None, logger=None, **kwargs
+):
+    """Task dedicated to publish several events at once from an engine.
+
+    :param list events: events to send.
+    :param publisher: object in charge of publishing events. Its method
+        ``publish_batch`` takes a list of ``(event, rk)`` and an
+        ``exchange name``.
+
+    :param str rk: routing key to use. If None, use get_routingkey(event).
+    :param str exchange: exchange name. If None, use
+        ``publisher.exchange_name_events``.
+    """
+
+    if exchange is None:
+        exchange = publisher.exchange_name_events
+
+    msgs = [
+        (event, get_routingkey(event) if rk is None else rk)
+        for event in events
+    ]
+
+    publisher.publish_batch(msgs, exchange)
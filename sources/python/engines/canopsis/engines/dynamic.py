@@ -36,11 +36,17 @@ class engine(Engine, Configurable):
     configuration properties.
 
     :var str event_processing: event processing event_processing path.
+    :var str batch_processing: batch processing path, used instead of
+        event_processing on batches of events if batch_size > 1.
+    :var str init_processing: initialization processing path, executed
+        before consuming events.
     :var dict params: event processing event_processing parameters.
     """
 
     EVENT_PROCESSING = 'event_processing'  #: event_processing field name
     BEAT_PROCESSING = 'beat_processing'  #: beat_processing field name
+    BATCH_PROCESSING = 'batch_processing'  #: batch_processing field name
+    INIT_PROCESSING = 'init_processing'  #: init_processing field name
     PARAMS = 'params'  #: event processing params field name
 
     NEXT_AMQP_QUEUES = 'next_amqp_queues'  #: next amqp queues
@@ -55,6 +61,8 @@ class engine(Engine, Configurable):
         self,
         event_processing=None,
         beat_processing=None,
+        batch_processing=None,
+        init_processing=None,
         params=None,
         *args,
         **kwargs
@@ -64,6 +72,8 @@ class engine(Engine, Configurable):
 
         self.event_processing = event_processing
         self.beat_processing = beat_processing
+        self.batch_processing = batch_processing
+        self.init_processing = init_processing
         self.params = params
 
     @property
@@ -130,6 +140,66 @@ class engine(Engine, Configurable):
         # set _beat_processing and work
         self._beat_processing = value
 
+    @property
+    def batch_processing(self):
+        """
+        Task executed on batches of events
+        """
+
+        return self._batch_processing
+
+    @batch_processing.setter
+    def batch_processing(self, value):
+        """
+        Change of batch_processing.
+
+        :param value: new batch_processing to use. If None or wrong value,
+            event_processing is called on every event of batches
+        :type value: NoneType, str or function
+        """
+
+        # if str, load the related function
+        if isinstance(value, basestring):
+            try:
+                value = get_task(value)
+            except ImportError:
+                self.logger.error('Impossible to load %s' % value)
+                value = None
+
+        self._batch_processing = value
+
+    @property
+    def init_processing(self):
+        """
+        Task executed before consuming events
+        """
+
+        return self._init_processing
+
+    @init_processing.setter
+    def init_processing(self, value):
+        """
+        Change of init_processing.
+
+        :param value: new init_processing to use. If None or wrong value,
+            nothing is executed before consuming events
+        :type value: NoneType, str or function
+        """
+
+        # if str, load the related function
+        if isinstance(value, basestring):
+            try:
+                value = get_task(value)
+            except ImportError:
+                self.logger.error('Impossible to load %s' % value)
+                value = None
+
+        self._init_processing = value
+
+    def pre_run(self):
+        if self._init_processing is not None:
+            self._init_processing(engine=self, logger=self.logger)
+
     def work(self, event, msg, *args, **kwargs):
 
         result = self._event_processing(
@@ -139,6 +209,19 @@ class engine(Engine, Configurable):
 
         return result
 
+    def work_batch(self, events, msgs, *args, **kwargs):
+
+        if self._batch_processing is None:
+            result = super(engine, self).work_batch(events, msgs)
+
+        else:
+            result = self._batch_processing(
+                engine=self, events=events, msgs=msgs, logger=self.logger,
+                *args, **kwargs
+            )
+
+        return result
+
     def beat(self, *args, **kwargs):
         self._beat_processing(
             engine=self, logger=self.logger,
@@ -178,6 +261,8 @@ class engine(Engine, Configurable):
             new_content=(
                 Parameter(engine.EVENT_PROCESSING),
                 Parameter(engine.BEAT_PROCESSING),
+                Parameter(engine.BATCH_PROCESSING),
+                Parameter(engine.INIT_PROCESSING),
                 Parameter(engine.PARAMS, parser=eval),
                 Parameter(engine.NEXT_AMQP_QUEUES),
                 Parameter(engine.NEXT_BALANCED),
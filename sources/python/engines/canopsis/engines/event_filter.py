@@ -18,15 +18,114 @@
 # along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
 # ---------------------------------
 
+from canopsis.common.init import basestring
 from canopsis.engines.core import Engine, DROP, publish
 
 from canopsis.old.account import Account
 from canopsis.old.storage import get_storage
 from canopsis.event import forger, get_routingkey
-from canopsis.old.mfilter import check
+from canopsis.old.mfilter import compile_mfilter
 
 import json
 from time import time
+from heapq import merge
+
+
+class RuleIndex(object):
+    """Index rules on event fields they pin with an equality, in order to
+    only check rules which can match an event.
+
+    Candidate rules are given in their original (priority) order.
+    """
+
+    KEYS = ('connector', 'component', 'event_type')  #: indexed fields
+
+    def __init__(self, rules, keys=KEYS):
+        """
+        :param list rules: rules sorted by priority.
+        :param tuple keys: event fields to index.
+        """
+
+        super(RuleIndex, self).__init__()
+
+        self.rules = rules
+        self.keys = keys
+
+        # positions of rules which can not be indexed
+        self.generic = []
+        # positions of rules by pinned value by field
+        self.index = dict((key, {}) for key in keys)
+
+        for position, rule in enumerate(rules):
+            mfilter = rule.get('mfilter')
+
+            # rules with an empty filter never match
+            if not mfilter:
+                continue
+
+            key, value = self.pinned(mfilter)
+
+            if key is None:
+                self.generic.append(position)
+
+            else:
+                self.index[key].setdefault(value, []).append(position)
+
+    def pinned(self, mfilter):
+        """Get the first indexed field and value required by a filter.
+
+        :return: (field, value) or (None, None) if the filter does not pin
+            any indexed field.
+        """
+
+        # $and and $or lists may stop the filter check before other keys
+        if (
+            not isinstance(mfilter, dict)
+            or '$and' in mfilter
+            or '$or' in mfilter
+        ):
+            return None, None
+
+        for key in self.keys:
+            if key in mfilter:
+                value = mfilter[key]
+
+                if isinstance(value, dict):
+                    if list(value.keys()) != ['$eq']:
+                        continue
+
+                    value = value['$eq']
+
+                try:
+                    hash(value)
+
+                except TypeError:
+                    continue
+
+                return key, value
+
+        return None, None
+
+    def candidates(self, event):
+        """Get rules which can match an event, in priority order."""
+
+        lists = [self.generic]
+
+        for key in self.keys:
+            if key in event:
+                try:
+                    positions = self.index[key].get(event[key])
+
+                except TypeError:
+                    positions = None
+
+                if positions:
+                    lists.append(positions)
+
+        positions = self.generic if len(lists) == 1 else merge(*lists)
+
+        return (self.rules[position] for position in positions)
+
 
 
 class engine(Engine):
@@ -42,6 +141,8 @@ class engine(Engine):
         self.name = kargs['name']
         self.drop_event_count = 0
         self.pass_event_count = 0
+        self.compiled_mfilters = {}
+        self.rule_index = None
 
     def pre_run(self):
         self.beat()
@@ -232,6 +333,28 @@ class engine(Engine):
             #publish(publisher=self.amqp, event=job, rk='Engine_scheduler')
         return True
 
+    def match(self, rule, event):
+        """Check if an event matches a rule filter, compiling it if needed."""
+
+        compiled = rule.get('compiled_mfilter')
+
+        if compiled is None:
+            compiled = rule['compiled_mfilter'] = compile_mfilter(
+                rule['mfilter']
+            )
+
+        return compiled(event)
+
+    def candidate_rules(self, event):
+        """Get configured rules which can match an event."""
+
+        rules = self.configuration.get('rules', [])
+
+        if self.rule_index is None or self.rule_index.rules is not rules:
+            self.rule_index = RuleIndex(rules)
+
+        return self.rule_index.candidates(event)
+
     def apply_actions(self, event, actions):
         pass_event = False
         actionMap = {'drop': self.a_drop,
@@ -259,21 +382,20 @@ class engine(Engine):
 
         # list of actions supported
 
-        rules = self.configuration.get('rules', [])
         to_apply = []
 
         self.logger.debug(u'event {}'.format(event))
 
         # When list configuration then check black and
         # white lists depending on json configuration
-        for filterItem in rules:
+        for filterItem in self.candidate_rules(event):
             actions = filterItem.get('actions')
             name = filterItem.get('name', 'no_name')
 
             self.logger.debug(u'rule {}'.format(filterItem))
             self.logger.debug(u'filter is {}'.format(filterItem['mfilter']))
             # Try filter rules on current event
-            if filterItem['mfilter'] and check(filterItem['mfilter'], event):
+            if filterItem['mfilter'] and self.match(filterItem, event):
 
                 self.logger.debug(
                     u'Event: {}, filter matches'.format(event['rk'])
@@ -330,11 +452,15 @@ class engine(Engine):
             sort='priority'
         )
 
+        compiled_mfilters = {}
+
         for record in records:
 
             record_dump = record.dump()
             self.set_loaded(record_dump)
 
+            raw_mfilter = record_dump['mfilter']
+
             try:
                 record_dump["mfilter"] = json.loads(record_dump["mfilter"])
             except Exception:
@@ -344,10 +470,23 @@ class engine(Engine):
 
                 ))
 
+            # only compile filters which changed since last reload
+            if isinstance(raw_mfilter, basestring):
+                compiled = self.compiled_mfilters.get(raw_mfilter)
+
+                if compiled is None:
+                    compiled = compile_mfilter(record_dump['mfilter'])
+
+                compiled_mfilters[raw_mfilter] = compiled
+                record_dump['compiled_mfilter'] = compiled
+
             self.logger.debug('Loading record_dump:')
             self.logger.debug(record_dump)
             self.configuration['rules'].append(record_dump)
 
+        self.compiled_mfilters = compiled_mfilters
+        self.rule_index = RuleIndex(self.configuration['rules'])
+
         self.logger.info(
             'Loaded {} rules'.format(len(self.configuration['rules']))
         )
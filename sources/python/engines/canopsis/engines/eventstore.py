@@ -19,7 +19,9 @@
 # ---------------------------------
 
 from canopsis.engines.core import Engine, publish
-from canopsis.check.archiver import Archiver, BAGOT, STEALTHY
+from canopsis.check.archiver import (
+    Archiver, BAGOT, STEALTHY, EXTERNAL_EVENT_TYPES
+)
 from canopsis.context.manager import Context
 from canopsis.pbehavior.manager import PBehaviorManager
 from canopsis.old.storage import CONFIG
@@ -53,6 +55,15 @@ class engine(Engine):
         self.last_bulk_insert_date = time()
         self.events_log_buffer = []
 
+    def pre_run(self):
+        self.archiver.start()
+
+    def stop(self):
+        super(engine, self).stop()
+
+        # flush events buffered before the consumer cancellation
+        self.archiver.stop()
+
     def beat(self):
         self.archiver.beat()
 
@@ -125,6 +136,13 @@ class engine(Engine):
 
         event_type = event['event_type']
 
+        if event_type in EXTERNAL_EVENT_TYPES:
+            # the referenced event was written by another engine
+            ref_rk = event.get('ref_rk', event.get('referer'))
+
+            if ref_rk is not None:
+                self.archiver.invalidate_devent(ref_rk)
+
         if event_type not in self.event_types:
             self.logger.warning(
                 "Unknown event type '{}', id: '{}', event:\n{}".format(
@@ -22,11 +22,21 @@ from canopsis.engines.core import Engine, publish
 from canopsis.old.storage import get_storage
 from canopsis.old.account import Account
 from canopsis.old.record import Record
-from canopsis.downtime.selector import Selector
+from canopsis.downtime.selector import (
+    Selector, SelectorState, CHECK_TYPES, get_contribution
+)
+from canopsis.downtime.process import DOWNTIME
 from canopsis.sla import Sla
 from canopsis.event import get_routingkey
+from canopsis.old.mfilter import compile_mfilter
+from os import getpid
 from time import time
 
+try:
+    from threading import Lock
+except ImportError:
+    from dummy_threading import Lock
+
 
 class engine(Engine):
     """
@@ -36,26 +46,234 @@ class engine(Engine):
         worst state is then computed on the selected event set and a new event
         holding this information is produced. This computation is triggered
         each time the crecord dispatcher emit a crecord event of selector type.
+
+        In incremental mode, selector states are kept in memory and updated
+        from stored events published on the alerts exchange. States are
+        reconciled with the database every reconcile_interval seconds.
+
+        :param bool incremental: enable the incremental mode.
+        :param int reconcile_interval: seconds between two reconciliations of
+            a selector state in incremental mode.
     """
 
     etype = 'selector'
 
-    def __init__(self, *args, **kargs):
+    DEFAULT_RECONCILE_INTERVAL = 600
+
+    def __init__(
+        self,
+        incremental=False,
+        reconcile_interval=DEFAULT_RECONCILE_INTERVAL,
+        *args, **kargs
+    ):
         super(engine, self).__init__(*args, **kargs)
 
         self.selectors = []
         self.thd_warn_sec_per_evt = 1.5
         self.thd_crit_sec_per_evt = 2
 
+        self.incremental = incremental
+        self.reconcile_interval = reconcile_interval
+
         self.storage = get_storage(
             namespace='object',
             account=Account(user="root", group="root")
         )
 
+        self.downtime = None
+        self.downtime_ts = 0
+
+        # incremental mode: (state, reconciliation date, matcher) by selector
+        # id, and last contributions of events by id
+        self.states = {}
+        self.known = {}
+        self.states_lock = Lock()
+
+    @property
+    def incremental(self):
+        return self._incremental
+
+    @incremental.setter
+    def incremental(self, value):
+        # value may be a string when set from the engine configuration
+        if isinstance(value, basestring):
+            value = value.lower() in ('1', 'true', 'yes', 'on')
+
+        self._incremental = value
+
+    @property
+    def reconcile_interval(self):
+        return self._reconcile_interval
+
+    @reconcile_interval.setter
+    def reconcile_interval(self, value):
+        self._reconcile_interval = int(value)
+
+    def new_amqp_queue(self, *args, **kwargs):
+        super(engine, self).new_amqp_queue(*args, **kwargs)
+
+        if self.incremental:
+            # every engine process needs all stored events
+            self.amqp.add_queue(
+                '{0}_events_{1}'.format(self.amqp_queue, getpid()),
+                ['#'],
+                self.on_stored_event,
+                self.amqp.exchange_name_alerts
+            )
+
+    def has_downtime(self, selector):
+        """Check if entities are in downtime, at most once per beat interval.
+
+        :param Selector selector: selector used to check downtimes.
+        """
+
+        now = time()
+
+        if self.downtime is None or \
+                now - self.downtime_ts >= self.beat_interval:
+            downtime = selector.has_downtime()
+
+            if downtime != self.downtime and self.downtime is not None:
+                # selected events change, states have to be reconciled
+                with self.states_lock:
+                    self.states = {}
+
+            self.downtime = downtime
+            self.downtime_ts = now
+
+        return self.downtime
+
+    def on_stored_event(self, event, msg):
+        """Update selector states with a stored event."""
+
+        start = time()
+        errors = 0
+
+        try:
+            self.update_states(event)
+
+        except Exception as err:
+            self.logger.error(
+                u'Impossible to update selector states: {0}'.format(err)
+            )
+            errors = 1
+
+        self.count(events=1, errors=errors, worktime=time() - start)
+
+    def update_states(self, event):
+        """Update selector states with a stored event.
+
+        Acknowledgements are not in check events, so they are taken from ack
+        and ackremove events, and are reset when events are back to a normal
+        state like the archiver does. The bagot status is not in check events
+        either, so it is only taken from reconciliations.
+
+        :param dict event: event published by the eventstore engine.
+        """
+
+        event_type = event.get('event_type')
+
+        with self.states_lock:
+            if event_type in ('ack', 'ackremove'):
+                _id = event.get('referer', event.get('ref_rk'))
+                known = self.known.get(_id)
+
+                if known is not None:
+                    contribution = (known[0], event_type == 'ack', known[2])
+                    self.known[_id] = contribution
+
+                    for state, _, _ in self.states.values():
+                        if _id in state.contributions:
+                            state.update(_id, contribution)
+
+            elif event_type in CHECK_TYPES:
+                _id = event.setdefault('_id', event['rk'])
+                known = self.known.get(_id)
+
+                state, ack, _ = get_contribution(event)
+
+                if 'ack' not in event:
+                    ack = known is not None and known[1] and state != 0
+
+                # the bagot status is computed by the archiver, and stored
+                # events only get it from reconciliations
+                infobagot = known is not None and known[2] and state == 0
+
+                contribution = state, ack, infobagot
+                self.known[_id] = contribution
+
+                downtime = self.downtime and event.get(DOWNTIME, False)
+
+                for state, _, match in self.states.values():
+                    if match is not None and not downtime and match(event):
+                        state.update(_id, contribution)
+
+                    else:
+                        state.update(_id)
+
+    def get_state(self, selector):
+        """Get the in memory state of a selector, reconciled with the
+        database when its filter changed or reconcile_interval elapsed.
+
+        :param Selector selector: selector to get the state.
+        :return: state as returned by Selector.getState.
+        :rtype: tuple
+        """
+
+        now = time()
+        downtime = self.has_downtime(selector)
+        mfilter = selector.get_check_filter(downtime=False)
+
+        with self.states_lock:
+            state, timestamp, match = self.states.get(
+                selector._id, (None, None, None)
+            )
+
+            expired = timestamp is None or \
+                now - timestamp >= self.reconcile_interval
+
+            if expired or getattr(match, 'mfilter', None) != mfilter:
+                contributions = selector.get_contributions(downtime=downtime)
+
+                if contributions is None:
+                    state, match = SelectorState(), None
+
+                else:
+                    state = SelectorState(contributions)
+                    self.known.update(contributions)
+                    match = compile_mfilter(mfilter)
+
+                    # keep the filter to detect changes
+                    match.mfilter = mfilter
+
+                self.states[selector._id] = state, now, match
+
+        if match is None:
+            return ({}, 0, 0, 0, 0)
+
+        return state.get_state()
+
+    def clean_states(self):
+        """Remove states of selectors which were not reconciled since two
+        intervals, e.g. removed selectors."""
+
+        deadline = time() - 2 * self.reconcile_interval
+
+        with self.states_lock:
+            for _id in list(self.states):
+                if self.states[_id][1] < deadline:
+                    del self.states[_id]
+
+            if not self.states:
+                self.known = {}
+
     def get_selectors(self):
         return self.storage.find({'crecord_type': 'selector'})
 
     def beat(self):
+        if self.incremental:
+            self.clean_states()
+
         with self.Lock(self, 'selector_processing') as l:
             if l.own():
                 events = [
@@ -86,7 +304,15 @@ class engine(Engine):
 
         # Selector event have to be published when do state is true.
         if selector.dostate:
-            rk, event, publish_ack = selector.event()
+            if self.incremental:
+                state = self.get_state(selector)
+
+            else:
+                state = selector.getState(
+                    downtime=self.has_downtime(selector)
+                )
+
+            rk, event, publish_ack = selector.event(state)
 
             # Compute previous event to know if any difference next turn
             selector.data['previous_metrics'] = {
@@ -22,7 +22,7 @@ from canopsis.engines.core import Engine
 from canopsis.old.storage import get_storage
 from canopsis.old.account import Account
 from canopsis.downtime.selector import Selector
-from canopsis.old.mfilter import check
+from canopsis.old.mfilter import compile_mfilter
 
 
 class engine(Engine):
@@ -79,6 +79,7 @@ class engine(Engine):
 
                 # tag field is defined here only
                 selector.tags = []
+                selector.match = compile_mfilter(selector.mfilter)
 
                 for selector_tag in ['crecord_name', 'display_name']:
                     if (selector_tag in selector_dump
@@ -134,7 +135,7 @@ class engine(Engine):
             )
 
             if selector.mfilter:
-                cfilter = check(selector.mfilter, event)
+                cfilter = selector.match(event)
 
             if 'rk' in event:
                 if event['rk'] not in selector.exclude_ids and (
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# --------------------------------
+# Copyright (c) 2015 "Capensis" [http://www.capensis.com]
+#
+# This file is part of Canopsis.
+#
+# Canopsis is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Canopsis is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
+# ---------------------------------
+
+
+from unittest import TestCase, main
+from logging import ERROR
+
+from canopsis.engines.collectdgw import engine
+from canopsis.engines.collectd_utils.parser import PutvalParser
+
+
+class CamqpMock(object):
+
+    exchange_name_events = 'testexchange'
+
+    def __init__(self):
+        self.msgs = []
+
+    def publish_batch(self, msgs, exchange_name):
+        self.msgs += msgs
+
+
+class PutvalParserTest(TestCase):
+
+    def setUp(self):
+        self.parser = PutvalParser()
+
+    def test_parse(self):
+        component, resource, timestamp, perf_data_array = self.parser.parse(
+            'PUTVAL host/interface-eth0/if_octets interval=10 1450.7:12:34'
+        )
+
+        self.assertEqual(component, 'host')
+        self.assertEqual(resource, 'interface-eth0')
+        self.assertEqual(timestamp, 1450)
+        self.assertEqual(
+            perf_data_array,
+            [
+                {
+                    'metric': 'if_octets-rx', 'value': 12.0,
+                    'type': 'DERIVE', 'unit': 'o', 'min': '0', 'max': None
+                },
+                {
+                    'metric': 'if_octets-tx', 'value': 34.0,
+                    'type': 'DERIVE', 'unit': 'o', 'min': '0', 'max': None
+                }
+            ]
+        )
+
+    def test_parse_type_instance(self):
+        _, resource, _, perf_data_array = self.parser.parse(
+            'PUTVAL "my host/cpu-0/cpu-idle" interval=10 1450:98'
+        )
+
+        self.assertEqual(resource, 'cpu-0')
+        self.assertEqual(perf_data_array[0]['metric'], 'idle')
+        self.assertEqual(perf_data_array[0]['value'], 98.0)
+
+    def test_parse_invalid(self):
+        self.assertRaises(ValueError, self.parser.parse, 'GETVAL host/cpu')
+        self.assertRaises(
+            ValueError, self.parser.parse,
+            'PUTVAL host/cpu-0/unknown interval=10 1450:98'
+        )
+        self.assertRaises(
+            ValueError, self.parser.parse,
+            'PUTVAL host/cpu-0/cpu-idle interval=10 now:98'
+        )
+
+    def test_parse_invalid_value(self):
+        perf_data_array = self.parser.parse(
+            'PUTVAL host/interface-eth0/if_octets interval=10 1450:12:U'
+        )[3]
+
+        self.assertEqual(len(perf_data_array), 1)
+
+    def test_resolve_cache(self):
+        sources = self.parser.resolve('cpu-idle')
+
+        self.assertIs(self.parser.resolve('cpu-idle'), sources)
+        self.assertIsNone(self.parser.resolve('unknown'))
+
+
+class AggregationTest(TestCase):
+
+    def setUp(self):
+        self.engine = engine(logging_level=ERROR, aggregation_window='60')
+        self.engine.amqp = CamqpMock()
+
+    def test_aggregation_window(self):
+        self.assertEqual(self.engine.aggregation_window, 60.0)
+
+    def test_aggregate(self):
+        for body in [
+            'PUTVAL host/cpu-0/cpu-idle interval=10 1450:98',
+            'PUTVAL host/cpu-0/cpu-user interval=10 1450:1',
+            'PUTVAL host/cpu-1/cpu-idle interval=10 1450:97',
+            'PUTVAL host/cpu-0/cpu-idle interval=10 1460:99'
+        ]:
+            self.engine.on_collectd_event(body, None)
+
+        self.assertEqual(self.engine.amqp.msgs, [])
+
+        self.engine.flush()
+
+        events = [event for event, _ in self.engine.amqp.msgs]
+
+        self.assertEqual(len(events), 3)
+        self.assertEqual(
+            [perf['metric'] for perf in events[0]['perf_data_array']],
+            ['idle', 'user']
+        )
+        self.assertEqual(events[1]['resource'], 'cpu-1')
+        self.assertEqual(events[2]['timestamp'], 1460)
+
+    def test_no_aggregation(self):
+        self.engine.aggregation_window = 0
+
+        self.engine.on_collectd_event(
+            'PUTVAL host/cpu-0/cpu-idle interval=10 1450:98', None
+        )
+
+        self.assertEqual(len(self.engine.amqp.msgs), 1)
+
+    def test_counters(self):
+        self.engine.on_collectd_event(
+            'PUTVAL host/cpu-0/cpu-idle interval=10 1450:98', None
+        )
+        self.engine.on_collectd_event('PUTVAL invalid', None)
+
+        self.assertEqual(self.engine.counter_event, 2)
+        self.assertEqual(self.engine.counter_error, 1)
+
+
+if __name__ == '__main__':
+    main()
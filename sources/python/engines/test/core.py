@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# --------------------------------
+# Copyright (c) 2015 "Capensis" [http://www.capensis.com]
+#
+# This file is part of Canopsis.
+#
+# Canopsis is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Canopsis is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
+# ---------------------------------
+
+from unittest import TestCase, main
+from logging import ERROR
+
+from canopsis.engines.core import Engine, DROP
+
+
+# Simple mock for canopsis amqp class
+class CamqpMock(object):
+
+    exchange_name_events = 'testexchange'
+
+    def __init__(self):
+        self.published = []
+        self.acked = []
+        self.queues = {'Engine_batchtest': {}}
+
+    def publish_batch(self, msgs, exchange_name):
+        self.published.append((msgs, exchange_name))
+
+    def ack(self, message, multiple=False, count=1):
+        self.acked.append((message, multiple, count))
+
+
+class BatchEngine(Engine):
+
+    def work(self, event, amqp_msg):
+        if event.get('drop'):
+            return DROP
+
+        if event.get('fail'):
+            raise ValueError('fail')
+
+        event['worked'] = True
+
+        return event
+
+
+class BatchTest(TestCase):
+
+    def setUp(self):
+        self.engine = BatchEngine(
+            name='batchtest',
+            logging_level=ERROR,
+            next_amqp_queues=['Engine_next'],
+            batch_size=3
+        )
+        self.engine.amqp = CamqpMock()
+
+    def test_work_batch(self):
+        events = [{'id': 0}, {'id': 1, 'drop': True}, {'id': 2, 'fail': True}]
+
+        result = self.engine.work_batch(events, [None] * len(events))
+
+        self.assertEqual(result, [{'id': 0, 'worked': True}, DROP, DROP])
+        self.assertEqual(self.engine.counter_error, 1)
+
+    def test_work_batch_publish(self):
+        events = [{'id': 0}, {'id': 1, 'drop': True}, {'id': 2}]
+
+        self.engine._work_batch(events, [None] * len(events))
+
+        self.assertEqual(len(self.engine.amqp.published), 1)
+
+        msgs, exchange_name = self.engine.amqp.published[0]
+
+        self.assertEqual(exchange_name, 'amq.direct')
+        self.assertEqual(
+            [(msg['id'], rk) for msg, rk in msgs],
+            [(0, 'Engine_next'), (2, 'Engine_next')]
+        )
+        self.assertEqual(self.engine.counter_event, 3)
+
+    def test_ack(self):
+        self.engine._work_batch([{'id': 0}, {'id': 1}], ['msg0', 'msg1'])
+        self.assertEqual(self.engine.amqp.acked, [])
+
+        self.engine.no_ack = False
+        self.engine._work_batch([{'id': 0}, {'id': 1}], ['msg0', 'msg1'])
+        self.assertEqual(self.engine.amqp.acked, [('msg1', True, 2)])
+
+        self.engine.amqp.acked = []
+        self.engine.batch_workers = 2
+        self.engine._work_batch([{'id': 0}, {'id': 1}], ['msg0', 'msg1'])
+        self.assertEqual(
+            self.engine.amqp.acked, [('msg0', False, 1), ('msg1', False, 1)]
+        )
+
+    def test_ack_queues(self):
+        # another consumer shares the channel
+        self.engine.amqp.queues['Engine_batchtest_events'] = {}
+        self.engine.no_ack = False
+
+        self.engine._work_batch([{'id': 0}, {'id': 1}], ['msg0', 'msg1'])
+        self.assertEqual(
+            self.engine.amqp.acked, [('msg0', False, 1), ('msg1', False, 1)]
+        )
+
+    def test_next_batch(self):
+        self.engine.batch_timeout = 0.01
+        self.engine.start_batch_workers()
+        self.engine.RUN = False
+        self.engine.stop_batch_workers()
+
+        for i in range(4):
+            self.engine.batch_queue.put(({'id': i}, None))
+
+        self.assertEqual(len(self.engine._next_batch()), 3)
+        self.assertEqual(len(self.engine._next_batch()), 1)
+        self.assertEqual(self.engine._next_batch(), [])
+
+
+if __name__ == '__main__':
+    main()
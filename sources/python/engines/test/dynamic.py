@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# --------------------------------
+# Copyright (c) 2015 "Capensis" [http://www.capensis.com]
+#
+# This file is part of Canopsis.
+#
+# Canopsis is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Canopsis is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
+# ---------------------------------
+
+from unittest import TestCase, main
+from logging import ERROR
+
+from canopsis.engines.core import DROP
+from canopsis.engines.dynamic import engine
+
+
+def event_processing(engine, event, **kwargs):
+    if event.get('drop'):
+        return DROP
+
+    event['processed'] = True
+
+    return event
+
+
+class DynamicBatchTest(TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        self.engine = engine(
+            name='dynamictest',
+            logging_level=ERROR,
+            event_processing=event_processing,
+            batch_size=3
+        )
+
+    def batch_processing(self, engine, events, msgs, logger, **kwargs):
+        self.calls.append((engine, events, msgs))
+
+        return events
+
+    def init_processing(self, engine, logger, **kwargs):
+        self.calls.append(engine)
+
+    def test_work_batch_event_processing(self):
+        events = [{'id': 0}, {'id': 1, 'drop': True}]
+
+        result = self.engine.work_batch(events, [None, None])
+
+        self.assertEqual(result, [{'id': 0, 'processed': True}, DROP])
+        self.assertEqual(self.calls, [])
+
+    def test_work_batch_batch_processing(self):
+        self.engine.batch_processing = self.batch_processing
+
+        events = [{'id': 0}, {'id': 1}]
+        msgs = ['msg0', 'msg1']
+
+        result = self.engine.work_batch(events, msgs)
+
+        self.assertIs(result, events)
+        self.assertEqual(self.calls, [(self.engine, events, msgs)])
+        self.assertNotIn('processed', events[0])
+
+    def test_wrong_batch_processing(self):
+        self.engine.batch_processing = 'canopsis.engines.wrong.task'
+
+        self.assertIsNone(self.engine.batch_processing)
+
+    def test_pre_run(self):
+        self.engine.pre_run()
+
+        self.engine.init_processing = self.init_processing
+        self.engine.pre_run()
+
+        self.assertEqual(self.calls, [self.engine])
+
+
+if __name__ == '__main__':
+    main()
@@ -25,8 +25,8 @@ from unittest import TestCase, main
 
 from logging import DEBUG, INFO
 
-from canopsis.engines import DROP
-from canopsis.engines.event_filter import engine
+from canopsis.engines.core import DROP
+from canopsis.engines.event_filter import engine, RuleIndex
 
 # TODO, reset theses tests because they are not accurate and not clean
 
@@ -364,5 +364,31 @@ class KnownValues(TestCase):
         self.assertEqual(self.engine.work(event), event)
 
 
+class RuleIndexTest(TestCase):
+
+    def test_candidates(self):
+        rules = [
+            {'name': 'a', 'mfilter': {'connector': 'nagios'}},
+            {'name': 'b', 'mfilter': {'state': 1}},
+            {'name': 'c', 'mfilter': {'component': {'$eq': 'host'}}},
+            {'name': 'd', 'mfilter': {'$or': [{'connector': 'nagios'}]}},
+            {'name': 'e', 'mfilter': {}},
+            {'name': 'f', 'mfilter': {'connector': 'collectd'}}
+        ]
+        index = RuleIndex(rules)
+
+        event = {'connector': 'nagios', 'component': 'host'}
+        self.assertEqual(
+            [rule['name'] for rule in index.candidates(event)],
+            ['a', 'b', 'c', 'd']
+        )
+
+        event = {'connector': 'collectd', 'component': ['unhashable']}
+        self.assertEqual(
+            [rule['name'] for rule in index.candidates(event)],
+            ['b', 'd', 'f']
+        )
+
+
 if __name__ == "__main__":
     main()
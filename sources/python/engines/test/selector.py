@@ -20,6 +20,8 @@
 # ---------------------------------
 
 from unittest import TestCase, main
+from mock import MagicMock, patch
+from logging import ERROR
 
 from sys import path
 
@@ -28,6 +30,8 @@ from os.path import expanduser
 from canopsis.old.storage import get_storage
 from canopsis.old.account import Account
 from canopsis.engines.selector import engine
+from canopsis.downtime.selector import BAGOT
+from canopsis.downtime.process import DOWNTIME
 
 path.append(expanduser('~/opt/amqp2engines/engines/'))
 
@@ -66,5 +70,91 @@ class KnownValues(TestCase):
         self.engine.post_run()
         """
 
+
+class IncrementalTest(TestCase):
+    def setUp(self):
+        with patch('canopsis.engines.selector.get_storage'):
+            self.engine = engine(incremental=True, logging_level=ERROR)
+
+        self.selector = MagicMock()
+        self.selector._id = 'selector'
+        self.selector.has_downtime.return_value = False
+        self.selector.get_check_filter.return_value = {'component': 'c'}
+        self.selector.get_contributions.return_value = {
+            'c/r1': (2, False, False),
+            'c/r2': (0, False, True)
+        }
+
+        # reconciliation
+        self.engine.get_state(self.selector)
+
+    def check(self, resource, state, **kwargs):
+        event = {
+            'event_type': 'check',
+            'rk': 'c/{0}'.format(resource),
+            'component': 'c',
+            'resource': resource,
+            'state': state
+        }
+        event.update(kwargs)
+
+        self.engine.update_states(event)
+
+    def test_ack(self):
+        self.engine.update_states({'event_type': 'ack', 'ref_rk': 'c/r1'})
+
+        states, state, ack_count, _, _ = self.engine.get_state(self.selector)
+        self.assertEqual((states, state, ack_count), ({0: 1, 2: 1}, 2, 1))
+
+        # an alert keeps its acknowledgement
+        self.check('r1', 1)
+        self.assertEqual(self.engine.get_state(self.selector)[2], 1)
+
+        self.engine.update_states(
+            {'event_type': 'ackremove', 'referer': 'c/r1'}
+        )
+        self.assertEqual(self.engine.get_state(self.selector)[2], 0)
+
+        # a normal state resets the acknowledgement
+        self.engine.update_states({'event_type': 'ack', 'ref_rk': 'c/r1'})
+        self.check('r1', 0)
+        self.check('r1', 2)
+
+        states, state, ack_count, _, _ = self.engine.get_state(self.selector)
+        self.assertEqual((states, state, ack_count), ({0: 1, 2: 1}, 2, 0))
+
+    def test_bagot(self):
+        self.assertEqual(self.engine.get_state(self.selector)[4], 1)
+
+        # stored events do not change the reconciled bagot status
+        self.check('r2', 0, status=0)
+        self.check('r3', 0, status=BAGOT)
+
+        self.assertEqual(self.engine.get_state(self.selector)[4], 1)
+
+        self.check('r2', 2)
+
+        self.assertEqual(self.engine.get_state(self.selector)[4], 0)
+
+    def test_downtime(self):
+        self.engine.downtime = True
+        self.engine.downtime_ts = float('inf')
+
+        self.check('r1', 2, **{DOWNTIME: True})
+        self.check('r3', 1)
+
+        states, state, _, _, _ = self.engine.get_state(self.selector)
+        self.assertEqual((states, state), ({0: 1, 1: 1}, 1))
+
+    def test_unselected(self):
+        self.engine.update_states({
+            'event_type': 'check', 'rk': 'd/r1', 'component': 'd', 'state': 3
+        })
+        self.check('r1', 0, component='d')
+
+        states, state, _, _, _ = self.engine.get_state(self.selector)
+        self.assertEqual((states, state), ({0: 1}, 0))
+
+
 if __name__ == "__main__":
     main()
@@ -18,18 +18,35 @@
 # along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
 # ---------------------------------
 
+from canopsis.common.lru import LRUCache
 from canopsis.configuration.configurable.decorator import (
     conf_paths, add_category
   )
+from canopsis.configuration.model import Parameter
 from canopsis.middleware.registry import MiddlewareRegistry
 from canopsis.timeserie.timewindow import Interval
 
+from json import dumps
+from time import time
+
 CONF_PATH = 'event/eventlog.conf'
 CATEGORY = 'EVENTSLOG'
+CONTENT = [
+    Parameter('count_cache_size', int)
+]
+
+#: default maximal number of cached day counts
+DEFAULT_COUNT_CACHE_SIZE = 10000
+
+#: delay in seconds after which a day is closed, as events log are inserted
+#: in bulk by the eventstore engine
+CLOSED_DELAY = 60
+
+DAY = 3600 * 24
 
 
 @conf_paths(CONF_PATH)
-@add_category(CATEGORY)
+@add_category(CATEGORY, content=CONTENT)
 class EventsLog(MiddlewareRegistry):
 
     EVENTSLOG_STORAGE = 'eventslog_storage'
@@ -37,21 +54,53 @@ class EventsLog(MiddlewareRegistry):
     Manage events log in Canopsis
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, count_cache_size=None, *args, **kwargs):
 
         super(EventsLog, self).__init__(*args, **kwargs)
 
+        if count_cache_size is not None:
+            self.count_cache_size = count_cache_size
+
+    @property
+    def count_cache_size(self):
+        """Maximal number of cached counts of closed days. The cache is
+        disabled if not greater than 0."""
+
+        if not hasattr(self, '_count_cache_size'):
+            self.count_cache_size = None
+
+        return self._count_cache_size
+
+    @count_cache_size.setter
+    def count_cache_size(self, value):
+        if value is None:
+            value = DEFAULT_COUNT_CACHE_SIZE
+
+        self._count_cache_size = value
+        self._count_cache = LRUCache(max_size=value) if value > 0 else None
+
+    @property
+    def count_cache(self):
+        """Counts of closed days by (query, begin, end), None if disabled."""
+
+        if not hasattr(self, '_count_cache'):
+            self.count_cache_size = None
+
+        return self._count_cache
+
     def get_eventlog_count_by_period(
         self, tstart, tstop, limit=100, query={}
     ):
         """Get an eventlog count for each interval found in the given period and
            with a given filter.
            This period is given by tstart and tstop.
-           Counts can be limited thanks to the 'limit' parameter.
+
+           Counts are computed with one aggregation, and counts of closed
+           days are cached.
 
            :param start: begin interval timestamp
            :param stop: end interval timestamp
-           :param limit: number that limits the max count returned
+           :param limit: unused, kept for compatibility
            :param query: filter for events_log collection
            :return: list in which each item contains an interval and the
            related count
@@ -59,30 +108,109 @@ class EventsLog(MiddlewareRegistry):
         """
         period = {'day': 1}
         intervals = Interval.get_intervals_by_period(tstart, tstop, period)
-        results = []
-
-        for date in intervals:
-            eventfilter = {
-                '$and': [
-                    query,
-                    {
-                        'timestamp': {
-                            '$gte': date['begin'],
-                            '$lte': date['end']
-                        }
-                    }
-                ]
-            }
 
-            elements, count = self[EventsLog.EVENTSLOG_STORAGE].find_elements(
-                query=eventfilter,
-                limit=limit,
-                with_count=True
+        cache = self.count_cache
+        key = dumps(query, sort_keys=True, default=str)
+
+        if cache is None:
+            counts = [None] * len(intervals)
+
+        else:
+            counts = [
+                cache.get((key, date['begin'], date['end']))
+                for date in intervals
+            ]
+
+        missing = [
+            index for index, count in enumerate(counts) if count is None
+        ]
+
+        if missing:
+            first, last = missing[0], missing[-1]
+            deadline = time() - CLOSED_DELAY
+
+            computed = self._count_by_day(
+                query,
+                intervals[first]['begin'],
+                intervals[last]['end'],
+                last - first + 1
             )
 
-            results.append({
+            for index, count in enumerate(computed, first):
+                date = intervals[index]
+                counts[index] = count
+
+                if cache is not None and date['end'] <= deadline:
+                    cache[(key, date['begin'], date['end'])] = count
+
+        results = [
+            {
                 'date': date,
                 'count': count
-            })
+            }
+            for date, count in zip(intervals, counts)
+        ]
 
         return results
+
+    def _count_by_day(self, query, begin, end, days):
+        """Count events log of days from begin with one aggregation.
+
+        Like with one query by day, an events log at a day bound is counted
+        in both days.
+
+        :param dict query: filter for events_log collection.
+        :param int begin: first day begin timestamp.
+        :param int end: last day end timestamp.
+        :param int days: number of days.
+        :return: counts by day.
+        :rtype: list
+        """
+
+        offset = {'$subtract': ['$timestamp', begin]}
+
+        pipeline = [
+            {
+                '$match': {
+                    '$and': [
+                        query,
+                        {
+                            'timestamp': {
+                                '$gte': begin,
+                                '$lte': end
+                            }
+                        }
+                    ]
+                }
+            },
+            {
+                '$project': {
+                    '_id': 0,
+                    'offset': offset,
+                    'mod': {'$mod': [offset, DAY]}
+                }
+            },
+            {
+                '$group': {
+                    '_id': {'$subtract': ['$offset', '$mod']},
+                    'count': {'$sum': 1},
+                    'bound': {
+                        '$sum': {'$cond': [{'$eq': ['$mod', 0]}, 1, 0]}
+                    }
+                }
+            }
+        ]
+
+        counts = [0] * days
+
+        for group in self[EventsLog.EVENTSLOG_STORAGE].aggregate(pipeline):
+            index = int(group['_id'] // DAY)
+
+            if index < days:
+                counts[index] += group['count']
+
+            # events log at the begin of a day also end the previous one
+            if 0 < index <= days:
+                counts[index - 1] += group['bound']
+
+        return counts
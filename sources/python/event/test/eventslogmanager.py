@@ -41,10 +41,40 @@ class EventsLogTest(EventsLogManagerTest):
 
     def test_get_eventlog_count_by_period(self):
 
-        def mock_find(query={}, limit=100, with_count=True):
-            return None, 5
+        def mock_aggregate(pipeline):
+            return [
+                {'_id': 0, 'count': 5, 'bound': 0},
+                {'_id': 86400, 'count': 3, 'bound': 1}
+            ]
 
-        self.manager[EventsLog.EVENTSLOG_STORAGE].find_elements = mock_find
+        self.manager.count_cache.clear()
+        self.manager[EventsLog.EVENTSLOG_STORAGE].aggregate = mock_aggregate
+
+        result = self.manager.get_eventlog_count_by_period(
+            1433113200,
+            1435705200
+        )
+
+        self.assertEquals(len(result), 30)
+        # events log at the day bound are counted in both days
+        self.assertEquals(result[0].get('count'), 6)
+        self.assertEquals(result[1].get('count'), 3)
+        self.assertEquals(result[2].get('count'), 0)
+
+    def test_closed_days_cache(self):
+
+        def mock_aggregate(pipeline):
+            return [{'_id': 0, 'count': 5, 'bound': 0}]
+
+        self.manager.count_cache.clear()
+        self.manager[EventsLog.EVENTSLOG_STORAGE].aggregate = mock_aggregate
+
+        self.manager.get_eventlog_count_by_period(1433113200, 1435705200)
+
+        def fail_aggregate(pipeline):
+            raise AssertionError('closed days are cached')
+
+        self.manager[EventsLog.EVENTSLOG_STORAGE].aggregate = fail_aggregate
 
         result = self.manager.get_eventlog_count_by_period(
             1433113200,
@@ -53,5 +83,34 @@ class EventsLogTest(EventsLogManagerTest):
 
         self.assertEquals(result[0].get('count'), 5)
 
+    def test_disabled_cache(self):
+
+        calls = []
+
+        def mock_aggregate(pipeline):
+            calls.append(pipeline)
+            return [{'_id': 0, 'count': 5, 'bound': 0}]
+
+        self.manager[EventsLog.EVENTSLOG_STORAGE].aggregate = mock_aggregate
+
+        try:
+            self.manager.count_cache_size = 0
+
+            self.assertIsNone(self.manager.count_cache)
+
+            for _ in range(2):
+                result = self.manager.get_eventlog_count_by_period(
+                    1433113200,
+                    1435705200
+                )
+
+                self.assertEquals(result[0].get('count'), 5)
+
+            self.assertEquals(len(calls), 2)
+
+        finally:
+            self.manager.count_cache_size = None
+
+
 if __name__ == '__main__':
     main()
@@ -47,6 +47,12 @@ class PerfdataModule(MigrationModule):
             self.update_to_version_1()
             self.set_version('perfdata', 1)
 
+        if self.get_version('perfdata') < 2:
+            self.logger.info('Migrating to version 2')
+
+            self.update_to_version_2()
+            self.set_version('perfdata', 2)
+
     def update_to_version_1(self):
         storage = self.manager[PerfData.PERFDATA_STORAGE]
         nan = float('nan')
@@ -75,3 +81,10 @@ class PerfdataModule(MigrationModule):
             )
 
             self.manager.put(metric_id=metric_id, points=points, cache=False)
+
+    def update_to_version_2(self):
+        storage = self.manager[PerfData.PERFDATA_STORAGE]
+
+        if hasattr(storage, 'pack'):
+            count = storage.pack()
+            self.logger.info('{0} perfdata documents packed'.format(count))
@@ -23,6 +23,7 @@ from canopsis.configuration.configurable.decorator import conf_paths
 from canopsis.configuration.configurable.decorator import add_category
 from canopsis.configuration.model import Parameter
 from canopsis.middleware.core import Middleware
+from canopsis.serie.manager import Serie
 
 
 CONF_PATH = 'migration/serie.conf'
@@ -69,3 +70,11 @@ class SerieModule(MigrationModule):
         for item in items:
             item['computations_per_interval'] = 1
             self.storage.put_element(element=item, _id=item['_id'])
+
+        items = self.storage.find_elements(query={
+            'next_computation': {'$exists': False}
+        })
+
+        for item in items:
+            item['next_computation'] = Serie.get_next_computation(item)
+            self.storage.put_element(element=item, _id=item['_id'])
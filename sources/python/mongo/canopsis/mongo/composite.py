@@ -24,6 +24,8 @@ from canopsis.mongo.core import MongoStorage
 from canopsis.storage.core import Storage
 from canopsis.storage.composite import CompositeStorage
 
+from pymongo.bulk import BulkOperationBuilder
+
 
 class MongoCompositeStorage(MongoStorage, CompositeStorage):
 
@@ -144,6 +146,42 @@ class MongoCompositeStorage(MongoStorage, CompositeStorage):
         }
         self._update(spec=query, document=_set, multi=False, cache=cache)
 
+    def put_many(self, elements, cache=False, *args, **kwargs):
+        """Put several data with one unordered bulk upsert.
+
+        :param list elements: (path, name, data) tuples.
+        :param bool cache: if True, put data one by one through the query
+            cache instead of one bulk upsert (False by default).
+        """
+
+        result = None
+
+        if not elements:
+            return result
+
+        if cache:
+            for path, name, data in elements:
+                self.put(path=path, name=name, data=data, cache=cache)
+
+        else:
+            backend = self._get_backend(self.get_table())
+            bulk = BulkOperationBuilder(backend, False)
+
+            for path, name, data in elements:
+                query = {
+                    MongoStorage.ID: self.get_absolute_path(
+                        path=path, name=name
+                    )
+                }
+                query.update(path)
+                query[CompositeStorage.NAME] = name
+
+                bulk.find(query).upsert().update_one({'$set': data})
+
+            result = bulk.execute()
+
+        return result
+
     def remove(
             self, path, names=None, shared=False, cache=False, *args, **kwargs
     ):
@@ -31,6 +31,71 @@ from pymongo.bulk import BulkOperationBuilder
 from pymongo.read_preferences import ReadPreference
 from pymongo.son_manipulator import SONManipulator
 from uuid import uuid1
+from os import getpid
+
+try:
+    from threading import Lock
+except ImportError:
+    from dummy_threading import Lock
+
+
+#: shared clients by connection key: [client, reference count, auth dbs].
+_clients = {}
+#: process which owns _clients. Clients must not be shared after a fork.
+_clients_pid = None
+#: (connection key, db, table, index) already ensured in this process.
+_ensured_indexes = set()
+_clients_lock = Lock()
+
+
+def get_client(connection_args, credentials=None):
+    """Get a MongoClient shared by all connections with the same arguments
+    and credentials in this process.
+
+    :param dict connection_args: MongoClient arguments.
+    :param tuple credentials: (user, pwd) used to authenticate databases.
+    :return: (client, connection key). The client must be released with
+        release_client.
+    :raises ConnectionFailure: if a new client can not connect.
+    """
+
+    global _clients_pid
+
+    key = tuple(sorted(connection_args.items())), credentials
+
+    with _clients_lock:
+        if _clients_pid != getpid():
+            # forget clients of the parent process without closing them
+            _clients.clear()
+            _clients_pid = getpid()
+
+        entry = _clients.get(key)
+
+        if entry is None:
+            entry = [MongoClient(**connection_args), 0, set()]
+            _clients[key] = entry
+
+        entry[1] += 1
+
+    return entry[0], key
+
+
+def release_client(key):
+    """Release a client got with get_client, and close it if it is not used
+    anymore.
+
+    :param key: connection key returned by get_client.
+    """
+
+    with _clients_lock:
+        entry = _clients.get(key)
+
+        if entry is not None:
+            entry[1] -= 1
+
+            if entry[1] <= 0:
+                del _clients[key]
+                entry[0].close()
 
 
 class CanopsisSONManipulator(SONManipulator):
@@ -65,6 +130,8 @@ class MongoDataBase(DataBase):
             *args, **kwargs
     ):
 
+        self._client_key = None  # shared client key (see get_client)
+
         super(MongoDataBase, self).__init__(
             port=port, host=host, *args, **kwargs
         )
@@ -117,8 +184,15 @@ class MongoDataBase(DataBase):
 
         self.logger.debug('Trying to connect to {0}'.format(connection_args))
 
+        credentials = None
+
+        if (self.user, self.pwd) != (None, None):
+            credentials = self.user, self.pwd
+
         try:
-            result = MongoClient(**connection_args)
+            result, self._client_key = get_client(
+                connection_args, credentials
+            )
         except ConnectionFailure as cfe:
             self.logger.error(
                 'Raised {2} during connection attempting to {0}:{1}.'.
@@ -127,9 +201,15 @@ class MongoDataBase(DataBase):
         else:
             self._database = result[self.db]
 
-            if (self.user, self.pwd) != (None, None):
+            if credentials is not None:
 
-                authenticate = self._database.authenticate(self.user, self.pwd)
+                authenticated = _clients[self._client_key][2]
+
+                authenticate = self.db in authenticated or \
+                    self._database.authenticate(self.user, self.pwd)
+
+                if authenticate:
+                    authenticated.add(self.db)
 
                 if authenticate:
                     self.logger.debug(
@@ -144,7 +224,8 @@ class MongoDataBase(DataBase):
                             self.host, self.port
                         )
                     )
-                    self.disconnect()
+                    release_client(self._client_key)
+                    self._client_key = None
                     result = None
 
             else:
@@ -157,7 +238,9 @@ class MongoDataBase(DataBase):
     def _disconnect(self, *args, **kwargs):
 
         if self._conn is not None:
-            self._conn.close()
+            # the client may be shared with other databases
+            release_client(self._client_key)
+            self._client_key = None
             self._conn = None
 
     def connected(self, *args, **kwargs):
@@ -258,12 +341,27 @@ class MongoStorage(MongoDataBase, Storage):
 
             for index in self.all_indexes():
 
+                # ensure indexes once per collection in this process
+                index_key = (
+                    self._client_key, self.db, table,
+                    tuple(
+                        item if isinstance(item, basestring) else tuple(item)
+                        for item in index
+                    )
+                )
+
+                if index_key in _ensured_indexes:
+                    continue
+
                 try:
                     self._backend.ensure_index(index)
 
                 except Exception as ex:
                     self.logger.error(ex)
 
+                else:
+                    _ensured_indexes.add(index_key)
+
         return result
 
     def _disconnect(self, *args, **kwargs):
@@ -554,6 +652,18 @@ class MongoStorage(MongoDataBase, Storage):
 
         return result
 
+    def aggregate(self, pipeline):
+
+        backend = self._get_backend(backend=self.get_table())
+
+        result = backend.aggregate(pipeline)
+
+        # pymongo < 3 returns the command response
+        if isinstance(result, dict):
+            result = result['result']
+
+        return list(result)
+
     def _process_query(self, *args, **kwargs):
 
         result = super(MongoStorage, self)._process_query(*args, **kwargs)
@@ -28,7 +28,178 @@ from operator import itemgetter
 
 from datetime import datetime
 
-from time import mktime
+from time import mktime, time
+
+from array import array
+
+from struct import Struct
+
+from sys import byteorder
+
+from bson.binary import Binary
+
+from pymongo.bulk import BulkOperationBuilder
+
+#: maximal number of memoized periodic document ids.
+DOCUMENT_ID_CACHE_SIZE = 100000
+#: default number of documents per cursor batch when iterating on points.
+DEFAULT_BATCH_SIZE = 100
+#: packed points format version.
+PACK_VERSION = 2
+#: packed points header: version, offsets typecode, points, nones and
+#: integers count.
+_PACK_HEADER = Struct('<BcIII')
+#: packed points header of the version 1, without integers.
+_PACK_HEADER_V1 = Struct('<BcII')
+#: maximal absolute integer value which is exactly stored in a double.
+_MAX_PACKED_INT = 1 << 53
+#: packed arrays are stored in little endian.
+_SWAP = byteorder != 'little'
+
+
+def _array_bytes(typecode, values):
+
+    result = array(typecode, values)
+
+    if _SWAP:
+        result.byteswap()
+
+    return result.tostring()
+
+
+def _bytes_array(typecode, data, start, count):
+
+    result = array(typecode)
+    stop = start + count * result.itemsize
+    result.fromstring(data[start:stop])
+
+    if _SWAP:
+        result.byteswap()
+
+    return result, stop
+
+
+def pack_points(points):
+    """Pack (offset, value) points in a binary blob.
+
+    Offsets are delta-encoded in an array of unsigned integers and values are
+    stored in an array of doubles. None values and integer values are stored
+    as lists of point indexes, so that value types are kept.
+
+    :param list points: (offset, value) points sorted by offset.
+    :return: packed points or None if points can not be packed without loss
+        (negative or unsorted offsets, non numerical values).
+    :rtype: str
+    """
+
+    deltas = []
+    nones = []
+    ints = []
+    values = []
+
+    previous = 0
+
+    for index, (offset, value) in enumerate(points):
+
+        delta = offset - previous
+
+        if delta < 0 or (index > 0 and delta == 0):
+            return None
+
+        deltas.append(delta)
+        previous = offset
+
+        if value is None:
+            nones.append(index)
+
+        elif isinstance(value, bool) or \
+                not isinstance(value, (int, long, float)):
+            return None
+
+        elif isinstance(value, (int, long)):
+            if abs(value) > _MAX_PACKED_INT:
+                return None
+
+            ints.append(index)
+            values.append(value)
+
+        else:
+            values.append(value)
+
+    if previous > 0xffffffff:
+        return None
+
+    typecode = 'H' if max(deltas or [0]) <= 0xffff else 'I'
+
+    result = ''.join(
+        (
+            _PACK_HEADER.pack(
+                PACK_VERSION, typecode, len(deltas), len(nones), len(ints)
+            ),
+            _array_bytes(typecode, deltas),
+            _array_bytes('I', nones),
+            _array_bytes('I', ints),
+            _array_bytes('d', values)
+        )
+    )
+
+    return result
+
+
+def unpack_points(data):
+    """Unpack points packed with the pack_points function.
+
+    :param str data: packed points.
+    :return: (offset, value) points sorted by offset.
+    :rtype: list
+    """
+
+    data = str(data)
+
+    version = ord(data[0])
+
+    if version == PACK_VERSION:
+        _, typecode, count, nones_count, ints_count = \
+            _PACK_HEADER.unpack_from(data)
+        start = _PACK_HEADER.size
+
+    elif version == 1:
+        # values of the version 1 are all doubles
+        _, typecode, count, nones_count = _PACK_HEADER_V1.unpack_from(data)
+        ints_count = 0
+        start = _PACK_HEADER_V1.size
+
+    else:
+        raise ValueError('Unknown packed points version {0}'.format(version))
+
+    deltas, start = _bytes_array(typecode, data, start, count)
+    nones, start = _bytes_array('I', data, start, nones_count)
+    ints, start = _bytes_array('I', data, start, ints_count)
+    values, _ = _bytes_array('d', data, start, count - nones_count)
+
+    result = []
+
+    nones = set(nones)
+    ints = set(ints)
+    values = iter(values)
+
+    offset = 0
+
+    for index, delta in enumerate(deltas):
+        offset += delta
+
+        if index in nones:
+            value = None
+
+        elif index in ints:
+            value = int(next(values))
+
+        else:
+            value = next(values)
+
+        result.append((offset, value))
+
+    return result
 
 
 class MongoPeriodicStorage(MongoStorage, PeriodicStorage):
@@ -43,18 +214,25 @@ class MongoPeriodicStorage(MongoStorage, PeriodicStorage):
         VALUES = 'v'
         PERIOD = 'p'
         LAST_UPDATE = 'l'
+        COLUMNS = 'c'  #: packed points (see pack_points)
 
         QUERY = [(DATA_ID, 1), (PERIOD, 1), (TIMESTAMP, 1)]
 
+    def __init__(self, *args, **kwargs):
+
+        super(MongoPeriodicStorage, self).__init__(*args, **kwargs)
+
+        self._document_ids = {}
+
     def count(self, data_id, period, timewindow=None, *args, **kwargs):
 
-        data = self.get(
+        points = self.iget(
             data_id=data_id,
             timewindow=timewindow,
             period=period
         )
 
-        result = len(data)
+        result = sum(1 for _ in points)
 
         return result
 
@@ -88,6 +266,31 @@ class MongoPeriodicStorage(MongoStorage, PeriodicStorage):
         *args, **kwargs
     ):
 
+        result = list(
+            self.iget(
+                data_id=data_id, period=period, timewindow=timewindow,
+                limit=limit
+            )
+        )
+
+        # documents of different periods may overlap
+        if period is None:
+            result.sort(key=itemgetter(0))
+
+        return result
+
+    def iget(
+        self, data_id, period, timewindow=None, limit=0,
+        batch_size=DEFAULT_BATCH_SIZE, *args, **kwargs
+    ):
+        """Iterate on points read from documents sorted by timestamp.
+
+        Points are sorted by timestamp if period is given.
+
+        :param int limit: maximal number of documents to read.
+        :param int batch_size: number of documents per cursor batch.
+        """
+
         query = self._get_documents_query(
             data_id=data_id,
             timewindow=timewindow,
@@ -96,7 +299,8 @@ class MongoPeriodicStorage(MongoStorage, PeriodicStorage):
 
         projection = {
             MongoPeriodicStorage.Index.TIMESTAMP: 1,
-            MongoPeriodicStorage.Index.VALUES: 1
+            MongoPeriodicStorage.Index.VALUES: 1,
+            MongoPeriodicStorage.Index.COLUMNS: 1
         }
 
         if period is None:
@@ -105,84 +309,236 @@ class MongoPeriodicStorage(MongoStorage, PeriodicStorage):
         cursor = self._find(document=query, projection=projection)
 
         cursor.hint(MongoPeriodicStorage.Index.QUERY)
+        cursor.sort(MongoPeriodicStorage.Index.TIMESTAMP, 1)
 
-        result = []
+        if batch_size:
+            cursor.batch_size(batch_size)
 
         if limit != 0:
-            cursor = cursor[:limit]
+            cursor.limit(limit)
 
         for document in cursor:
+            points = self._document_points(document, timewindow)
+            points.sort(key=itemgetter(0))
+
+            for point in points:
+                yield point
 
-            timestamp = int(document[MongoPeriodicStorage.Index.TIMESTAMP])
+    def get_many(
+        self, data_ids, period, timewindow=None, batch_size=None,
+        *args, **kwargs
+    ):
+        """Get points of several data ids with a single query.
 
-            values = document[MongoPeriodicStorage.Index.VALUES]
+        :param int batch_size: number of documents per cursor batch.
+        """
 
-            for t in values:
-                value = values[t]
-                value_timestamp = timestamp + int(t)
+        data_ids = list(data_ids)
 
-                if timewindow is None or value_timestamp in timewindow:
-                    result.append((value_timestamp, value))
+        query = self._get_documents_query(
+            data_id={'$in': data_ids},
+            timewindow=timewindow,
+            period=period
+        )
+
+        projection = {
+            MongoPeriodicStorage.Index.DATA_ID: 1,
+            MongoPeriodicStorage.Index.TIMESTAMP: 1,
+            MongoPeriodicStorage.Index.VALUES: 1,
+            MongoPeriodicStorage.Index.COLUMNS: 1
+        }
+
+        cursor = self._find(document=query, projection=projection)
+
+        cursor.hint(MongoPeriodicStorage.Index.QUERY)
+
+        if batch_size:
+            cursor.batch_size(batch_size)
+
+        result = dict((data_id, []) for data_id in data_ids)
+
+        for document in cursor:
+            points = result.setdefault(
+                document[MongoPeriodicStorage.Index.DATA_ID], []
+            )
+            points += self._document_points(document, timewindow)
 
-        result.sort(key=itemgetter(0))
+        for points in result.values():
+            points.sort(key=itemgetter(0))
+
+        return result
+
+    def _document_points(self, document, timewindow=None):
+        """Get points of a periodic document which are in timewindow."""
+
+        result = []
+
+        timestamp = int(document[MongoPeriodicStorage.Index.TIMESTAMP])
+
+        for offset, value in self._document_offsets(document):
+            value_timestamp = timestamp + offset
+
+            if timewindow is None or value_timestamp in timewindow:
+                result.append((value_timestamp, value))
+
+        return result
+
+    @staticmethod
+    def _document_offsets(document):
+        """Get (offset, value) points of a periodic document.
+
+        Packed points are read first, then values which have been put after
+        the packing. The latter overwrite packed values with the same offset.
+        """
+
+        columns = document.get(MongoPeriodicStorage.Index.COLUMNS)
+        values = document.get(MongoPeriodicStorage.Index.VALUES)
+
+        if columns is None:
+            result = [(int(t), values[t]) for t in values or ()]
+
+        elif not values:
+            result = unpack_points(columns)
+
+        else:
+            points = dict(unpack_points(columns))
+
+            for t in values:
+                points[int(t)] = values[t]
+
+            result = list(points.items())
 
         return result
 
     def put(self, data_id, period, points, cache=False, *args, **kwargs):
 
-        # initialize a dictionary of perfdata value by value field
-        # and id_timestamp
-        doc_props_by_id_ts = {}
-        # previous variable contains a dict of entries to put in
-        # the related document
+        result = None
+
+        documents = self._put_documents(
+            data_id=data_id, period=period, points=points
+        )
+
+        for _id in documents:
+            result = self._update(
+                spec={'_id': _id}, document={'$set': documents[_id]},
+                cache=cache
+            )
+
+        return result
+
+    def put_many(self, entries, cache=False, *args, **kwargs):
+        """Put points of several data ids with one unordered bulk operation.
+
+        Updates of a same periodic document are merged in one update.
+
+        :param list entries: (data_id, period, points) tuples.
+        :param bool cache: use query cache if True (False by default).
+        """
+
+        result = None
+
+        documents = {}
+
+        for data_id, period, points in entries:
+            self._put_documents(
+                data_id=data_id, period=period, points=points,
+                documents=documents
+            )
+
+        if not documents:
+            return result
+
+        if cache:
+            for _id in documents:
+                result = self._update(
+                    spec={'_id': _id}, document={'$set': documents[_id]},
+                    cache=cache
+                )
+
+        else:
+            backend = self._get_backend(self.get_table())
+            bulk = BulkOperationBuilder(backend, False)
+
+            for _id in documents:
+                bulk.find({'_id': _id}).upsert().update_one(
+                    {'$set': documents[_id]}
+                )
+
+            result = bulk.execute()
+
+        return result
+
+    def _put_documents(self, data_id, period, points, documents=None):
+        """Get $set document properties by document id of input points.
+
+        :param dict documents: documents to update. New dict if None.
+        :return: documents.
+        :rtype: dict
+        """
+
+        if documents is None:
+            documents = {}
+
+        last_update = MongoPeriodicStorage.Index.LAST_UPDATE
 
-        # prepare data to insert/update in db
         for ts, value in points:
 
             ts = int(ts)
             id_timestamp = int(period.round_timestamp(ts))
 
-            document_properties = doc_props_by_id_ts.setdefault(
-                id_timestamp, {}
+            _id = self._document_id(
+                data_id=data_id, timestamp=id_timestamp, period=period
             )
 
-            if '_id' not in document_properties:
-                document_properties['_id'] = \
-                    MongoPeriodicStorage._get_document_id(
-                        data_id=data_id,
-                        timestamp=id_timestamp, period=period)
-                document_properties[MongoPeriodicStorage.Index.LAST_UPDATE] = \
-                    ts
+            document_properties = documents.get(_id)
 
-            else:
-                last_update = MongoPeriodicStorage.Index.LAST_UPDATE
-                if document_properties[last_update] < ts:
-                    document_properties[last_update] = ts
+            if document_properties is None:
+                document_properties = documents[_id] = {
+                    MongoPeriodicStorage.Index.DATA_ID: data_id,
+                    MongoPeriodicStorage.Index.PERIOD: period.unit_values,
+                    MongoPeriodicStorage.Index.TIMESTAMP: id_timestamp,
+                    last_update: ts
+                }
+
+            elif document_properties[last_update] < ts:
+                document_properties[last_update] = ts
 
             field_name = "{0}.{1}".format(
                 MongoPeriodicStorage.Index.VALUES, ts - id_timestamp)
 
             document_properties[field_name] = value
 
-        for id_timestamp in doc_props_by_id_ts:
-            document_properties = doc_props_by_id_ts[id_timestamp]
+        return documents
 
-            # remove _id and last_update
-            _id = document_properties.pop('_id')
+    def _document_id(self, data_id, timestamp, period):
+        """Get memoized periodic document id.
 
-            _set = {
-                MongoPeriodicStorage.Index.DATA_ID: data_id,
-                MongoPeriodicStorage.Index.PERIOD: period.unit_values,
-                MongoPeriodicStorage.Index.TIMESTAMP: id_timestamp
-            }
-            _set.update(document_properties)
+        The memo is cleared when it exceeds DOCUMENT_ID_CACHE_SIZE entries.
+        """
 
-            document_properties['_id'] = _id
+        unit_with_value = period.get_max_unit()
 
-            result = self._update(
-                spec={'_id': _id}, document={'$set': _set}, cache=cache
+        if unit_with_value is None:  # let _get_document_id raise the error
+            return MongoPeriodicStorage._get_document_id(
+                data_id=data_id, timestamp=timestamp, period=period
             )
 
+        key = data_id, timestamp, unit_with_value[Period.UNIT]
+
+        document_ids = self._document_ids
+
+        result = document_ids.get(key)
+
+        if result is None:
+            result = MongoPeriodicStorage._get_document_id(
+                data_id=data_id, timestamp=timestamp, period=period
+            )
+
+            if len(document_ids) >= DOCUMENT_ID_CACHE_SIZE:
+                document_ids.clear()
+
+            document_ids[key] = result
+
         return result
 
     def remove(
@@ -198,17 +554,18 @@ class MongoPeriodicStorage(MongoStorage, PeriodicStorage):
 
             projection = {
                 MongoPeriodicStorage.Index.TIMESTAMP: 1,
-                MongoPeriodicStorage.Index.VALUES: 1
+                MongoPeriodicStorage.Index.VALUES: 1,
+                MongoPeriodicStorage.Index.COLUMNS: 1
             }
 
             documents = self._find(document=query, projection=projection)
 
             for document in documents:
                 timestamp = document.get(MongoPeriodicStorage.Index.TIMESTAMP)
-                values = document.get(MongoPeriodicStorage.Index.VALUES)
                 values_to_save = {
-                    t: values[t] for t in values
-                    if (timestamp + int(t)) not in timewindow
+                    str(t): value for t, value
+                    in self._document_offsets(document)
+                    if (timestamp + t) not in timewindow
                 }
                 _id = document.get('_id')
 
@@ -218,7 +575,8 @@ class MongoPeriodicStorage(MongoStorage, PeriodicStorage):
                         document={
                             '$set': {
                                 MongoPeriodicStorage.Index.VALUES:
-                                values_to_save}
+                                values_to_save},
+                            '$unset': {MongoPeriodicStorage.Index.COLUMNS: 1}
                         },
                         cache=cache)
                 else:
@@ -227,6 +585,96 @@ class MongoPeriodicStorage(MongoStorage, PeriodicStorage):
         else:
             self._remove(document=query, cache=cache)
 
+    def pack(self, data_id=None, period=None, before=None, cache=False):
+        """Pack values of closed periodic documents in binary columns.
+
+        A document is closed when its period is over at the before timestamp.
+        Packed documents are read transparently, and values put afterwards in
+        a packed document are merged at read time.
+
+        :param data_id: data id(s) to pack. All data if None.
+        :type data_id: str or list
+        :param Period period: period of documents to pack. All if None.
+        :param float before: pack documents closed before this timestamp.
+            Default is now.
+        :param bool cache: use query cache if True (default False).
+        :return: number of packed documents.
+        :rtype: int
+        """
+
+        if before is None:
+            before = time()
+
+        query = {
+            MongoPeriodicStorage.Index.VALUES: {'$exists': True, '$ne': {}},
+            MongoPeriodicStorage.Index.TIMESTAMP: {'$lt': before}
+        }
+
+        if data_id is not None:
+            if not isinstance(data_id, basestring):
+                data_id = {'$in': list(data_id)}
+
+            query[MongoPeriodicStorage.Index.DATA_ID] = data_id
+
+        if period is not None:
+            query[MongoPeriodicStorage.Index.PERIOD] = period.unit_values
+
+        projection = {
+            MongoPeriodicStorage.Index.TIMESTAMP: 1,
+            MongoPeriodicStorage.Index.PERIOD: 1,
+            MongoPeriodicStorage.Index.VALUES: 1,
+            MongoPeriodicStorage.Index.COLUMNS: 1
+        }
+
+        result = 0
+
+        for document in self._find(document=query, projection=projection):
+
+            timestamp = document[MongoPeriodicStorage.Index.TIMESTAMP]
+            doc_period = Period(**document[MongoPeriodicStorage.Index.PERIOD])
+
+            # ensure no more points will be put in this document
+            if doc_period.round_timestamp(before) <= timestamp:
+                continue
+
+            points = self._document_offsets(document)
+            points.sort(key=itemgetter(0))
+
+            columns = pack_points(points)
+
+            if columns is None:
+                continue
+
+            spec = {'_id': document['_id']}
+
+            # do not pack if another packing occurred since the find
+            spec[MongoPeriodicStorage.Index.COLUMNS] = document.get(
+                MongoPeriodicStorage.Index.COLUMNS, {'$exists': False}
+            )
+
+            # unset only packed values in order to keep values put meanwhile
+            _unset = dict(
+                ('{0}.{1}'.format(MongoPeriodicStorage.Index.VALUES, t), 1)
+                for t in document[MongoPeriodicStorage.Index.VALUES]
+            )
+
+            self._update(
+                spec=spec,
+                document={
+                    '$set': {
+                        MongoPeriodicStorage.Index.COLUMNS: Binary(columns)
+                    },
+                    '$unset': _unset
+                },
+                cache=cache,
+                multi=False,
+                upsert=False
+            )
+
+            result += 1
+
+        return result
+
     def all_indexes(self, *args, **kwargs):
 
         result = super(MongoPeriodicStorage, self).all_indexes(*args, **kwargs)
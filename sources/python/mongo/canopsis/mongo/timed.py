@@ -18,12 +18,17 @@
 # along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
 # ---------------------------------
 
-from canopsis.common.utils import isiterable
+from canopsis.common.utils import isiterable, ensure_iterable
 from canopsis.common.init import basestring
+from canopsis.common.lru import LRUCache
+from canopsis.configuration.model import Parameter
 from canopsis.mongo.core import MongoStorage
+from canopsis.storage.core import Storage
 from canopsis.storage.timed import TimedStorage
 from canopsis.timeserie.timewindow import get_offset_timewindow
 
+from copy import deepcopy
+
 
 class MongoTimedStorage(MongoStorage, TimedStorage):
 
@@ -41,6 +46,36 @@ class MongoTimedStorage(MongoStorage, TimedStorage):
         (Key.TIMESTAMP, MongoStorage.DESC)
     ]
 
+    DEFAULT_BATCH_SIZE = 100  #: default number of documents per batch.
+
+    #: last value cache size configuration name.
+    LAST_VALUE_CACHE_SIZE = 'last_value_cache_size'
+    DEFAULT_LAST_VALUE_CACHE_SIZE = 0  #: default last value cache size.
+
+    def __init__(
+        self, last_value_cache_size=DEFAULT_LAST_VALUE_CACHE_SIZE,
+        *args, **kwargs
+    ):
+        """
+        :param int last_value_cache_size: maximal number of data ids whose
+            last (timestamp, value) put is kept in memory. 0 (default)
+            disables it. Enable it only if this storage is the only writer
+            of its data ids.
+        """
+
+        self.last_value_cache_size = last_value_cache_size
+
+        super(MongoTimedStorage, self).__init__(*args, **kwargs)
+
+    @property
+    def last_value_cache_size(self):
+        return self._last_value_cache_size
+
+    @last_value_cache_size.setter
+    def last_value_cache_size(self, value):
+        self._last_value_cache_size = value
+        self._last_values = LRUCache(max_size=value) if value > 0 else None
+
     def _search(
         self, data_ids=None, timewindow=None, _filter=None,
         limit=0, skip=0, sort=None,
@@ -92,7 +127,14 @@ class MongoTimedStorage(MongoStorage, TimedStorage):
 
         # apply a specific index
         if data_ids is None:
-            index = MongoTimedStorage.TIMESTAMPS
+            index = None
+
+            # documents are not required to be sorted by timestamp
+            if timewindow is None and sort is None:
+                index = self._get_hint(query=where, cursor=result)
+
+            if index is None:
+                index = MongoTimedStorage.TIMESTAMPS
 
         else:
             index = MongoTimedStorage.TIMESTAMP_BY_ID
@@ -115,30 +157,35 @@ class MongoTimedStorage(MongoStorage, TimedStorage):
 
         result = {}
 
+        for data_id, value in self._icursor2periods(cursor, timewindow):
+            if data_id not in result:
+                result[data_id] = [value]
+
+            else:
+                result[data_id].append(value)
+
+        return result
+
+    def _icursor2periods(self, cursor, timewindow):
+        """Iterate on (data_id, {
+            TimedStorage.TIMESTAMP: timestamp, TimedStorage.VALUE: value
+        }) read from a cursor.
+        """
+
         # iterate on all documents
         for document in cursor:
             timestamp = document[MongoTimedStorage.Key.TIMESTAMP]
-            value = document[MongoTimedStorage.Key.VALUE]
-            data_id = document[MongoTimedStorage.Key.DATA_ID]
 
             # a value to get is composed of a timestamp, values and document id
-            value_to_append = {
+            yield document[MongoTimedStorage.Key.DATA_ID], {
                 TimedStorage.TIMESTAMP: timestamp,
-                TimedStorage.VALUE: value
+                TimedStorage.VALUE: document[MongoTimedStorage.Key.VALUE]
             }
 
-            if data_id not in result:
-                result[data_id] = [value_to_append]
-
-            else:
-                result[data_id].append(value_to_append)
-
             if timewindow is not None and timestamp not in timewindow:
                 # stop when a document is just before the start timewindow
                 break
 
-        return result
-
     def get(
             self, data_ids, timewindow=None, _filter=None,
             limit=0, skip=0, sort=None,
@@ -158,6 +205,34 @@ class MongoTimedStorage(MongoStorage, TimedStorage):
 
         return result
 
+    def iget(
+            self, data_ids, timewindow=None, _filter=None, limit=0, skip=0,
+            batch_size=DEFAULT_BATCH_SIZE,
+            *args, **kwargs
+    ):
+        """Iterate on (data_id, value) sorted by data_id if data_ids is given,
+        and by descending timestamp, where value is a dict of timestamp and
+        value.
+
+        :param int batch_size: number of documents per cursor batch.
+        """
+
+        if data_ids is None:
+            sort = MongoTimedStorage.TIMESTAMPS
+
+        else:
+            sort = MongoTimedStorage.TIMESTAMP_BY_ID
+
+        cursor = self._search(
+            data_ids=data_ids, timewindow=timewindow, _filter=_filter,
+            limit=limit, skip=skip, sort=sort
+        )
+
+        if batch_size:
+            cursor.batch_size(batch_size)
+
+        return self._icursor2periods(cursor=cursor, timewindow=timewindow)
+
     def find(self, timewindow=None, _filter=None, *args, **kwargs):
 
         cursor = self._search(timewindow=timewindow, _filter=_filter)
@@ -177,17 +252,40 @@ class MongoTimedStorage(MongoStorage, TimedStorage):
         return result
 
     def put(self, data_id, value, timestamp, cache=False, *args, **kwargs):
+        """
+        The last (timestamp, value) of data_id is kept in memory and avoids
+        to read the previous value when timestamp is not older. This storage
+        is therefore expected to be the only writer of data_id.
+        """
 
-        timewindow = get_offset_timewindow(offset=timestamp)
+        last_values = self._last_values
 
-        data = self.get(
-            data_ids=data_id, timewindow=timewindow, limit=1
-        )
+        data = None if last_values is None else last_values.get(data_id)
+
+        # the cached value is the last one
+        is_last = data is not None and \
+            data[TimedStorage.TIMESTAMP] <= timestamp
+
+        if not is_last:
+            if last_values is not None:
+                # get the last value whatever the timestamp
+                data = self.get(data_ids=data_id, limit=1)
+                data = data[0] if data else None
+
+                is_last = data is None or \
+                    data[TimedStorage.TIMESTAMP] <= timestamp
+
+            if not is_last:
+                timewindow = get_offset_timewindow(offset=timestamp)
+
+                data = self.get(
+                    data_ids=data_id, timewindow=timewindow, limit=1
+                )
+                data = data[0] if data else None
 
         data_value = None
 
         if data:
-            data = data[0]
             data_value = data[TimedStorage.VALUE]
 
         if value != data_value:  # new entry to insert
@@ -215,8 +313,40 @@ class MongoTimedStorage(MongoStorage, TimedStorage):
             else:
                 self._insert(document=document, cache=cache)
 
+            data = {
+                TimedStorage.TIMESTAMP: timestamp,
+                # the caller may modify value and put it again
+                TimedStorage.VALUE: deepcopy(value)
+            }
+
+        if is_last:
+            last_values[data_id] = data
+
+    def update(self, data_id, value, timestamp, cache=False, *args, **kwargs):
+
+        # the cached value may be the updated one
+        if self._last_values is not None:
+            self._last_values.pop(data_id)
+
+        spec = {
+            MongoTimedStorage.Key.DATA_ID: data_id,
+            MongoTimedStorage.Key.TIMESTAMP: timestamp
+        }
+
+        self._update(
+            spec=spec,
+            document={'$set': {MongoTimedStorage.Key.VALUE: value}},
+            cache=cache,
+            multi=False,
+            upsert=False
+        )
+
     def remove(self, data_ids, timewindow=None, cache=False, *args, **kwargs):
 
+        if self._last_values is not None:
+            for data_id in ensure_iterable(data_ids):
+                self._last_values.pop(data_id)
+
         where = {}
 
         if isiterable(data_ids, is_str=False):
@@ -231,6 +361,26 @@ class MongoTimedStorage(MongoStorage, TimedStorage):
 
         self._remove(document=where, cache=cache)
 
+    def drop(self, *args, **kwargs):
+
+        super(MongoTimedStorage, self).drop(*args, **kwargs)
+
+        if self._last_values is not None:
+            self._last_values.clear()
+
+    def _conf(self, *args, **kwargs):
+
+        result = super(MongoTimedStorage, self)._conf(*args, **kwargs)
+
+        result.add_unified_category(
+            name=Storage.CATEGORY,
+            new_content=(
+                Parameter(MongoTimedStorage.LAST_VALUE_CACHE_SIZE, parser=int),
+            )
+        )
+
+        return result
+
     def all_indexes(self, *args, **kwargs):
 
         result = super(MongoTimedStorage, self).all_indexes(*args, **kwargs)
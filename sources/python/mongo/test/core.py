@@ -42,6 +42,22 @@ class DataBaseTest(TestCase):
         self.database.reconnect()
         self.assertTrue(self.database.connected())
 
+    def test_shared_client(self):
+        other = MongoDataBase(data_scope="test_store", auto_connect=False)
+
+        self.database.connect()
+        other.connect()
+
+        # same connection arguments share the same client
+        self.assertIs(self.database._conn, other._conn)
+
+        self.database.disconnect()
+        # the client is still used by other
+        self.assertTrue(other.connected())
+
+        other.disconnect()
+        self.assertFalse(other.connected())
+
 
 class TestStorage(MongoStorage):
 
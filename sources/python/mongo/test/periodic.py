@@ -21,7 +21,10 @@
 
 from unittest import TestCase, main
 
-from canopsis.mongo.periodic import MongoPeriodicStorage
+from canopsis.mongo.periodic import (
+    MongoPeriodicStorage, pack_points, unpack_points, _array_bytes,
+    _PACK_HEADER_V1
+)
 from canopsis.timeserie.timewindow import Period, TimeWindow
 
 
@@ -123,5 +126,152 @@ class PeriodicStoreTest(TestCase):
                 count = self.storage.count(data_id=data_id, period=period)
                 self.assertEquals(count, 0)
 
+    def test_get_many(self):
+        self.storage.drop()
+
+        period = Period(**{Period.HOUR: 24})
+        timewindow = TimeWindow()
+
+        points = {
+            'm0': [(timewindow.start() + 1, 0), (timewindow.start() + 2, 1)],
+            'm1': [(timewindow.stop(), 2), (timewindow.stop() + 1, 3)]
+        }
+
+        for data_id in points:
+            self.storage.put(
+                data_id=data_id, period=period, points=points[data_id]
+            )
+
+        data = self.storage.get_many(
+            data_ids=['m0', 'm1', 'm2'], period=period, timewindow=timewindow
+        )
+
+        self.assertEqual(
+            data,
+            {'m0': points['m0'], 'm1': points['m1'][:1], 'm2': []}
+        )
+
+        self.storage.drop()
+
+    def test_put_many(self):
+        self.storage.drop()
+
+        period = Period(**{Period.HOUR: 24})
+        timewindow = TimeWindow()
+
+        start, stop = timewindow.start(), timewindow.stop()
+
+        self.storage.put_many(
+            entries=[
+                ('m0', period, [(start, 0), (start + 1, 1)]),
+                ('m1', period, [(stop, 2)]),
+                ('m0', period, [(start + 2, 3)])
+            ]
+        )
+
+        data = self.storage.get_many(
+            data_ids=['m0', 'm1'], period=period, timewindow=timewindow
+        )
+
+        self.assertEqual(
+            data,
+            {
+                'm0': [(start, 0), (start + 1, 1), (start + 2, 3)],
+                'm1': [(stop, 2)]
+            }
+        )
+
+        self.storage.drop()
+
+    def test_iget(self):
+        self.storage.drop()
+
+        period = Period(**{Period.HOUR: 1})
+        timewindow = TimeWindow(start=0, stop=4 * 3600)
+
+        # points over several documents
+        points = [(t * 600, t) for t in range(24)]
+
+        self.storage.put(data_id='m0', period=period, points=points)
+
+        data = self.storage.iget(
+            data_id='m0', period=period, timewindow=timewindow, batch_size=1
+        )
+
+        self.assertFalse(isinstance(data, list))
+        self.assertEqual(
+            list(data),
+            [point for point in points if point[0] in timewindow]
+        )
+
+        self.storage.drop()
+
+    def test_pack_points(self):
+        points = [(0, 1), (1, None), (70000, 2.5), (70001, -3)]
+
+        packed = pack_points(points)
+        unpacked = unpack_points(packed)
+
+        self.assertEqual(unpacked, points)
+        # value types are kept
+        self.assertEqual(
+            [type(value) for _, value in unpacked],
+            [type(value) for _, value in points]
+        )
+        self.assertEqual(unpack_points(pack_points([])), [])
+
+        self.assertIsNone(pack_points([(1, 'a')]))
+        self.assertIsNone(pack_points([(1, True)]))
+        self.assertIsNone(pack_points([(2, 0), (1, 0)]))
+
+    def test_unpack_points_v1(self):
+        # version 1 stores all values as doubles
+        data = ''.join((
+            _PACK_HEADER_V1.pack(1, 'H', 2, 1),
+            _array_bytes('H', [0, 5]),
+            _array_bytes('I', [1]),
+            _array_bytes('d', [1])
+        ))
+
+        self.assertEqual(unpack_points(data), [(0, 1.0), (5, None)])
+
+    def test_pack(self):
+        self.storage.drop()
+
+        period = Period(**{Period.HOUR: 24})
+        timewindow = TimeWindow()
+
+        points = [
+            (timewindow.start(), None),
+            (timewindow.start() + 1, 1),
+            (timewindow.stop(), 2.5)
+        ]
+
+        self.storage.put(data_id='m0', period=period, points=points)
+
+        before = timewindow.stop() + period.total_seconds()
+        count = self.storage.pack(data_id='m0', before=before)
+        self.assertTrue(count > 0)
+
+        data = self.storage.get(data_id='m0', period=period)
+        self.assertEqual(data, points)
+
+        # values put after packing overwrite packed ones
+        self.storage.put(
+            data_id='m0', period=period, points=[(timewindow.stop(), 3)]
+        )
+        data = self.storage.get(data_id='m0', period=period)
+        self.assertEqual(data, points[:-1] + [(timewindow.stop(), 3)])
+
+        self.storage.remove(
+            data_id='m0', period=period, timewindow=TimeWindow(
+                start=timewindow.start(), stop=timewindow.start()
+            )
+        )
+        data = self.storage.get(data_id='m0', period=period)
+        self.assertEqual(data, points[1:-1] + [(timewindow.stop(), 3)])
+
+        self.storage.drop()
+
 if __name__ == '__main__':
     main()
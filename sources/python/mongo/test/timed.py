@@ -180,5 +180,61 @@ class TimedStorageTest(TestCase):
         self.assertEquals(count, 0)
 
 
+    def test_put_last_value(self):
+
+        data_id = 'test_store_id'
+
+        self.storage.last_value_cache_size = 10
+        self.storage.drop()
+
+        self.storage.put(data_id=data_id, value=1, timestamp=10)
+        # same value is neither read nor written again
+        self.storage.put(data_id=data_id, value=1, timestamp=20)
+        self.storage.put(data_id=data_id, value=2, timestamp=30)
+        # an older value is written after a read
+        self.storage.put(data_id=data_id, value=3, timestamp=5)
+
+        data = self.storage.get(data_ids=data_id)
+        self.assertEqual(
+            [(item['timestamp'], item['value']) for item in data],
+            [(30, 2), (10, 1), (5, 3)]
+        )
+
+        self.storage.remove(data_ids=data_id)
+        self.storage.put(data_id=data_id, value=2, timestamp=40)
+
+        self.assertEqual(self.storage.count(data_ids=data_id), 1)
+
+        # a value modified in place is not the cached one
+        value = {'min': 0}
+        self.storage.put(data_id=data_id, value=value, timestamp=50)
+        value['min'] = 1
+        self.storage.put(data_id=data_id, value=value, timestamp=60)
+
+        self.assertEqual(self.storage.count(data_ids=data_id), 3)
+
+        self.storage.drop()
+
+    def test_iget(self):
+
+        self.storage.drop()
+
+        for timestamp in range(10):
+            for data_id in ('id0', 'id1'):
+                self.storage.put(
+                    data_id=data_id, value=timestamp, timestamp=timestamp
+                )
+
+        data = self.storage.iget(data_ids=['id1', 'id0'], batch_size=3)
+
+        self.assertEqual(
+            [(data_id, value['timestamp']) for data_id, value in data],
+            [('id0', t) for t in range(9, -1, -1)] +
+            [('id1', t) for t in range(9, -1, -1)]
+        )
+
+        self.storage.drop()
+
+
 if __name__ == '__main__':
     main()
@@ -22,8 +22,14 @@
 # MongoDB Operators:
 # http://docs.mongodb.org/manual/reference/operator/
 
-from re import I, search
+from re import I, compile as re_compile
 from operator import lt, le, gt, ge, ne, eq
+from functools import partial
+
+#: maximal number of compiled regular expressions kept by regex_match
+REGEX_CACHE_SIZE = 1024
+
+_regex_cache = {}
 
 
 def field_check(mfilter, event, key):
@@ -272,12 +278,297 @@ def regex_computeoptions(options):
     return 0
 
 
+def regex_compile(pattern, options=None):
+    """Get a compiled regular expression from a cache.
+
+    :param basestring pattern: regular expression.
+    :param options: regex options (``i`` for case insensitive).
+    """
+
+    flags = regex_computeoptions(options)
+    key = (pattern, flags)
+
+    try:
+        return _regex_cache[key]
+
+    except KeyError:
+        if len(_regex_cache) >= REGEX_CACHE_SIZE:
+            _regex_cache.clear()
+
+        result = _regex_cache[key] = re_compile(pattern.encode('utf-8'), flags)
+
+        return result
+
+
 def regex_match(phrase, pattern, options=None):
-    options = regex_computeoptions(options)
-    if phrase is None or pattern is None or options is None:
+    if phrase is None or pattern is None:
         return False
-    return bool(search(
-        pattern.encode('utf-8'),
-        phrase.encode('utf-8'),
-        options
+    return bool(regex_compile(pattern, options).search(
+        phrase.encode('utf-8')
     ))
+
+
+def compile_mfilter(mfilter):
+    """Compile a filter into a function which checks events.
+
+    The result of ``compile_mfilter(mfilter)(event)`` is the same as the one
+    of ``check(mfilter, event)``, but operators are resolved and regular
+    expressions are compiled once for all. Unusual filter structures are
+    delegated to ``check``.
+
+    :param dict mfilter: filter to compile.
+    :return: function which takes an event and returns True if it matches.
+    """
+
+    if not isinstance(mfilter, dict):
+        return partial(check, mfilter)
+
+    checkers = []
+
+    for key in mfilter:
+        try:
+            checker = _compile_key(key, mfilter[key])
+
+        except Exception:
+            # let check raise errors at runtime as before
+            terminal = key == '$or' or (
+                key == '$and' and isinstance(mfilter[key], list)
+            )
+            checker = partial(check, {key: mfilter[key]}), terminal
+
+        checkers.append(checker)
+
+    # without terminal checkers, key order does not change the result, so
+    # cheap equality checks are done first
+    if not any(terminal for _, terminal in checkers):
+        checkers.sort(key=lambda checker: getattr(checker[0], 'cost', 2))
+
+    checkers = tuple(checkers)
+
+    def compiled(event):
+        for checker, terminal in checkers:
+            if terminal:
+                return checker(event)
+
+            if not checker(event):
+                return False
+
+        return True
+
+    return compiled
+
+
+def _compile_key(key, value):
+    """Compile one filter key.
+
+    :return: (checker, terminal) where terminal is True if the checker result
+        is the filter result (like ``$and`` and ``$or`` lists in ``check``).
+    """
+
+    if key == '$and':
+        subs = [compile_mfilter(sub) for sub in value]
+
+        if isinstance(value, list):
+            def checker(event):
+                return all(sub(event) for sub in subs)
+
+            return checker, True
+
+        def checker(event):
+            return all(sub(event) for sub in subs)
+
+        return checker, False
+
+    elif key == '$or':
+        subs = [compile_mfilter(sub) for sub in value]
+
+        if isinstance(value, list) and not subs:
+            return (lambda event: True), True
+
+        def checker(event):
+            return any(sub(event) for sub in subs)
+
+        return checker, True
+
+    elif key == '$nor':
+        subs = [compile_mfilter(sub) for sub in value]
+
+        def checker(event):
+            return not any(sub(event) for sub in subs)
+
+        return checker, False
+
+    elif isinstance(value, dict):
+        if '$in' in value or '$nin' in value:
+            # containers are checked with a specific semantic in check
+            fallback = partial(check, {key: value})
+
+            if '$in' in value:
+                member = _compile_in(value['$in'])
+
+            else:
+                member = _compile_in(value['$nin'], negate=True)
+
+            def checker(event):
+                if key not in event:
+                    return False
+
+                item = event[key]
+
+                if isinstance(item, (dict, list)):
+                    return fallback(event)
+
+                return member(item)
+
+            checker.cost = 1
+
+        else:
+            field = _compile_field(value)
+
+            def checker(event):
+                if key not in event:
+                    return False
+
+                item = event[key]
+
+                return field(item) or not (item != value)
+
+    else:
+        def checker(event):
+            return key in event and not (event[key] != value)
+
+        checker.cost = 0
+
+    return checker, False
+
+
+def _compile_in(items, negate=False):
+    """Compile a membership test, using a set if items are hashable."""
+
+    try:
+        hashed = frozenset(items)
+
+    except TypeError:
+        hashed = None
+
+    def member(item):
+        if hashed is not None:
+            try:
+                return (item in hashed) != negate
+
+            except TypeError:
+                pass
+
+        return (item in items) != negate
+
+    return member
+
+
+def _compile_field(mfilter):
+    """Compile operators of a field, like field_check does."""
+
+    cond = {'$lt': lt,
+            '$lte': le,
+            '$gt': gt,
+            '$gte': ge,
+            '$ne': ne,
+            '$eq': eq}
+
+    options = mfilter.get('$options', None)
+    predicates = []
+
+    for op in mfilter:
+        operand = mfilter[op]
+
+        if op == '$exists':
+            # field_check is called only on existing keys
+            predicates.append(
+                (lambda item: True) if operand else (lambda item: False)
+            )
+
+        elif op in cond:
+            predicates.append(partial(_compare, cond[op], operand))
+
+        elif op == '$regex':
+            predicates.append(_compile_regex(operand, options))
+
+        elif op == '$notregex':
+            regex = _compile_regex(operand, options)
+            predicates.append(lambda item, regex=regex: not regex(item))
+
+        elif op == '$options' and (
+            '$regex' in mfilter or '$notregex' in mfilter
+        ):
+            pass
+
+        elif op == '$in':
+            predicates.append(partial(_contains, operand))
+
+        elif op == '$nin':
+            predicates.append(
+                lambda item, operand=operand: item not in operand
+            )
+
+        elif op == '$not':
+            if isinstance(operand, dict):
+                sub = _compile_field(operand)
+
+            else:
+                sub = _compile_regex(operand, options)
+
+            predicates.append(lambda item, sub=sub: not sub(item))
+
+        elif op == '$all':
+            predicates.append(partial(_all, operand))
+
+        else:
+            predicates.append(
+                lambda item, mfilter=mfilter: not (item != mfilter)
+            )
+
+    predicates = tuple(predicates)
+
+    def field(item):
+        for predicate in predicates:
+            if not predicate(item):
+                return False
+
+        return True
+
+    return field
+
+
+def _compare(operator, operand, item):
+    return operator(item, operand)
+
+
+def _contains(operand, item):
+    return item in operand
+
+
+def _all(operand, item):
+    # If item isn't a list, treat it as if it was
+    items = item if isinstance(item, list) else [item]
+
+    for element in operand:
+        if element not in items:
+            return False
+
+    return True
+
+
+def _compile_regex(pattern, options=None):
+    """Compile regex_match for a given pattern."""
+
+    if pattern is None:
+        return lambda phrase: False
+
+    regex = regex_compile(pattern, options)
+
+    def match(phrase):
+        if phrase is None:
+            return False
+
+        return regex.search(phrase.encode('utf-8')) is not None
+
+    return match
@@ -32,15 +32,19 @@ except ImportError as IE:
 
 from socket import error, timeout
 
-from time import sleep
+from time import sleep, time
 from logging import INFO, getLogger
-from threading import Thread
+from threading import Thread, current_thread
+from Queue import Queue, Empty
 from os.path import join
 from traceback import print_exc
 
 # Number of tries to re-publish an event before it is lost
 # when connection problems
 
+#: drain timeout used when messages are acknowledged by other threads
+ACK_DRAIN_TIMEOUT = 0.1
+
 
 class Amqp(Thread):
     def __init__(
@@ -104,6 +108,18 @@ class Amqp(Thread):
 
         self.paused = False
 
+        self.drain_timeout = 0.5
+
+        # acknowledgements requested by other threads than the consumer one
+        self.pending_acks = Queue()
+
+        self.counter_delivered = 0
+        self.counter_acked = 0
+
+        # queue depths are refreshed every stats_interval seconds
+        self.stats_interval = 10
+        self.stats_last = 0
+
         self.connection_errors = (
             ConnectionError,
             error,
@@ -137,8 +153,11 @@ class Amqp(Thread):
                 self.logger.debug("Drain events ...")
                 while self.RUN:
                     try:
+                        self.flush_acks()
+                        self.refresh_queue_depths()
+
                         if not self.paused:
-                            self.conn.drain_events(timeout=0.5)
+                            self.conn.drain_events(timeout=self.drain_timeout)
                         else:
                             sleep(0.5)
 
@@ -293,7 +312,15 @@ class Amqp(Thread):
                 if not qsettings['consumer'] or reconnect:
                     self.logger.debug("   + Create Consumer")
                     qsettings['consumer'] = self.conn.Consumer(
-                        qsettings['queue'], callbacks=[qsettings['callback']])
+                        qsettings['queue'],
+                        callbacks=[self._on_delivery, qsettings['callback']])
+
+                    if qsettings['prefetch_count']:
+                        self.logger.debug(
+                            "   + Prefetch count: {}".format(
+                                qsettings['prefetch_count']))
+                        qsettings['consumer'].qos(
+                            prefetch_count=qsettings['prefetch_count'])
 
                 self.logger.debug("   + Consume queue")
                 qsettings['consumer'].consume()
@@ -309,8 +336,15 @@ class Amqp(Thread):
         exchange_name=None,
         no_ack=True,
         exclusive=False,
-        auto_delete=True
+        auto_delete=True,
+        prefetch_count=0
     ):
+        """
+        :param bool no_ack: if False, messages have to be acknowledged with
+            the ack method once processed.
+        :param int prefetch_count: maximal number of unacknowledged messages
+            delivered by the broker (0 means no limit).
+        """
 
         c_routing_keys = []
 
@@ -332,7 +366,107 @@ class Amqp(Thread):
             'exchange_name': exchange_name,
             'no_ack': no_ack,
             'exclusive': exclusive,
-            'auto_delete': auto_delete
+            'auto_delete': auto_delete,
+            'prefetch_count': prefetch_count,
+            'depth': None
+        }
+
+        if not no_ack:
+            self.drain_timeout = ACK_DRAIN_TIMEOUT
+
+    def _on_delivery(self, body, message):
+        self.counter_delivered += 1
+
+    def ack(self, message, multiple=False, count=1):
+        """Acknowledge a message.
+
+        Channels are not thread safe, so acknowledgements requested by other
+        threads are done by the consumer thread.
+
+        :param message: kombu message to acknowledge.
+        :param bool multiple: acknowledge all messages delivered on the
+            message channel up to this one.
+        :param int count: number of acknowledged messages, for statistics.
+        """
+
+        if current_thread() is self:
+            self._ack(message, multiple, count)
+
+        else:
+            self.pending_acks.put((message, multiple, count))
+
+    def _ack(self, message, multiple, count):
+        try:
+            if multiple:
+                message.channel.basic_ack(message.delivery_tag, multiple=True)
+
+            else:
+                message.ack()
+
+            self.counter_acked += count
+
+        except Exception as err:
+            # the message will be delivered again by the broker
+            self.logger.error(
+                u"Impossible to acknowledge message: {} ({})".format(
+                    err, type(err)))
+
+    def flush_acks(self):
+        """Acknowledge messages requested by other threads."""
+
+        while True:
+            try:
+                message, multiple, count = self.pending_acks.get_nowait()
+
+            except Empty:
+                break
+
+            self._ack(message, multiple, count)
+
+    def refresh_queue_depths(self, force=False):
+        """Refresh number of messages waiting in consumed queues."""
+
+        now = time()
+
+        if not force and now < self.stats_last + self.stats_interval:
+            return
+
+        self.stats_last = now
+
+        for qsettings in self.queues.values():
+            if qsettings['queue']:
+                try:
+                    _, depth, _ = qsettings['queue'].queue_declare(
+                        passive=True)
+
+                except self.connection_errors:
+                    raise
+
+                except Exception as err:
+                    self.logger.warning(
+                        u"Impossible to get depth of queue {}: {}".format(
+                            qsettings['queue_name'], err))
+
+                else:
+                    qsettings['depth'] = depth
+
+    def get_stats(self):
+        """Get consumption statistics.
+
+        :return: delivered and acknowledged message counts, number of
+            unacknowledged messages and depth by queue name (None if
+            unknown).
+        :rtype: dict
+        """
+
+        return {
+            'delivered': self.counter_delivered,
+            'acked': self.counter_acked,
+            'unacked': self.counter_delivered - self.counter_acked,
+            'depths': dict(
+                (queue_name, qsettings['depth'])
+                for queue_name, qsettings in self.queues.items()
+            )
         }
 
     def publish(
@@ -400,6 +534,82 @@ class Amqp(Thread):
                 routing_key
             ))
 
+    def publish_batch(
+        self,
+        msgs,
+        exchange_name=None,
+        serializer="json",
+        compression=None
+    ):
+        """Publish several messages with a single producer acquisition.
+
+        Messages already sent are not sent again when retrying after a
+        connection problem.
+
+        :param list msgs: ``(msg, routing_key)`` tuples to publish.
+        :param str exchange_name: exchange name. If None, use
+            ``exchange_name``.
+        """
+
+        msgs = list(msgs)
+        sent = 0
+        retries = 0
+
+        if not exchange_name:
+            exchange_name = self.exchange_name
+
+        while sent < len(msgs) and retries < self.max_retries:
+            retries += 1
+
+            if self.connected:
+                exchange = self.get_exchange(exchange_name)
+
+                with self.producers[self.conn].acquire(block=True) as producer:
+                    try:
+                        for msg, routing_key in msgs[sent:]:
+                            _msg = msg.copy()
+
+                            Amqp._clean_msg_for_serialization(_msg)
+
+                            producer.publish(
+                                _msg,
+                                serializer=serializer,
+                                compression=compression,
+                                routing_key=routing_key,
+                                exchange=exchange
+                            )
+
+                            sent += 1
+
+                        self.logger.debug(
+                            'publish {} messages in exchange {}'.format(
+                                len(msgs),
+                                exchange_name
+                            )
+                        )
+
+                    except Exception as e:
+                        self.logger.error(
+                            u' + Impossible to send {}'.format(e)
+                        )
+                        self.disconnect()
+                        self.connect()
+            else:
+                self.logger.error('Not connected ... try reconnecting')
+                self.connect()
+
+            if sent < len(msgs):
+                self.logger.info(u'Retry count {}'.format(
+                    retries
+                ))
+
+        if sent < len(msgs):
+            self.logger.error(
+                u'Too much retries for {} messages, give up'.format(
+                    len(msgs) - sent
+                )
+            )
+
     @staticmethod
     def _clean_msg_for_serialization(msg):
         from bson import objectid
@@ -430,6 +640,9 @@ class Amqp(Thread):
 
             self.cancel_queues()
 
+            # unacknowledged messages are requeued by the broker
+            self.counter_delivered = self.counter_acked
+
             for exchange in self.exchanges:
                 del exchange
             self.exchanges = {}
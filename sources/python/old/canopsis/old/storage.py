@@ -43,6 +43,9 @@ from urlparse import urlparse
 CONFIG = ConfigParser.RawConfigParser()
 CONFIG.read(os.path.join(sys.prefix, 'etc', 'cstorage.conf'))
 
+#: connections shared by storages by (process id, uri).
+CONNECTIONS = {}
+
 
 class Storage(object):
     def __init__(
@@ -188,7 +191,12 @@ class Storage(object):
         if self.connected:
             return True
 
-        self.conn = Connection(self.uri, safe=True)
+        key = os.getpid(), self.uri
+
+        if key not in CONNECTIONS:
+            CONNECTIONS[key] = Connection(self.uri, safe=True)
+
+        self.conn = CONNECTIONS[key]
         self.db = self.conn[self.mongo_db]
 
         manipulators = self.db.incoming_manipulators
@@ -21,7 +21,7 @@
 
 from unittest import TestCase, main
 
-from canopsis.old.mfilter import check
+from canopsis.old.mfilter import check, compile_mfilter
 
 event = {
     'connector': 'Engine',
@@ -177,5 +177,40 @@ class KnownValues(TestCase):
         match = check(filter1, event)
         self.assertFalse(match, msg='Filter: %s' % filter1)
 
+    def test_09_compiled(self):
+        filters = [
+            {},
+            {'connector': 'Engine'},
+            {'connector': 'cengidddddne'},
+            {'timestamp': {'$exists': True}},
+            {'timestamp': {'$exists': False}},
+            {'$or': [{'state': {'$eq': 0}}]},
+            {'$or': []},
+            {'timestamp': {'$gte': 1378713357}, 'state': {'$ne': 0}},
+            {'timestamp': {'$in': [0, 5, 6, 1378713357]}},
+            {'timestamp': {'$nin': [0, 5, 6]}},
+            {'connector': {'$in': ['Engine', 'other']}},
+            {'connector': {'$not': {'$eq': 'Engine'}}},
+            {'connector': {'$not': 'ngi', '$options': 'i'}},
+            {'$nor': [{'connector': 'Engine'}, {'state': 1}]},
+            {'$and': [{'connector': 'Engine'}], 'state': 1},
+            {'$or': [
+                {'$and': [{'connector': 'Engine'}, {'event_type': 'x'}]},
+                {'event_type': 'check'}
+            ]},
+            {'connector': {'$all': ['Engine', 'cEngine']}},
+            {'connector': {'$regex': '.ngInE'}},
+            {'connector': {'$regex': '.ngInE', '$options': 'i'}},
+            {'connector': {'$notregex': '^E'}, 'state': 0},
+            {'connector': {'$unknown': 'Engine'}},
+            {'unknown_field': 'value'},
+        ]
+
+        for mfilter in filters:
+            self.assertEqual(
+                compile_mfilter(mfilter)(event), check(mfilter, event),
+                msg='Filter: %s' % mfilter
+            )
+
 if __name__ == "__main__":
     main(verbosity=2)
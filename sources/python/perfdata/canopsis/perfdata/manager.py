@@ -151,6 +151,56 @@ class PerfData(MiddlewareRegistry):
 
         return result
 
+    def iget(self, metric_id, period=None, timewindow=None, limit=0):
+        """Iterate on points related to input metric_id on the timewindow and
+        input period, sorted by timestamp, without loading all of them.
+        """
+
+        period = self.get_period(metric_id, period=period)
+
+        result = self[PerfData.PERFDATA_STORAGE].iget(
+            data_id=metric_id, timewindow=timewindow, period=period,
+            limit=limit
+        )
+
+        return result
+
+    def get_many(self, metric_ids, timewindow=None, period=None):
+        """Get points of several metrics with one request per period.
+
+        :param list metric_ids: metric ids.
+        :param TimeWindow timewindow: points timewindow.
+        :param Period period: if None, use the default period of metrics.
+        :return: sorted points by metric id.
+        :rtype: dict
+        """
+
+        # group metric ids by period
+        metric_ids_by_period = []
+
+        for metric_id in metric_ids:
+            metric_period = self.get_period(metric_id, period=period)
+
+            for _period, _metric_ids in metric_ids_by_period:
+                if _period == metric_period:
+                    _metric_ids.append(metric_id)
+                    break
+
+            else:
+                metric_ids_by_period.append((metric_period, [metric_id]))
+
+        result = {}
+
+        for metric_period, _metric_ids in metric_ids_by_period:
+            result.update(
+                self[PerfData.PERFDATA_STORAGE].get_many(
+                    data_ids=_metric_ids, timewindow=timewindow,
+                    period=metric_period
+                )
+            )
+
+        return result
+
     def get_point(
             self, metric_id, period=None, with_meta=True, timestamp=None
     ):
@@ -225,11 +275,53 @@ class PerfData(MiddlewareRegistry):
             if meta is not None:
 
                 min_timestamp = min(point[0] for point in points)
-                # update meta data in a synchronous way
+                # unchanged meta data are not read nor written again
+                self[PerfData.META_STORAGE].put(
+                    data_id=metric_id,
+                    value=meta,
+                    timestamp=min_timestamp,
+                    cache=cache
+                )
+
+    def put_many(self, metrics, period=None, cache=False):
+        """Put points of several metrics with one storage request.
+
+        :param list metrics: (metric_id, points) or (metric_id, points, meta)
+            tuples.
+        :param Period period: if None, use the default period of metrics.
+        :param bool cache: use query cache if True (False by default).
+        """
+
+        entries = []
+
+        for metric in metrics:
+            metric_id, points = metric[:2]
+
+            if points:
+                entries.append(
+                    (
+                        metric_id,
+                        self.get_period(metric_id=metric_id, period=period),
+                        points
+                    )
+                )
+
+        if entries:
+            self[PerfData.PERFDATA_STORAGE].put_many(
+                entries=entries, cache=cache
+            )
+
+        for metric in metrics:
+            if len(metric) > 2 and metric[2] is not None and metric[1]:
+                metric_id, points, meta = metric
+
+                min_timestamp = min(point[0] for point in points)
+
                 self[PerfData.META_STORAGE].put(
                     data_id=metric_id,
                     value=meta,
-                    timestamp=min_timestamp
+                    timestamp=min_timestamp,
+                    cache=cache
                 )
 
     def remove(
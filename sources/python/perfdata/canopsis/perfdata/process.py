@@ -21,9 +21,6 @@
 from canopsis.task.core import register_task
 
 from canopsis.perfdata.manager import PerfData
-from canopsis.context.manager import Context
-
-from copy import deepcopy
 
 
 perfdatamgr = PerfData()
@@ -86,42 +83,36 @@ def event_processing(engine, event, manager=None, logger=None, **kwargs):
     event['perf_data_array'] = perf_data_array
 
     # remove perf_data_keys where values are None
-    for index, perf_data in enumerate(event['perf_data_array']):
-
-        perf_data_array_with_Nones = event['perf_data_array'][index]
+    for index, perf_data in enumerate(perf_data_array):
 
-        event['perf_data_array'][index] = {
-            name: perf_data_array_with_Nones[name]
-            for name in perf_data_array_with_Nones
-            if perf_data_array_with_Nones[name] is not None
-        }
+        if None in perf_data.values():
+            perf_data_array[index] = {
+                name: perf_data[name]
+                for name in perf_data
+                if perf_data[name] is not None
+            }
 
     logger.debug('perf_data_array: {0}'.format(perf_data_array))
 
-    event = deepcopy(event)
-
     # Metrology
     timestamp = event.get('timestamp', None)
 
     if timestamp is not None:
 
-        perf_data_array = event.get('perf_data_array', [])
+        prefix = manager.context.get_metric_prefix(event)
 
-        for perf_data in perf_data_array:
+        metrics = []
 
-            perf_data = perf_data.copy()
-            event_with_metric = deepcopy(event)
-            event_with_metric['type'] = 'metric'
-            event_with_metric[Context.NAME] = perf_data.pop('metric')
+        for perf_data in perf_data_array:
 
-            metric_id = manager.context.get_entity_id(
-                event_with_metric
+            meta = perf_data.copy()
+            metric_id = manager.context.get_metric_id(
+                event, meta.pop('metric'), prefix=prefix
             )
-            value = perf_data.pop('value', None)
+            value = meta.pop('value', None)
 
-            manager.put(
-                metric_id=metric_id, points=[(timestamp, value)],
-                meta=perf_data, cache=True
-            )
+            metrics.append((metric_id, [(timestamp, value)], meta))
+
+        manager.put_many(metrics=metrics, cache=True)
 
     return event
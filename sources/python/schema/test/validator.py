@@ -0,0 +1,123 @@
+# /usr/bin/env python
+# -*- coding: utf-8 -*-
+# --------------------------------
+# Copyright (c) 2015 "Capensis" [http://www.capensis.com]
+#
+# This file is part of Canopsis.
+#
+# Canopsis is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Canopsis is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
+# ---------------------------------
+
+from unittest import TestCase, main
+from mock import patch
+
+from validictory import ValidationError, SchemaError
+
+from canopsis.tools.schema import (
+    CompiledValidator, ValidatorRegistry, NoSchemaError
+)
+
+
+SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'event_type': {'type': 'string', 'required': True},
+        'state': {'type': 'integer', 'minimum': 0, 'maximum': 3},
+        'tags': {'type': 'array', 'items': {'type': 'string'}}
+    }
+}
+
+
+class CompiledValidatorTest(TestCase):
+
+    def setUp(self):
+        self.validator = CompiledValidator(SCHEMA, required_by_default=False)
+
+    def test_valid(self):
+        self.validator.validate(
+            {'event_type': 'check', 'state': 1, 'tags': ['a']}
+        )
+        self.validator.validate({'event_type': 'check'})
+
+    def test_invalid(self):
+        for data in [
+            {},
+            {'event_type': 1},
+            {'event_type': 'check', 'state': 4},
+            {'event_type': 'check', 'tags': [1]}
+        ]:
+            self.assertRaises(ValidationError, self.validator.validate, data)
+
+    def test_schema_error(self):
+        self.assertRaises(
+            SchemaError, CompiledValidator, {'optional': True}
+        )
+        self.assertRaises(
+            SchemaError, CompiledValidator,
+            {'properties': {'a': {'items': {'requires': 'b'}}}}
+        )
+        self.assertRaises(
+            SchemaError, CompiledValidator, {'properties': {'a': 'string'}}
+        )
+
+
+class ValidatorRegistryTest(TestCase):
+
+    def setUp(self):
+        self.schemas = {'test': SCHEMA}
+        self.registry = ValidatorRegistry(ttl=0)
+
+        patcher = patch.object(
+            ValidatorRegistry, '_find_schema',
+            side_effect=lambda schema_id: self.schemas.get(schema_id)
+        )
+        self.find_schema = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_validator(self):
+        validator = self.registry.get_validator('test')
+
+        self.assertIs(validator.schema, SCHEMA)
+        self.assertIs(self.registry.get_validator('test'), validator)
+        self.assertEqual(self.find_schema.call_count, 1)
+
+    def test_no_schema(self):
+        self.assertRaises(NoSchemaError, self.registry.get_validator, 'none')
+        self.assertRaises(NoSchemaError, self.registry.get_schema, 'none')
+        self.assertEqual(self.find_schema.call_count, 1)
+
+    def test_invalidate(self):
+        validator = self.registry.get_validator('test')
+
+        self.schemas['test'] = {'type': 'object'}
+        self.registry.invalidate('test')
+
+        self.assertIsNot(self.registry.get_validator('test'), validator)
+
+    @patch('canopsis.tools.schema.time', side_effect=[0, 10, 20])
+    def test_ttl(self, time):
+        self.registry.ttl = 5
+        validator = self.registry.get_validator('test')
+
+        # same schema, same validator
+        self.assertIs(self.registry.get_validator('test'), validator)
+        self.assertEqual(self.find_schema.call_count, 2)
+
+        self.schemas['test'] = {'type': 'object'}
+
+        self.assertIsNot(self.registry.get_validator('test'), validator)
+
+
+if __name__ == '__main__':
+    main()
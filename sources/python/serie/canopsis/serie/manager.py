@@ -23,6 +23,8 @@
 from canopsis.middleware.registry import MiddlewareRegistry
 from canopsis.configuration.configurable.decorator import add_category
 from canopsis.configuration.configurable.decorator import conf_paths
+from canopsis.configuration.model import Parameter
+from canopsis.common.lru import LRUCache
 
 from canopsis.serie.utils import build_filter_from_regex
 from canopsis.timeserie.timewindow import Period, Interval, TimeWindow
@@ -36,17 +38,62 @@ from RestrictedPython.Guards import safe_builtins
 
 from operator import itemgetter
 
+from bisect import bisect_left, bisect_right
+
 from math import isnan
 
+from multiprocessing import cpu_count
+
 from time import time
 
 
 CONF_PATH = 'serie/manager.conf'
 CATEGORY = 'SERIE'
+CONTENT = [
+    Parameter('points_cache_size', int),
+    Parameter('points_grace', float),
+    Parameter('workers', int),
+    Parameter('workers_timeout', float)
+]
+
+#: default maximal number of cached aggregated points.
+DEFAULT_POINTS_CACHE_SIZE = 100000
+#: default duration in seconds after the end of an aggregation interval
+#: before its aggregated value is cached, in order to get points stored late.
+DEFAULT_POINTS_GRACE = 300
+
+#: default maximal duration in seconds of a batch computed by workers.
+DEFAULT_WORKERS_TIMEOUT = 60
+
+FORMULA_CACHE_SIZE = 1024  #: maximal number of compiled formulas.
+_formula_cache = {}  #: compiled formulas by formula text.
+
+
+def compile_formula(formula):
+    """
+    Compile a serie formula in a sand-boxed code, once per formula text.
+
+    :param formula: formula to compile
+    :type formula: str
+
+    :returns: compiled code to eval
+    """
+
+    result = _formula_cache.get(formula)
+
+    if result is None:
+        result = compile_restricted(formula, '<string>', 'eval')
+
+        if len(_formula_cache) >= FORMULA_CACHE_SIZE:
+            _formula_cache.clear()
+
+        _formula_cache[formula] = result
+
+    return result
 
 
 @conf_paths(CONF_PATH)
-@add_category(CATEGORY)
+@add_category(CATEGORY, content=CONTENT)
 class Serie(MiddlewareRegistry):
     """Serie manager."""
 
@@ -54,15 +101,108 @@ class Serie(MiddlewareRegistry):
     CONTEXT_MANAGER = 'context'  #: serie context manager name.
     PERFDATA_MANAGER = 'perfdata'  #: serie perfdata manager name.
 
+    @property
+    def points_cache_size(self):
+        """Maximal number of aggregated points cached by (serie, metric id).
+        The cache is disabled if not greater than 0."""
+
+        if not hasattr(self, '_points_cache_size'):
+            self.points_cache_size = None
+
+        return self._points_cache_size
+
+    @points_cache_size.setter
+    def points_cache_size(self, value):
+        if value is None:
+            value = DEFAULT_POINTS_CACHE_SIZE
+
+        self._points_cache_size = value
+        self._points_cache = LRUCache(
+            max_size=value, sizeof=lambda entry: len(entry[-1]) + 1
+        ) if value > 0 else None
+
+    @property
+    def points_grace(self):
+        """Duration in seconds after the end of an aggregation interval before
+        its aggregated value is cached."""
+
+        if not hasattr(self, '_points_grace'):
+            self.points_grace = None
+
+        return self._points_grace
+
+    @points_grace.setter
+    def points_grace(self, value):
+        if value is None:
+            value = DEFAULT_POINTS_GRACE
+
+        self._points_grace = float(value)
+
+    @property
+    def workers(self):
+        """Number of processes computing batches of series, 0 to compute
+        them in the calling process."""
+
+        if not hasattr(self, '_workers'):
+            self.workers = None
+
+        return self._workers
+
+    @workers.setter
+    def workers(self, value):
+        if value is None:
+            try:
+                value = cpu_count()
+
+            except NotImplementedError:
+                value = 0
+
+        self._workers = value
+
+    @property
+    def workers_timeout(self):
+        """Maximal duration in seconds of a batch computed by workers."""
+
+        if not hasattr(self, '_workers_timeout'):
+            self.workers_timeout = None
+
+        return self._workers_timeout
+
+    @workers_timeout.setter
+    def workers_timeout(self, value):
+        if value is None:
+            value = DEFAULT_WORKERS_TIMEOUT
+
+        self._workers_timeout = float(value)
+
     def __init__(
             self,
             serie_storage=None,
             context=None,
             perfdata=None,
+            points_cache_size=None,
+            points_grace=None,
+            workers=None,
+            workers_timeout=None,
             *args, **kwargs
     ):
         super(Serie, self).__init__(*args, **kwargs)
 
+        if points_cache_size is not None:
+            self.points_cache_size = points_cache_size
+
+        if points_grace is not None:
+            self.points_grace = points_grace
+
+        if workers is not None:
+            self.workers = workers
+
+        if workers_timeout is not None:
+            self.workers_timeout = workers_timeout
+
+        # superposed points by regex of the last consolidated perfdatas
+        self._superposed = None, {}
+
         if serie_storage is not None:
             self[Serie.SERIE_STORAGE] = serie_storage
 
@@ -102,10 +242,14 @@ class Serie(MiddlewareRegistry):
 
             return result
 
-    def get_perfdata(self, metrics, timewindow=None):
+    def get_perfdata(self, metrics, timewindow=None, starts=None):
         """
         Internal method to fetch perfdata from metrics.
 
+        :param starts: fetch start timestamp by metric id, instead of the
+            timewindow start (optional)
+        :type starts: dict
+
         :returns: perfdata per metric id as dict
         """
 
@@ -113,47 +257,103 @@ class Serie(MiddlewareRegistry):
 
         for metric in metrics:
             mid = self[Serie.CONTEXT_MANAGER].get_entity_id(metric)
-            perfdata = self[Serie.PERFDATA_MANAGER].get(
-                mid,
-                timewindow=timewindow,
-                with_meta=False
-            )
 
             result[mid] = {
-                'entity': metric,
-                'points': perfdata
+                'entity': metric
             }
 
+        # fetch points of metrics with the same start at once
+        mids_by_start = {}
+
+        for mid in result:
+            start = None if timewindow is None else timewindow.start()
+
+            if starts is not None:
+                start = starts.get(mid, start)
+
+            mids_by_start.setdefault(start, []).append(mid)
+
+        for start, mids in mids_by_start.items():
+            fetch_timewindow = timewindow
+
+            if timewindow is not None and start != timewindow.start():
+                fetch_timewindow = TimeWindow(
+                    start=start, stop=timewindow.stop()
+                )
+
+            points_by_id = self[Serie.PERFDATA_MANAGER].get_many(
+                mids, timewindow=fetch_timewindow
+            )
+
+            for mid in mids:
+                result[mid]['points'] = points_by_id.get(mid, [])
+
         return result
 
-    def subset_perfdata_superposed(self, regex, perfdatas):
+    @property
+    def points_cache(self):
+        """LRU cache of aggregated points of closed intervals by (serie,
+        metric id)."""
+
+        if not hasattr(self, '_points_cache'):
+            self.points_cache_size = None
+
+        return self._points_cache
+
+    def subset_perfdata_superposed(self, regex, perfdatas, timewindow=None):
         """
         Get superposed points of metric matching filter.
 
+        Superposed points are computed once per regex for the last given
+        perfdatas.
+
         :param regex: filter for ``get_metric()`` method
         :type regex: str
 
         :param perfdatas: perfdata fetched with ``get_perfdata()`` method
         :type perfdatas: dict
 
+        :param timewindow: if given, only points between the timewindow
+            start and stop are returned (optional)
+        :type timewindow: canopsis.timeserie.timewindow.TimeWindow
+
         :returns: superposed points as list
         """
 
-        selected_metrics = [perfdatas[key]['entity'] for key in perfdatas]
+        superposed_perfdatas, superposed = self._superposed
 
-        metrics = self.get_metrics(regex, selected_metrics)
+        if superposed_perfdatas is not perfdatas:
+            superposed = {}
+            self._superposed = perfdatas, superposed
 
-        metric_ids = [
-            self[Serie.CONTEXT_MANAGER].get_entity_id(metric)
-            for metric in metrics
-        ]
+        if regex in superposed:
+            points, timestamps = superposed[regex]
 
-        points = []
+        else:
+            selected_metrics = [perfdatas[key]['entity'] for key in perfdatas]
+
+            metrics = self.get_metrics(regex, selected_metrics)
+
+            metric_ids = [
+                self[Serie.CONTEXT_MANAGER].get_entity_id(metric)
+                for metric in metrics
+            ]
+
+            points = []
+
+            for metric_id in metric_ids:
+                points += perfdatas[metric_id]['aggregated']
+
+            points = sorted(points, key=itemgetter(0))
+            timestamps = [point[0] for point in points]
 
-        for metric_id in metric_ids:
-            points += perfdatas[metric_id]['aggregated']
+            superposed[regex] = points, timestamps
 
-        points = sorted(points, key=itemgetter(0))
+        if timewindow is not None:
+            points = points[
+                bisect_left(timestamps, timewindow.start()):
+                bisect_right(timestamps, timewindow.stop())
+            ]
 
         return points
 
@@ -186,6 +386,17 @@ class Serie(MiddlewareRegistry):
         )
 
         metrics = self.get_metrics(serieconf['metric_filter'])
+
+        cache_key = serieconf.get('_id')
+
+        # aggregated values are reusable if intervals do not depend on the
+        # timewindow start, and do not depend on previous intervals
+        if cache_key is not None and self.points_cache is not None \
+                and fixed and timeserie.aggregation != 'DELTA':
+            return self._cached_aggregation(
+                cache_key, metrics, timeserie, tw, period, usenan
+            )
+
         perfdatas = self.get_perfdata(metrics, timewindow=tw)
 
         for key in perfdatas:
@@ -197,6 +408,115 @@ class Serie(MiddlewareRegistry):
 
         return perfdatas
 
+    def _cached_aggregation(
+            self, cache_key, metrics, timeserie, timewindow, period, usenan
+    ):
+        """
+        Aggregate perfdata like aggregation does, with aggregated values of
+        closed intervals taken from the points cache. Only points after the
+        last cached interval are fetched and aggregated.
+
+        An interval is closed, and its aggregated value cached, once it ended
+        since points_grace seconds.
+
+        :returns: aggregated perfdata classified by metric id as dict
+        """
+
+        cache = self.points_cache
+        stop = timewindow.stop()
+
+        timesteps = timeserie.timesteps(timewindow)
+        # interval start timestamps
+        steps = timesteps[:-1]
+        start = timesteps[0]
+
+        # the timewindow stop may be rounded after now
+        deadline = min(stop, time()) - self.points_grace
+        index = bisect_right(steps, deadline) - 1
+        closed = steps[index] if index >= 0 else start
+
+        signature = (
+            timeserie.aggregation,
+            tuple(sorted(period.unit_values.items())),
+            usenan
+        )
+
+        mids = [
+            self[Serie.CONTEXT_MANAGER].get_entity_id(metric)
+            for metric in metrics
+        ]
+
+        # (fetch start, cached aggregated points) by metric id
+        cached = {}
+
+        for mid in mids:
+            entry = cache.get((cache_key, mid))
+
+            if entry is not None:
+                entry_signature, entry_start, entry_closed, points = entry
+
+                if entry_signature == signature \
+                        and entry_start <= start <= entry_closed <= stop \
+                        and entry_closed in timesteps:
+                    cached[mid] = entry_closed, [
+                        point for point in points if point[0] >= start
+                    ]
+
+            if mid not in cached:
+                cached[mid] = start, []
+
+        perfdatas = self.get_perfdata(
+            metrics, timewindow=timewindow,
+            starts=dict((mid, cached[mid][0]) for mid in cached)
+        )
+
+        nan = float('nan')
+
+        for mid in perfdatas:
+            fetch_start, aggregated = cached[mid]
+            points = perfdatas[mid]['points']
+
+            new = timeserie.calculate(
+                points=points,
+                timewindow=TimeWindow(start=fetch_start, stop=stop),
+                usenan=usenan
+            )
+
+            # intervals with points, whose aggregated values are kept
+            filled = set()
+
+            if steps:
+                for timestamp, value in points:
+                    if fetch_start <= timestamp <= stop \
+                            and (usenan or not isnan(value)):
+                        filled.add(steps[bisect_right(steps, timestamp) - 1])
+
+            aggregated = aggregated + [
+                point for point in new if point[0] in filled
+            ]
+
+            entry_closed = max(closed, fetch_start)
+            cache[(cache_key, mid)] = signature, start, entry_closed, [
+                point for point in aggregated if point[0] < entry_closed
+            ]
+
+            if not usenan:
+                aggregated = [
+                    point for point in aggregated if not isnan(point[1])
+                ]
+
+            elif aggregated:
+                # like calculate, intervals without points are nan
+                values = dict(aggregated)
+                aggregated = [
+                    (timestamp, values.get(timestamp, nan))
+                    for timestamp in steps
+                ]
+
+            perfdatas[mid]['aggregated'] = aggregated
+
+        return perfdatas
+
     def consolidation(
             self, serieconf, perfdatas, timewindow,
             period=None, usenan=True, fixed=True
@@ -232,6 +552,9 @@ class Serie(MiddlewareRegistry):
         # generator consolidation operators
         operatorset = get_task('serie.operatorset')
 
+        formula = serieconf['formula']
+        code = compile_formula(formula)
+
         # generate one point per aggregation interval in timewindow
         for interval in intervals:
             tw = TimeWindow(
@@ -249,9 +572,6 @@ class Serie(MiddlewareRegistry):
 
             restricted_globals.update(operators)
 
-            formula = serieconf['formula']
-            code = compile_restricted(formula, '<string>', 'eval')
-
             try:
                 val = eval(code, restricted_globals)
 
@@ -315,31 +635,82 @@ class Serie(MiddlewareRegistry):
         points = [point for point in points if point[0] <= lastts]
 
         serieconf['last_computation'] = lastts
+        serieconf['next_computation'] = self.get_next_computation(serieconf)
         self[Serie.SERIE_STORAGE].put_element(element=serieconf)
 
         return points
 
-    def get_series(self, timestamp):
+    @staticmethod
+    def get_next_computation(serieconf):
+        """
+        Get the timestamp of the next computation of a serie.
+
+        :param serieconf: Serie
+        :type serieconf: dict
+
+        :returns: last computation plus the computation delay, or None if the
+                  serie does not define its computation delay
+        """
+
+        result = None
+
+        try:
+            delay = float(serieconf['aggregation_interval']) / \
+                serieconf['computations_per_interval']
+
+        except (KeyError, TypeError, ZeroDivisionError):
+            pass
+
+        else:
+            result = serieconf.get('last_computation', 0) + delay
+
+        return result
+
+    def get_series(self, timestamp, ids=None):
         """
         Get series that need to be computed at specified timestamp.
 
+        Series are selected on their indexed ``next_computation`` field.
+        Series without this field (created outside ``calculate()``) are
+        updated with it.
+
         :param timestamp: Timestamp used to determine if a serie needs
                           to be computed
         :type timestamp: int
 
+        :param ids: restrict the selection to these serie ids (optional)
+        :type ids: list
+
         :returns: list of serie
         """
 
         storage = self[Serie.SERIE_STORAGE]
 
-        javascript_condition = '({0} - {1}) >= ({2} / {3})'.format(
-            timestamp,
-            'this.last_computation',
-            'this.aggregation_interval',
-            'this.computations_per_interval'
-        )
+        query = {
+            '$or': [
+                {'next_computation': {'$lte': timestamp}},
+                {'next_computation': {'$exists': False}}
+            ]
+        }
+
+        if ids is not None:
+            query['_id'] = {'$in': list(ids)}
+
+        result = []
+
+        for serieconf in storage.find_elements(query=query):
+            if 'next_computation' not in serieconf:
+                serieconf['next_computation'] = self.get_next_computation(
+                    serieconf
+                )
+                storage.put_element(element=serieconf)
+
+            next_computation = serieconf['next_computation']
 
-        return storage.find_elements(query={'$where': javascript_condition})
+            if next_computation is not None and next_computation <= timestamp:
+                result.append(serieconf)
+
+        return result
 
     @staticmethod
     def get_timewindow_period_usenan_fixed(
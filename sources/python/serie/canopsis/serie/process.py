@@ -25,8 +25,9 @@ from canopsis.task.core import register_task
 from canopsis.engines.core import publish
 
 from canopsis.serie.manager import Serie
+from canopsis.serie.scheduler import SerieScheduler
 
-from time import time
+from multiprocessing import Pool
 
 
 @register_task
@@ -36,9 +37,13 @@ def beat_processing(engine, manager=None, logger=None, **_):
     if manager is None:
         manager = singleton_per_scope(Serie)
 
+    scheduler = singleton_per_scope(
+        SerieScheduler, scope=manager, kwargs={'manager': manager}
+    )
+
     with engine.Lock(engine, 'serie_fetching') as lock:
         if lock.own():
-            for serie in manager.get_series(time()):
+            for serie in scheduler.get_due_series():
                 publish(
                     publisher=engine.amqp,
                     event=serie,
@@ -48,12 +53,15 @@ def beat_processing(engine, manager=None, logger=None, **_):
                 )
 
 
-@register_task
-def serie_processing(engine, event, manager=None, logger=None, **_):
-    """Engine work processing task."""
+def get_serie_metric(manager, event, connector_name):
+    """Compute a serie and get its metric.
 
-    if manager is None:
-        manager = singleton_per_scope(Serie)
+    :param Serie manager: serie manager.
+    :param dict event: serie to compute.
+    :param str connector_name: connector name of the serie metric.
+    :return: (metric id, points, meta).
+    :rtype: tuple
+    """
 
     # Generate metric metadata
     metric_meta = {
@@ -67,7 +75,7 @@ def serie_processing(engine, event, manager=None, logger=None, **_):
     entity = {
         'type': 'metric',
         'connector': 'canopsis',
-        'connector_name': engine.name,
+        'connector_name': connector_name,
         'component': event['component'],
         'resource': event['resource'],
         'name': event['crecord_name']
@@ -76,11 +84,171 @@ def serie_processing(engine, event, manager=None, logger=None, **_):
     context = manager[Serie.CONTEXT_MANAGER]
     entity_id = context.get_entity_id(entity)
 
+    result = entity_id, manager.calculate(event), metric_meta
+
+    return result
+
+
+@register_task
+def serie_processing(engine, event, manager=None, logger=None, **_):
+    """Engine work processing task."""
+
+    if manager is None:
+        manager = singleton_per_scope(Serie)
+
+    entity_id, points, metric_meta = get_serie_metric(
+        manager, event, engine.name
+    )
+
     # Publish points
     perfdata = manager[Serie.PERFDATA_MANAGER]
     perfdata.put(
         entity_id,
-        points=manager.calculate(event),
+        points=points,
         meta=metric_meta,
         cache=False
     )
+
+
+#: serie manager of a worker process.
+_worker_manager = None
+#: pool of worker processes.
+_pool = None
+
+
+def _init_worker():
+    """Initialize a worker process with its own storage connections."""
+
+    global _worker_manager
+
+    _worker_manager = Serie()
+
+
+def _compute_serie(args):
+    """Compute a serie in a worker process.
+
+    :return: (metric, None) or (None, error message).
+    """
+
+    event, connector_name = args
+
+    try:
+        result = get_serie_metric(_worker_manager, event, connector_name), None
+
+    except Exception as ex:
+        result = None, '{0}: {1}'.format(event.get('crecord_name'), ex)
+
+    return result
+
+
+def get_pool(workers):
+    """Get the pool of worker processes, created if needed.
+
+    Processes are forked, so the pool has to be created before the engine
+    starts threads.
+    """
+
+    global _pool
+
+    if _pool is None:
+        _pool = Pool(processes=workers, initializer=_init_worker)
+
+    return _pool
+
+
+def reset_pool():
+    """Terminate the pool of worker processes. Series are then computed in
+    the engine process."""
+
+    global _pool
+
+    if _pool is not None:
+        _pool.terminate()
+        _pool = None
+
+
+def compute_series(manager, events, connector_name):
+    """Compute series in the calling process.
+
+    :return: list of (metric, None) or (None, error message).
+    """
+
+    result = []
+
+    for event in events:
+        try:
+            metric = get_serie_metric(manager, event, connector_name)
+
+        except Exception as ex:
+            result.append(
+                (None, '{0}: {1}'.format(event.get('crecord_name'), ex))
+            )
+
+        else:
+            result.append((metric, None))
+
+    return result
+
+
+@register_task
+def init_processing(engine, manager=None, logger=None, **_):
+    """Engine initialization task.
+
+    Create the pool of worker processes before the engine starts threads.
+    """
+
+    if manager is None:
+        manager = singleton_per_scope(Serie)
+
+    if manager.workers > 0:
+        get_pool(manager.workers)
+
+
+@register_task
+def batch_processing(engine, events, manager=None, logger=None, **_):
+    """Engine batch processing task.
+
+    Series are computed by the pool of worker processes created by
+    init_processing, then their points are put with one storage request.
+    If the pool fails or does not compute the batch in
+    manager.workers_timeout seconds, it is terminated, and this batch and
+    the next ones are computed in the engine process. The pool is not
+    created again here because forking while engine threads run is unsafe.
+    """
+
+    if manager is None:
+        manager = singleton_per_scope(Serie)
+
+    results = None
+
+    if _pool is not None and manager.workers > 0 and len(events) > 1:
+        try:
+            results = _pool.map_async(
+                _compute_serie, [(event, engine.name) for event in events]
+            ).get(manager.workers_timeout)
+
+        except Exception as ex:
+            if logger is not None:
+                logger.error(
+                    'Workers failed to compute series, they are stopped '
+                    'until the engine restarts: {0}'.format(ex)
+                )
+
+            reset_pool()
+
+    if results is None:
+        results = compute_series(manager, events, engine.name)
+
+    metrics = []
+
+    for metric, error in results:
+        if error is None:
+            metrics.append(metric)
+
+        elif logger is not None:
+            logger.error('Impossible to compute serie {0}'.format(error))
+
+    # Publish points
+    manager[Serie.PERFDATA_MANAGER].put_many(metrics=metrics, cache=False)
+
+    return [None] * len(events)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# --------------------------------
+# Copyright (c) 2015 "Capensis" [http://www.capensis.com]
+#
+# This file is part of Canopsis.
+#
+# Canopsis is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Canopsis is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
+# ---------------------------------
+
+"""Module of the serie computation scheduler."""
+
+from canopsis.serie.manager import Serie
+
+from heapq import heapify, heappush, heappop
+
+from time import time
+
+
+class SerieScheduler(object):
+    """
+    Priority queue of upcoming serie computations.
+
+    Series due before the end of the refresh horizon are loaded from the
+    storage with an indexed range query, then kept in a heap ordered by
+    ``next_computation``. Heap entries are hints: due series are read again
+    from the storage before being returned, so computations done elsewhere
+    are not repeated.
+    """
+
+    DEFAULT_HORIZON = 60  #: default duration in seconds between two loads.
+
+    def __init__(self, manager, horizon=DEFAULT_HORIZON, *args, **kwargs):
+        """
+        :param manager: Serie manager
+        :type manager: canopsis.serie.manager.Serie
+
+        :param horizon: duration in seconds of series loaded in the heap
+        :type horizon: float
+        """
+
+        super(SerieScheduler, self).__init__(*args, **kwargs)
+
+        self.manager = manager
+        self.horizon = horizon
+
+        self._heap = []
+        self._next_load = 0
+
+    def load(self, timestamp):
+        """
+        Load series to compute before ``timestamp + horizon`` in the heap.
+
+        :param timestamp: current timestamp
+        :type timestamp: float
+        """
+
+        until = timestamp + self.horizon
+
+        series = self.manager.get_series(until)
+
+        self._heap = [
+            (serie['next_computation'], serie['_id']) for serie in series
+        ]
+        heapify(self._heap)
+
+        self._next_load = until
+
+    def get_due_series(self, timestamp=None):
+        """
+        Get series to compute at ``timestamp``.
+
+        :param timestamp: Timestamp used to determine if a serie needs to be
+                          computed. Default is now.
+        :type timestamp: float
+
+        :returns: list of serie
+        """
+
+        if timestamp is None:
+            timestamp = time()
+
+        if timestamp >= self._next_load:
+            self.load(timestamp)
+
+        heap = self._heap
+        ids = set()
+
+        while heap and heap[0][0] <= timestamp:
+            ids.add(heappop(heap)[1])
+
+        if not ids:
+            return []
+
+        result = self.manager.get_series(timestamp, ids=ids)
+
+        due = set()
+
+        for serie in result:
+            due.add(serie['_id'])
+
+            # the computation will update next_computation
+            serie = serie.copy()
+            serie['last_computation'] = timestamp
+            self._schedule(serie)
+
+        # series computed elsewhere are scheduled with their stored value
+        if due != ids:
+            for serie in self.manager[Serie.SERIE_STORAGE].get_elements(
+                    ids=list(ids - due)
+            ):
+                serie.setdefault(
+                    'next_computation', Serie.get_next_computation(serie)
+                )
+                self._schedule(serie)
+
+        return result
+
+    def _schedule(self, serie):
+        """Push the next computation of a serie in the heap."""
+
+        next_computation = serie.get('next_computation')
+
+        if next_computation is None or \
+                next_computation <= serie.get('last_computation', 0):
+            next_computation = Serie.get_next_computation(serie)
+
+        if next_computation is not None and next_computation < self._next_load:
+            heappush(self._heap, (next_computation, serie['_id']))
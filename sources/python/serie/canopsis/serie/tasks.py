@@ -22,6 +22,7 @@
 
 from canopsis.timeserie.aggregation import get_aggregations
 from canopsis.timeserie.core import TimeSerie
+from canopsis.timeserie.timewindow import TimeWindow
 from canopsis.task.core import register_task
 
 
@@ -63,14 +64,23 @@ def new_operator(opname, manager, period, perfdatas, timewindow, usenan=True):
 
         result = float('nan')
 
-        points = manager.subset_perfdata_superposed(regex, perfdatas)
+        timeserie = TimeSerie(
+            period=period,
+            aggregation=opname
+        )
 
-        if points:
-            timeserie = TimeSerie(
-                period=period,
-                aggregation=opname
-            )
+        # calculate may extend the timewindow start to its rounded value
+        start = timewindow.start()
+
+        if timeserie.round_time:
+            start = min(start, period.round_timestamp(timestamp=start))
 
+        points = manager.subset_perfdata_superposed(
+            regex, perfdatas,
+            timewindow=TimeWindow(start=start, stop=timewindow.stop())
+        )
+
+        if points:
             consolidated = timeserie.calculate(
                 points=points, timewindow=timewindow, usenan=usenan
             )
@@ -20,8 +20,11 @@
 # ---------------------------------
 
 from unittest import TestCase, main
+from mock import MagicMock
+from math import isnan
 
 from canopsis.middleware.core import Middleware
+from canopsis.timeserie.timewindow import TimeWindow, Period
 from canopsis.perfdata.manager import PerfData
 from canopsis.context.manager import Context
 from canopsis.serie.manager import Serie
@@ -88,5 +91,120 @@ class TestSerieManager(BaseTestSerieManager):
         raise NotImplementedError()
 
 
+class TestSeriePointsCache(TestCase):
+    def setUp(self):
+        self.points = {
+            'm1': [(t, float(t % 7)) for t in range(0, 3000, 25)],
+            'm2': [(t, float(t % 5)) for t in range(0, 3000, 110)]
+        }
+
+        self.perf_manager = MagicMock(spec=PerfData)
+        self.perf_manager.get_many.side_effect = self._get_many
+
+        self.ctx_manager = MagicMock(spec=Context)
+        self.ctx_manager.get_entity_id.side_effect = lambda m: m['_id']
+        self.ctx_manager.find.return_value = [{'_id': 'm1'}, {'_id': 'm2'}]
+
+        self.serie_manager = self._serie_manager(points_cache_size=1000)
+        self.full_manager = self._serie_manager(points_cache_size=0)
+
+        self.serieconf = {
+            '_id': 'serie',
+            'metric_filter': 'me:.*',
+            'aggregation_method': 'MEAN',
+            'aggregation_interval': 60,
+            'round_time_interval': True
+        }
+
+    def _serie_manager(self, **kwargs):
+        result = Serie(points_grace=120, **kwargs)
+        result[Serie.CONTEXT_MANAGER] = self.ctx_manager
+        result[Serie.PERFDATA_MANAGER] = self.perf_manager
+
+        return result
+
+    def _get_many(self, mids, timewindow):
+        return {
+            mid: [
+                point for point in self.points.get(mid, [])
+                if timewindow.start() <= point[0] <= timewindow.stop()
+            ]
+            for mid in mids
+        }
+
+    def _aggregated(self, manager, start, stop, usenan=True):
+        perfdatas = manager.aggregation(
+            self.serieconf, TimeWindow(start=start, stop=stop),
+            usenan=usenan
+        )
+
+        return dict(
+            (mid, [
+                (timestamp, 'nan' if isnan(value) else value)
+                for timestamp, value in perfdatas[mid]['aggregated']
+            ])
+            for mid in perfdatas
+        )
+
+    def _check_runs(self, usenan=True):
+        for stop in range(600, 3000, 170):
+            start = stop - 600
+
+            self.perf_manager.get_many.reset_mock()
+
+            self.assertEqual(
+                self._aggregated(self.serie_manager, start, stop, usenan),
+                self._aggregated(self.full_manager, start, stop, usenan)
+            )
+
+    def test_aggregation(self):
+        for aggregation in ['MEAN', 'SUM', 'MAX', 'LAST']:
+            self.serieconf['aggregation_method'] = aggregation
+            self._check_runs()
+
+    def test_aggregation_usenan(self):
+        self.points['m1'][10] = (250, float('nan'))
+        self.points['m2'] = []
+
+        self._check_runs(usenan=True)
+        self._check_runs(usenan=False)
+
+    def test_incremental_fetch(self):
+        self._aggregated(self.serie_manager, 0, 600)
+
+        self.perf_manager.get_many.reset_mock()
+        self._aggregated(self.serie_manager, 300, 900)
+
+        # intervals closed since points_grace seconds are not fetched again
+        starts = [
+            call[1]['timewindow'].start()
+            for call in self.perf_manager.get_many.call_args_list
+        ]
+        self.assertEqual(starts, [540])
+
+    def test_late_point(self):
+        self._aggregated(self.serie_manager, 0, 600)
+
+        # stored late, in an interval which is not closed yet
+        self.points['m2'].append((560, 100.))
+        self.points['m2'].sort()
+
+        self.assertEqual(
+            self._aggregated(self.serie_manager, 0, 700),
+            self._aggregated(self.full_manager, 0, 700)
+        )
+
+    def test_cache_size(self):
+        self.serie_manager.points_cache_size = 25
+
+        self._aggregated(self.serie_manager, 0, 1200)
+
+        cache = self.serie_manager.points_cache
+
+        # 19 closed intervals of m1 and 11 of m2 with points do not fit
+        self.assertEqual(len(cache), 1)
+        self.assertLessEqual(cache.size, 25)
+
+
 if __name__ == '__main__':
     main()
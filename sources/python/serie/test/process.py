@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# --------------------------------
+# Copyright (c) 2015 "Capensis" [http://www.capensis.com]
+#
+# This file is part of Canopsis.
+#
+# Canopsis is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Canopsis is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
+# ---------------------------------
+
+from unittest import TestCase, main
+from mock import MagicMock, patch
+from multiprocessing import TimeoutError
+
+from canopsis.perfdata.manager import PerfData
+from canopsis.context.manager import Context
+from canopsis.serie.manager import Serie
+from canopsis.serie import process
+
+
+class TestBatchProcessing(TestCase):
+    def setUp(self):
+        self.ctx_manager = MagicMock(spec=Context)
+        self.ctx_manager.get_entity_id.side_effect = (
+            lambda entity: entity['name']
+        )
+
+        self.perf_manager = MagicMock(spec=PerfData)
+
+        self.manager = Serie(workers=0)
+        self.manager[Serie.CONTEXT_MANAGER] = self.ctx_manager
+        self.manager[Serie.PERFDATA_MANAGER] = self.perf_manager
+        self.manager.calculate = self._calculate
+
+        self.engine = MagicMock()
+        self.engine.name = 'serie'
+
+        self.logger = MagicMock()
+
+        self.events = [
+            {'crecord_name': name, 'component': 'c', 'resource': 'r'}
+            for name in ['s0', 'fail', 's2']
+        ]
+
+    def tearDown(self):
+        process._pool = None
+
+    def _calculate(self, event):
+        if event['crecord_name'] == 'fail':
+            raise ValueError('wrong formula')
+
+        return [(0, 1)]
+
+    def _put_metrics(self):
+        kwargs = self.perf_manager.put_many.call_args[1]
+
+        return [metric[0] for metric in kwargs['metrics']]
+
+    def test_no_workers(self):
+        result = process.batch_processing(
+            self.engine, self.events, manager=self.manager, logger=self.logger
+        )
+
+        self.assertEqual(result, [None] * 3)
+        self.assertEqual(self._put_metrics(), ['s0', 's2'])
+        self.assertEqual(self.logger.error.call_count, 1)
+
+    def test_workers(self):
+        self.manager.workers = 2
+
+        pool = MagicMock()
+        pool.map_async.return_value.get.return_value = [
+            (('s0', [(0, 1)], {}), None), (None, 'fail: wrong formula')
+        ]
+        process._pool = pool
+
+        process.batch_processing(
+            self.engine, self.events[:2],
+            manager=self.manager, logger=self.logger
+        )
+
+        pool.map_async.return_value.get.assert_called_once_with(
+            self.manager.workers_timeout
+        )
+        self.assertEqual(self._put_metrics(), ['s0'])
+        self.assertEqual(self.logger.error.call_count, 1)
+
+    @patch.object(process, 'Pool')
+    def test_workers_failure(self, Pool):
+        self.manager.workers = 2
+
+        pool = MagicMock()
+        pool.map_async.return_value.get.side_effect = TimeoutError()
+        process._pool = pool
+
+        process.batch_processing(
+            self.engine, self.events, manager=self.manager, logger=self.logger
+        )
+
+        # the pool is stopped, and the batch computed in the engine process
+        pool.terminate.assert_called_once_with()
+        self.assertIsNone(process._pool)
+        self.assertEqual(self._put_metrics(), ['s0', 's2'])
+        self.assertEqual(self.logger.error.call_count, 2)
+
+        # no process is forked by batch threads
+        process.batch_processing(
+            self.engine, self.events, manager=self.manager, logger=self.logger
+        )
+
+        self.assertFalse(Pool.called)
+        self.assertEqual(self._put_metrics(), ['s0', 's2'])
+
+    @patch.object(process, 'Pool')
+    def test_init_processing(self, Pool):
+        process.init_processing(self.engine, manager=self.manager)
+        self.assertIsNone(process._pool)
+
+        self.manager.workers = 2
+        process.init_processing(self.engine, manager=self.manager)
+        self.assertIs(process._pool, Pool.return_value)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# --------------------------------
+# Copyright (c) 2015 "Capensis" [http://www.capensis.com]
+#
+# This file is part of Canopsis.
+#
+# Canopsis is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Canopsis is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
+# ---------------------------------
+
+from unittest import TestCase, main
+
+from canopsis.serie.manager import Serie
+from canopsis.serie.scheduler import SerieScheduler
+
+
+class FakeStorage(object):
+    def __init__(self, series):
+        self.series = series
+
+    def get_elements(self, ids):
+        return [self.series[_id].copy() for _id in ids if _id in self.series]
+
+
+class FakeSerieManager(object):
+    def __init__(self, series):
+        self.series = series
+        self.queries = 0
+
+    def __getitem__(self, name):
+        return FakeStorage(self.series)
+
+    def get_series(self, timestamp, ids=None):
+        self.queries += 1
+
+        return [
+            serie.copy() for serie in self.series.values()
+            if serie['next_computation'] <= timestamp
+            and (ids is None or serie['_id'] in ids)
+        ]
+
+
+class TestSerieScheduler(TestCase):
+    def setUp(self):
+        self.series = {}
+
+        for _id, delay in (('a', 10), ('b', 30), ('c', 300)):
+            self.series[_id] = {
+                '_id': _id,
+                'aggregation_interval': delay,
+                'computations_per_interval': 1,
+                'last_computation': 0,
+                'next_computation': delay
+            }
+
+        self.manager = FakeSerieManager(self.series)
+        self.scheduler = SerieScheduler(self.manager, horizon=60)
+
+    def _compute(self, serie, timestamp):
+        serie = self.series[serie['_id']]
+        serie['last_computation'] = timestamp
+        serie['next_computation'] = Serie.get_next_computation(serie)
+
+    def test_get_due_series(self):
+        self.assertEqual(self.scheduler.get_due_series(5), [])
+        # one load and no due serie
+        self.assertEqual(self.manager.queries, 1)
+
+        due = self.scheduler.get_due_series(10)
+        self.assertEqual([serie['_id'] for serie in due], ['a'])
+
+        for serie in due:
+            self._compute(serie, 10)
+
+        due = self.scheduler.get_due_series(30)
+        self.assertEqual(
+            sorted(serie['_id'] for serie in due), ['a', 'b']
+        )
+
+        for serie in due:
+            self._compute(serie, 30)
+
+        # nothing is due, the storage is not requested
+        queries = self.manager.queries
+        self.assertEqual(self.scheduler.get_due_series(35), [])
+        self.assertEqual(self.manager.queries, queries)
+
+    def test_computed_elsewhere(self):
+        self._compute(self.series['a'], 10)
+        self.scheduler.load(0)
+
+        # the heap entry of 'a' is outdated
+        self.assertEqual(self.scheduler.get_due_series(15), [])
+
+        due = self.scheduler.get_due_series(20)
+        self.assertEqual([serie['_id'] for serie in due], ['a'])
+
+
+if __name__ == '__main__':
+    main()
@@ -32,6 +32,37 @@ from canopsis.event.manager import Event
 
 pp = PrettyPrinter(indent=2)
 
+#: duration of persisted sla buckets in seconds
+SLA_BUCKET = 3600 * 24
+
+#: buckets are persisted once they ended since this delay in seconds, so
+#: that events log entries inserted late by the eventstore are counted
+SLA_LOG_MARGIN = 3600
+
+#: collection of persisted sla durations
+SLA_COLLECTION = 'sla'
+
+
+def add_duration(buckets, state, start, end, size=SLA_BUCKET):
+    """Add a state duration to buckets, split on bucket bounds.
+
+    :param dict buckets: lists of durations by state, by bucket start
+        timestamp as a string.
+    :param int state: state during the duration.
+    :param float start: duration start timestamp.
+    :param float end: duration end timestamp.
+    :param int size: bucket duration in seconds.
+    """
+
+    while start < end:
+        bucket = int(start // size * size)
+        bound = min(end, bucket + size)
+
+        durations = buckets.setdefault(str(bucket), [0.0] * 4)
+        durations[state] += bound - start
+
+        start = bound
+
 
 class Sla(object):
 
@@ -94,21 +125,12 @@ class Sla(object):
         ))
 
         self.logger.debug(u'Computing sla for selector {}'.format(rk))
-        # Retrieve sla information from selector record
-        sla_information = self.get_sla_information(
-            rk,
-            timewindow_date_start,
-            now
-        )
-
-        self.logger.debug('Sla length information is {}'.format(
-            len(sla_information)
-        ))
 
         # Compute effective sla dict to be able to fill the ouput template
-        sla_measures, sla_times = self.compute_sla(
-            sla_information,
-            now
+        sla_times = self.get_sla_times(rk, timewindow_date_start, now)
+        sla_measures = dict(
+            (state, sla_times[state] / float(timewindow))
+            for state in sla_times
         )
         self.logger.debug('Sla measures is {}'.format(sla_measures))
         self.logger.debug('Sla times is {}'.format(sla_times))
@@ -253,7 +275,7 @@ class Sla(object):
         sla_information += list(events_log.find(
             {
                 'rk': selector_rk,
-                'timestamp': {'$gt': timewindow_date_start}
+                'timestamp': {'$gt': timewindow_date_start, '$lte': now}
             },
             projection,
             sort=[('timestamp', 1)]
@@ -263,6 +285,138 @@ class Sla(object):
 
         return sla_information
 
+    def get_state_at(self, events_log, selector_rk, timestamp):
+        """Get the state of a selector at a given time from events log."""
+
+        event_log = events_log.find_one(
+            {'rk': selector_rk, 'timestamp': {'$lte': timestamp}},
+            {'state': 1, '_id': 0},
+            sort=[('timestamp', -1)]
+        )
+
+        return 0 if event_log is None else event_log['state']
+
+    def add_durations(
+        self, events_log, selector_rk, state, start, end, buckets
+    ):
+        """Add selector state durations between two dates to buckets.
+
+        :param int state: selector state at start.
+        :return: selector state at end.
+        """
+
+        cursor = events_log.find(
+            {
+                'rk': selector_rk,
+                'timestamp': {'$gt': start, '$lte': end}
+            },
+            {'state': 1, 'timestamp': 1, '_id': 0},
+            sort=[('timestamp', 1)]
+        )
+
+        for event_log in cursor:
+            add_duration(buckets, state, start, event_log['timestamp'])
+            state, start = event_log['state'], event_log['timestamp']
+
+        add_duration(buckets, state, start, end)
+
+        return state
+
+    def get_sla_times(self, selector_rk, timewindow_date_start, now):
+        """Get durations of selector states in the timewindow.
+
+        Durations are persisted by buckets of SLA_BUCKET seconds with the
+        last processed date, so only new events log entries are read and
+        buckets which slid out of the timewindow are dropped. Only buckets
+        which ended SLA_LOG_MARGIN seconds ago are persisted, so durations
+        of the last buckets are read again from events log on every call,
+        with entries inserted late. Durations before the first complete
+        bucket of the timewindow are read from events log too.
+
+        :return: durations by state.
+        :rtype: dict
+        """
+
+        bound = (timewindow_date_start // SLA_BUCKET + 1) * SLA_BUCKET
+        # start of the first bucket which may still get events log entries
+        horizon = (now - SLA_LOG_MARGIN) // SLA_BUCKET * SLA_BUCKET
+
+        if bound >= horizon:
+            # timewindow too short for buckets
+            return self.compute_sla(
+                self.get_sla_information(
+                    selector_rk, timewindow_date_start, now
+                ),
+                now
+            )[1]
+
+        events_log = self.storage.get_backend('events_log')
+        collection = self.storage.get_backend(SLA_COLLECTION)
+
+        document = collection.find_one({'_id': selector_rk})
+
+        if document is None or not (
+                document['start'] <= bound
+                <= document['timestamp'] <= horizon
+        ):
+            # persisted durations do not cover the timewindow
+            processed, buckets = bound, {}
+            state = self.get_state_at(events_log, selector_rk, bound)
+
+        else:
+            processed = document['timestamp']
+            state = document['state']
+            buckets = dict(
+                (key, value) for key, value in document['buckets'].items()
+                if int(key) >= bound
+            )
+
+        if processed < horizon:
+            state = self.add_durations(
+                events_log, selector_rk, state, processed, horizon, buckets
+            )
+            processed = horizon
+
+        collection.update(
+            {'_id': selector_rk},
+            {
+                '_id': selector_rk,
+                'start': bound,
+                'timestamp': processed,
+                'state': state,
+                'buckets': buckets
+            },
+            upsert=True
+        )
+
+        # durations of the timewindow start, and of the last log entries
+        others = {}
+
+        self.add_durations(
+            events_log,
+            selector_rk,
+            self.get_state_at(events_log, selector_rk, timewindow_date_start),
+            timewindow_date_start,
+            bound,
+            others
+        )
+        self.add_durations(
+            events_log, selector_rk, state, processed, now, others
+        )
+
+        sla_times = {
+            0: 0.0,
+            1: 0.0,
+            2: 0.0,
+            3: 0.0,
+        }
+
+        for durations in buckets.values() + others.values():
+            for s in sla_times:
+                sla_times[s] += durations[s]
+
+        return sla_times
+
     def compute_sla(self, sla_information, now):
 
         """Allow computing percents time portion where the
@@ -291,7 +445,7 @@ class Sla(object):
                 previous_state = step['state']
                 duration = 0.0
 
-        sla_times[previous_state] += now - previous_timestamp
+        sla_times[previous_state] += duration + now - previous_timestamp
 
         sla_measures = {
             0: 0.0,
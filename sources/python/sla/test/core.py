@@ -22,7 +22,10 @@
 
 from time import time
 from unittest import main, TestCase
-from canopsis.sla.core import Sla
+from copy import deepcopy
+from canopsis.sla.core import (
+    Sla, add_duration, SLA_BUCKET, SLA_LOG_MARGIN, SLA_COLLECTION
+)
 
 
 class MongoQuery(object):
@@ -160,5 +163,146 @@ class KnownValues(TestCase):
         self.assertEqual(event['connector_name'], 'engine')
 
 
+class AddDurationTest(TestCase):
+
+    def test_add_duration(self):
+        buckets = {}
+
+        add_duration(buckets, 2, 50, 250, size=100)
+        add_duration(buckets, 1, 250, 260, size=100)
+
+        self.assertEqual(
+            buckets,
+            {
+                '0': [0.0, 0.0, 50.0, 0.0],
+                '100': [0.0, 0.0, 100.0, 0.0],
+                '200': [0.0, 10.0, 50.0, 0.0]
+            }
+        )
+
+    def test_empty_duration(self):
+        buckets = {}
+
+        add_duration(buckets, 2, 50, 50)
+
+        self.assertEqual(buckets, {})
+
+
+class MemoryCollection(object):
+    """Collection with the queries used by get_sla_times."""
+
+    def __init__(self):
+        self.documents = []
+
+    def match(self, document, query):
+        for key, value in query.items():
+            if isinstance(value, dict):
+                for operator, operand in value.items():
+                    if operator == '$lt' and not document[key] < operand:
+                        return False
+
+                    if operator == '$lte' and not document[key] <= operand:
+                        return False
+
+                    if operator == '$gt' and not document[key] > operand:
+                        return False
+
+            elif document.get(key) != value:
+                return False
+
+        return True
+
+    def find(self, query, projection=None, sort=None):
+        result = [
+            deepcopy(document) for document in self.documents
+            if self.match(document, query)
+        ]
+
+        if sort:
+            key, order = sort[0]
+            result.sort(key=lambda document: document[key], reverse=order < 0)
+
+        return result
+
+    def find_one(self, query, projection=None, sort=None):
+        result = self.find(query, projection, sort)
+
+        return result[0] if result else None
+
+    def update(self, query, document, upsert=False):
+        self.documents = [
+            old for old in self.documents if old['_id'] != query['_id']
+        ] + [deepcopy(document)]
+
+
+class MemoryStorage(object):
+    def __init__(self):
+        self.collections = {
+            'events_log': MemoryCollection(),
+            SLA_COLLECTION: MemoryCollection()
+        }
+
+    def get_backend(self, collection):
+        return self.collections[collection]
+
+
+class GetSlaTimesTest(TestCase):
+
+    def setUp(self):
+        self.storage = MemoryStorage()
+        self.events_log = self.storage.collections['events_log']
+
+        self.sla = Sla(
+            self.storage,
+            'selector',
+            'template sla',
+            {'seconds': 60, 'durationType': 'second', 'value': 60},
+            80,
+            60,
+            'minor',
+            'mysla'
+        )
+
+        self.timewindow = 3 * SLA_BUCKET
+        self.now = 10 * SLA_BUCKET + SLA_LOG_MARGIN + 1000
+
+    def log(self, timestamp, state):
+        self.events_log.documents.append(
+            {'rk': 'selector', 'timestamp': timestamp, 'state': state}
+        )
+
+    def get_sla_times(self, now):
+        return self.sla.get_sla_times('selector', now - self.timewindow, now)
+
+    def expected(self, now):
+        return self.sla.compute_sla(
+            self.sla.get_sla_information(
+                'selector', now - self.timewindow, now
+            ),
+            now
+        )[1]
+
+    def test_get_sla_times(self):
+        for i in range(30):
+            self.log(self.now - 4 * SLA_BUCKET + i * 15000, i % 4)
+
+        for now in range(self.now, self.now + 2 * SLA_BUCKET, 7000):
+            self.assertEqual(self.get_sla_times(now), self.expected(now))
+
+        document = self.storage.collections[SLA_COLLECTION].documents[0]
+
+        self.assertEqual(document['timestamp'] % SLA_BUCKET, 0)
+
+    def test_late_log(self):
+        self.log(self.now - 2 * SLA_BUCKET, 1)
+
+        self.get_sla_times(self.now)
+
+        # entry inserted late, in the bucket not persisted yet
+        self.log(self.now - 1500, 2)
+
+        self.assertEqual(self.get_sla_times(self.now), self.expected(self.now))
+
+
 if __name__ == "__main__":
     main(verbosity=2)
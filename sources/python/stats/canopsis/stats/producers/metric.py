@@ -24,18 +24,22 @@ from canopsis.configuration.configurable.decorator import conf_paths
 from canopsis.configuration.model import Parameter
 
 from canopsis.timeserie.core import TimeSerie
-from canopsis.old.mfilter import check
+from canopsis.old.mfilter import compile_mfilter
 
 from hashlib import sha1
+from time import time
 
 
 CONF_PATH = 'stats/producers/metric.conf'
 CATEGORY = 'METRIC_PRODUCER'
 CONTENT = [
     Parameter('default_aggregation_interval', int),
-    Parameter('round_time_interval', Parameter.bool)
+    Parameter('round_time_interval', Parameter.bool),
+    Parameter('cache_ttl', float)
 ]
 
+DEFAULT_CACHE_TTL = 60  #: default duration in seconds of cached filters
+
 
 @conf_paths(CONF_PATH)
 @add_category(CATEGORY, content=CONTENT)
@@ -79,10 +83,25 @@ class MetricProducer(MiddlewareRegistry):
 
         self._round_time_interval = value
 
+    @property
+    def cache_ttl(self):
+        if not hasattr(self, '_cache_ttl'):
+            self.cache_ttl = None
+
+        return self._cache_ttl
+
+    @cache_ttl.setter
+    def cache_ttl(self, value):
+        if value is None:
+            value = DEFAULT_CACHE_TTL
+
+        self._cache_ttl = value
+
     def __init__(
         self,
         default_aggregation_interval=None,
         round_time_interval=None,
+        cache_ttl=None,
         filter_storage=None,
         serie_storage=None,
         context=None,
@@ -97,6 +116,11 @@ class MetricProducer(MiddlewareRegistry):
         if round_time_interval is not None:
             self.round_time_interval = round_time_interval
 
+        if cache_ttl is not None:
+            self.cache_ttl = cache_ttl
+
+        self.invalidate_cache()
+
         if filter_storage is not None:
             self[MetricProducer.FILTER_STORAGE] = filter_storage
 
@@ -109,6 +133,57 @@ class MetricProducer(MiddlewareRegistry):
         if perfdata is not None:
             self[MetricProducer.PERFDATA_MANAGER] = perfdata
 
+    def __setitem__(self, name, value):
+        super(MetricProducer, self).__setitem__(name, value)
+
+        # cached filters and series come from the replaced storage
+        if name in (
+            MetricProducer.FILTER_STORAGE,
+            MetricProducer.SERIE_STORAGE
+        ):
+            self.invalidate_cache()
+
+    def invalidate_cache(self):
+        """
+        Forget cached filters and series, in order to read them again from
+        storages. Called when a storage is replaced, and every cache_ttl
+        seconds in order to see filters and series changed by other
+        processes.
+        """
+
+        self._filters = None
+        self._series = {}
+        self._cache_expiration = time() + self.cache_ttl
+
+    def _refresh_cache(self):
+        """
+        Invalidate cache if cache_ttl is elapsed.
+        """
+
+        if time() >= self._cache_expiration:
+            self.invalidate_cache()
+
+    def get_filters(self):
+        """
+        Get compiled filters, cached during cache_ttl seconds.
+
+        :returns: list of (filter name, compiled filter)
+        """
+
+        self._refresh_cache()
+
+        if self._filters is None:
+            storage = self[MetricProducer.FILTER_STORAGE]
+            self._filters = [
+                (
+                    evfilter['crecord_name'],
+                    compile_mfilter(evfilter.get('filter', None) or {})
+                )
+                for evfilter in storage.find_elements()
+            ]
+
+        return self._filters
+
     def match(self, event):
         """
         Get filters names which match the event.
@@ -119,11 +194,10 @@ class MetricProducer(MiddlewareRegistry):
         :returns: filters names as list
         """
 
-        storage = self[MetricProducer.FILTER_STORAGE]
         matches = [
-            evfilter['crecord_name']
-            for evfilter in storage.find_elements()
-            if check(evfilter.get('filter', None) or {}, event)
+            name
+            for name, evfilter in self.get_filters()
+            if evfilter(event)
         ]
 
         return matches
@@ -158,6 +232,13 @@ class MetricProducer(MiddlewareRegistry):
         metric_id = self[MetricProducer.CONTEXT_MANAGER].get_entity_id(metric)
         serie_id = self.get_stats_serie_id(metric_id, operator)
 
+        self._refresh_cache()
+
+        result = self._series.get(serie_id)
+
+        if result is not None:
+            return result
+
         result = storage.get_elements(ids=serie_id)
 
         if result is None:
@@ -188,6 +269,8 @@ class MetricProducer(MiddlewareRegistry):
             serie[storage.DATA_ID] = serie_id
             result = serie
 
+        self._series[serie_id] = result
+
         return result
 
     def _counter(self, name, event, author='__canopsis__'):
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# --------------------------------
+# Copyright (c) 2015 "Capensis" [http://www.capensis.com]
+#
+# This file is part of Canopsis.
+#
+# Canopsis is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Canopsis is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
+# ---------------------------------
+
+from unittest import TestCase, main
+from mock import MagicMock
+
+from canopsis.storage.core import Storage
+from canopsis.context.manager import Context
+from canopsis.perfdata.manager import PerfData
+from canopsis.stats.producers.metric import MetricProducer
+
+
+class MetricProducerCacheTest(TestCase):
+
+    def setUp(self):
+        self.filter_storage = MagicMock(spec=Storage)
+        self.filter_storage.find_elements.return_value = [
+            {'crecord_name': 'critical', 'filter': {'state': 2}},
+            {'crecord_name': 'all'}
+        ]
+
+        self.serie_storage = MagicMock(spec=Storage)
+        self.serie_storage.DATA_ID = Storage.DATA_ID
+        self.serie_storage.get_elements.return_value = None
+
+        self.context = MagicMock(spec=Context)
+        self.context.get_entity_id.return_value = '/metric/c/r/m'
+
+        self.perfdata = MagicMock(spec=PerfData)
+        self.perfdata.get_meta.return_value = None
+
+        self.producer = MetricProducer(
+            cache_ttl=3600,
+            filter_storage=self.filter_storage,
+            serie_storage=self.serie_storage,
+            context=self.context,
+            perfdata=self.perfdata
+        )
+
+        self.metric = {'component': 'c', 'resource': 'r', 'name': 'm'}
+
+    def test_match(self):
+        self.assertEqual(self.producer.match({'state': 2}), ['critical', 'all'])
+        self.assertEqual(self.producer.match({'state': 0}), ['all'])
+
+        self.assertEqual(self.filter_storage.find_elements.call_count, 1)
+
+    def test_filters_ttl(self):
+        self.producer.match({'state': 0})
+
+        self.producer.cache_ttl = 0
+        self.producer.invalidate_cache()
+
+        self.producer.match({'state': 0})
+        self.producer.match({'state': 0})
+
+        self.assertEqual(self.filter_storage.find_elements.call_count, 3)
+
+    def test_serie(self):
+        serie = self.producer.may_create_stats_serie(self.metric, 'min')
+
+        self.assertEqual(serie['aggregation_method'], 'min')
+        self.assertEqual(
+            serie[Storage.DATA_ID],
+            self.producer.get_stats_serie_id('/metric/c/r/m', 'min')
+        )
+
+        cached = self.producer.may_create_stats_serie(self.metric, 'min')
+
+        self.assertIs(cached, serie)
+        self.assertEqual(self.serie_storage.get_elements.call_count, 1)
+        self.assertEqual(self.serie_storage.put_element.call_count, 1)
+
+    def test_storage_change(self):
+        self.producer.match({'state': 0})
+        self.producer.may_create_stats_serie(self.metric, 'min')
+
+        filter_storage = MagicMock(spec=Storage)
+        filter_storage.find_elements.return_value = []
+        self.producer[MetricProducer.FILTER_STORAGE] = filter_storage
+
+        self.assertEqual(self.producer.match({'state': 0}), [])
+
+        self.producer.may_create_stats_serie(self.metric, 'min')
+
+        self.assertEqual(self.serie_storage.get_elements.call_count, 2)
+
+
+if __name__ == '__main__':
+    main()
@@ -238,6 +238,19 @@ class CompositeStorage(Storage):
 
         raise NotImplementedError()
 
+    def put_many(self, elements, cache=False):
+        """
+        Put several data related to their path and name.
+
+        Default implementation calls put for every element.
+
+        :param list elements: (path, name, data) tuples.
+        :param bool cache: use query cache if True (False by default).
+        """
+
+        for path, name, data in elements:
+            self.put(path=path, name=name, data=data, cache=cache)
+
     def remove(self, path, names=None, shared=False, cache=False):
         """
         Remove data from ids or type
@@ -771,6 +771,17 @@ class Storage(DataBase):
 
         return self.count_elements()
 
+    def aggregate(self, pipeline):
+        """Aggregate elements with a pipeline of stages.
+
+        :param list pipeline: aggregation stages, like MongoDB ones.
+
+        :return: aggregation result documents.
+        :rtype: list
+        """
+
+        raise NotImplementedError()
+
     def _find(self, *args, **kwargs):
         """Find operation dedicated to technology implementation.
         """
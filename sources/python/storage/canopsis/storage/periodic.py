@@ -59,6 +59,38 @@ class PeriodicStorage(Storage):
 
         raise NotImplementedError()
 
+    def iget(self, data_id, period, timewindow=None, limit=0):
+        """
+        Iterate on points sorted by timestamp.
+
+        Default implementation iterates on get result.
+        """
+
+        for point in self.get(
+            data_id=data_id, period=period, timewindow=timewindow, limit=limit
+        ):
+            yield point
+
+    def get_many(self, data_ids, period, timewindow=None):
+        """
+        Get points of several data ids.
+
+        Default implementation calls get for every data id.
+
+        :param list data_ids: data ids.
+        :return: sorted points by data id.
+        :rtype: dict
+        """
+
+        result = {}
+
+        for data_id in data_ids:
+            result[data_id] = self.get(
+                data_id=data_id, period=period, timewindow=timewindow
+            )
+
+        return result
+
     def put(self, data_id, period, points, cache=False):
         """
         Put periodic points in periodic collection with specific period values.
@@ -70,6 +102,21 @@ class PeriodicStorage(Storage):
 
         raise NotImplementedError()
 
+    def put_many(self, entries, cache=False):
+        """
+        Put periodic points of several data ids.
+
+        Default implementation calls put for every entry.
+
+        :param list entries: (data_id, period, points) tuples.
+        :param bool cache: use query cache if True (False by default).
+        """
+
+        for data_id, period, points in entries:
+            self.put(
+                data_id=data_id, period=period, points=points, cache=cache
+            )
+
     def remove(self, data_id, period=None, timewindow=None, cache=False):
         """
         Remove periodic data related to data_id, timewindow and period.
@@ -18,6 +18,7 @@
 # along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
 # ---------------------------------
 
+from canopsis.common.init import basestring
 from canopsis.storage.core import Storage
 
 
@@ -73,6 +74,28 @@ class TimedStorage(Storage):
 
         raise NotImplementedError()
 
+    def iget(
+            self, data_ids, timewindow=None, _filter=None, limit=0, skip=0
+    ):
+        """Iterate on (data_id, value) sorted by data_id if data_ids is given,
+        and by descending timestamp, where value is a dict of timestamp and
+        value.
+
+        Default implementation iterates on get result.
+        """
+
+        result = self.get(
+            data_ids=data_ids, timewindow=timewindow, _filter=_filter,
+            limit=limit, skip=skip
+        )
+
+        if isinstance(data_ids, basestring):
+            result = {data_ids: result or []}
+
+        for data_id in sorted(result):
+            for value in result[data_id]:
+                yield data_id, value
+
     def find(self, timewindow=None, _filter=None):
         """
         Find data values ordered by timestamp in descresent order and data ids.
@@ -118,6 +141,19 @@ class TimedStorage(Storage):
 
         raise NotImplementedError()
 
+    def update(self, data_id, value, timestamp, cache=False):
+        """Update the value of an existing timed data.
+
+        Contrary to put, value is not compared with the previous value.
+
+        :param str data_id: related data_id.
+        :param value: new value.
+        :param float timestamp: timestamp of the value to update.
+        :param bool cache: use query cache if True (False by default).
+        """
+
+        raise NotImplementedError()
+
     def remove(self, data_ids, timewindow=None, cache=False):
         """Remove timed_data existing on input timewindow.
 
@@ -32,8 +32,20 @@ from canopsis.configuration.model import Parameter
 
 from math import isnan
 
+try:
+    import numpy as np
+except ImportError:  # numpy is optional and only speeds up calculate
+    np = None
+
 CONF_PATH = 'timeserie/timeserie.conf'
 
+#: aggregation functions calculated with numpy if not replaced
+_DEFAULT_AGGREGATIONS = get_aggregations()
+
+#: types of timestamps and values calculated with numpy
+_TIMESTAMP_TYPES = frozenset([float, int])
+_VALUE_TYPES = frozenset([float, int, long])
+
 
 @conf_paths(CONF_PATH)
 class TimeSerie(Configurable):
@@ -168,10 +180,6 @@ class TimeSerie(Configurable):
             then the result is [(T0, func(V0, V1)), (T2, func(V2, V3), ...].
         """
 
-        result = []
-
-        nan = float('nan')
-
         # start to exclude points not in timewindow
         # in taking care about round time
         if self.round_time:
@@ -184,6 +192,24 @@ class TimeSerie(Configurable):
                 stop=timewindow.stop()
             )
 
+        result = None
+
+        if np is not None:
+            result = self._calculate_array(points, timewindow, meta, usenan)
+
+        if result is None:
+            result = self._calculate_list(points, timewindow, meta, usenan)
+
+        return result
+
+    def _calculate_list(self, points, timewindow, meta=None, usenan=True):
+        """Pure python implementation of calculate on a reduced timewindow.
+        """
+
+        result = []
+
+        nan = float('nan')
+
         # start to exclude points which are not in timewindow
         points = [
             point for point in points
@@ -270,6 +296,165 @@ class TimeSerie(Configurable):
 
         return result
 
+    def _calculate_array(self, points, timewindow, meta=None, usenan=True):
+        """Numpy implementation of calculate on a reduced timewindow.
+
+        Points are bucketed with a binary search on timesteps and aggregated
+        per bucket with ufunc reductions.
+
+        :return: same result as _calculate_list, or None if points can not be
+            calculated with numpy (unsorted points, nan or non-float values
+            with an aggregation sensitive to integer division, aggregation
+            function replaced, etc.).
+        """
+
+        aggregation = self.aggregation
+
+        if (
+                aggregation not in _ARRAY_REDUCERS
+                or get_aggregations().get(aggregation)
+                is not _DEFAULT_AGGREGATIONS.get(aggregation)
+        ):
+            return None
+
+        if not isinstance(points, (list, tuple)):
+            points = list(points)
+
+        if not points:
+            return None
+
+        try:
+            timestamps = [point[0] for point in points]
+            values = [point[1] for point in points]
+
+        except (TypeError, IndexError, KeyError):
+            return None
+
+        # Interval accepts only float and int timestamps
+        if not set(map(type, timestamps)) <= _TIMESTAMP_TYPES:
+            return None
+
+        value_types = set(map(type, values))
+
+        if not value_types <= _VALUE_TYPES:
+            return None
+
+        timestamps = np.array(timestamps, dtype=float)
+        values = np.array(values, dtype=float)
+
+        # exclude points which are not in timewindow
+        mask = np.zeros(len(points), dtype=bool)
+
+        for lower, upper in timewindow.interval:
+            mask |= (timestamps >= lower) & (timestamps <= upper)
+
+        if not usenan:
+            mask &= ~np.isnan(values)
+
+        if not meta:
+            meta = {}
+
+        transform_method = meta.get('value', {}).get('type', None)
+
+        if transform_method in METHODS and transform_method != 'GAUGE':
+            points = [points[index] for index in np.flatnonzero(mask)]
+            points = apply_transform(points, method=transform_method)
+
+            if points:
+                timestamps = np.array(
+                    [point[0] for point in points], dtype=float
+                )
+                values = [point[1] for point in points]
+                value_types = set(map(type, values))
+                values = np.array(values, dtype=float)
+
+            else:
+                timestamps = values = np.empty(0)
+
+            mask = None
+
+        elif not mask.all():
+            timestamps = timestamps[mask]
+            values = values[mask]
+
+        else:
+            mask = None
+
+        points_len = len(values)
+
+        # if no period and max_points > len(points)
+        if not points_len or (
+                self.period is None and self.max_points > points_len
+        ):
+            if mask is None:
+                return list(points)
+
+            return [points[index] for index in np.flatnonzero(mask)]
+
+        if (
+                np.isnan(values).any()
+                or (np.diff(timestamps) < 0).any()
+                # python 2 integer division
+                or (
+                    aggregation in ('MEAN', 'AVERAGE', 'DELTA')
+                    and value_types != set([float])
+                )
+        ):
+            return None
+
+        timesteps = self.timesteps(timewindow)[:-1]
+
+        if not timesteps:
+            return []
+
+        # the first bucket contains points before the second timestep, the
+        # last one contains points after the last timestep
+        ends = np.searchsorted(
+            timestamps, np.array(timesteps[1:], dtype=float), side='left'
+        )
+        starts = np.concatenate(([0], ends))
+        counts = np.concatenate((ends, [points_len])) - starts
+
+        filled = counts > 0
+        indices = starts[filled]
+
+        aggregated = _ARRAY_REDUCERS[aggregation](
+            values, indices, counts[filled]
+        )
+
+        result = []
+        nan = float('nan')
+        last_point = None
+        aggregated_index = 0
+
+        for index, timestamp in enumerate(timesteps):
+            if filled[index]:
+                value = aggregated[aggregated_index]
+                aggregated_index += 1
+
+                if aggregation == 'DELTA':
+                    maximum, minimum = value
+
+                    if last_point:
+                        maximum = max(last_point, maximum)
+                        minimum = min(last_point, minimum)
+
+                    value = (maximum - minimum) / 2
+
+            elif aggregation == 'DELTA' and last_point:
+                value = 0.
+
+            else:
+                if usenan:
+                    result.append((timestamp, nan))
+
+                continue
+
+            last_point = round(float(value), 2)
+            result.append((timestamp, last_point))
+
+        return result
+
     def _conf(self, *args, **kwargs):
 
         result = super(TimeSerie, self)._conf(*args, **kwargs)
@@ -366,6 +551,58 @@ def counter(pts):
     return result
 
 
+def _array_sums(values, indices, counts):
+    """Get sums of buckets.
+
+    Python sums are used on buckets in order to get the same rounding
+    errors than sequential additions of aggregation functions.
+    """
+
+    values = values.tolist()
+
+    return [
+        sum(values[index:index + count])
+        for index, count in zip(indices.tolist(), counts.tolist())
+    ]
+
+
+def _array_means(values, indices, counts):
+    """Get means of buckets."""
+
+    return [
+        total / count
+        for total, count in zip(
+            _array_sums(values, indices, counts), counts.tolist()
+        )
+    ]
+
+
+def _array_delta(values, indices, counts):
+    """Get (maximum, minimum) of buckets, the delta is calculated with the
+    previous aggregated value."""
+
+    return zip(
+        np.maximum.reduceat(values, indices).tolist(),
+        np.minimum.reduceat(values, indices).tolist()
+    )
+
+
+#: numpy aggregations of buckets of values, by aggregation name
+_ARRAY_REDUCERS = {
+    'MEAN': _array_means,
+    'SUM': _array_sums,
+    'MIN': lambda values, indices, counts: (
+        np.minimum.reduceat(values, indices)
+    ),
+    'MAX': lambda values, indices, counts: (
+        np.maximum.reduceat(values, indices)
+    ),
+    'FIRST': lambda values, indices, counts: values[indices],
+    'LAST': lambda values, indices, counts: values[indices + counts - 1],
+    'DELTA': _array_delta
+}
+_ARRAY_REDUCERS['AVERAGE'] = _ARRAY_REDUCERS['MEAN']
+
 METHODS = {
     'GAUGE': gauge,
     'ABSOLUTE': absolute,
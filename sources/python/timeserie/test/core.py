@@ -21,6 +21,7 @@
 
 from unittest import main, TestCase
 
+from canopsis.timeserie import core
 from canopsis.timeserie.core import TimeSerie
 from canopsis.timeserie.timewindow import TimeWindow, Period
 
@@ -129,6 +130,45 @@ class TimeSerieTest(TestCase):
 
         self.assertEqual(len(_points), len(points) + 1)
 
+    def test_array_calculate(self):
+        """Check numpy and python implementations give the same result."""
+
+        if core.np is None:
+            self.skipTest('numpy is not installed')
+
+        timewindow = TimeWindow(start=0, stop=3 * 24 * 3600)
+        float_points = [
+            (ts, random() * 100) for ts in range(0, 3 * 24 * 3600, 700)
+        ]
+        # MEAN and DELTA of int values are calculated without numpy
+        mixed_points = list(float_points)
+        mixed_points[1] = (mixed_points[1][0], 3)
+
+        for points in (float_points, mixed_points):
+            for aggregation in (
+                'MEAN', 'SUM', 'MIN', 'MAX', 'FIRST', 'LAST', 'DELTA'
+            ):
+                for meta in (None, {'value': {'type': 'DERIVE'}}):
+                    timeserie = TimeSerie(
+                        aggregation=aggregation, period=Period(hour=6)
+                    )
+
+                    array_points = timeserie.calculate(
+                        points=points, timewindow=timewindow, meta=meta
+                    )
+
+                    np, core.np = core.np, None
+
+                    try:
+                        list_points = timeserie.calculate(
+                            points=points, timewindow=timewindow, meta=meta
+                        )
+
+                    finally:
+                        core.np = np
+
+                    self.assertEqual(array_points, list_points)
+
     def test_scenario(self):
         """
         Calculate aggregations over 5 years
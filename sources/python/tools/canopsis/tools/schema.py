@@ -18,11 +18,26 @@
 # along with Canopsis.  If not, see <http://www.gnu.org/licenses/>.
 # ---------------------------------
 
+"""
+Schema validation with validators built once per schema.
+
+Validators are kept in a registry shared by the ``canopsis.schema`` and
+``canopsis.tools.schema`` modules.
+"""
+
 import validictory
+from validictory import SchemaValidator, SchemaError
 
 from canopsis.old.storage import get_storage
 from canopsis.old.account import Account
 
+from time import time
+
+try:
+    from threading import Lock
+except ImportError:
+    from dummy_threading import Lock
+
 
 class NoSchemaError(Exception):
     def __init__(self, schema_id, *args, **kwargs):
@@ -37,7 +52,191 @@ class NoSchemaError(Exception):
         return u'Schema {0} not found in database'.format(self.schema_id)
 
 
-cache = {}
+class CompiledValidator(object):
+    """
+    validictory validator bound to one schema.
+
+    The schema is checked once at construction, and validations reuse the
+    same validictory validator instead of creating one per validation.
+    Only the public validictory API is used.
+    """
+
+    #: schema properties whose values are sub-schemas.
+    SUBSCHEMAS = ('items', 'additionalItems', 'additionalProperties')
+    #: schema properties whose values are sub-schemas by name.
+    NAMED_SUBSCHEMAS = ('properties', 'patternProperties')
+
+    def __init__(self, schema, *args, **kwargs):
+        """
+        :param dict schema: schema to validate against.
+
+        Other parameters are given to validictory SchemaValidator.
+
+        :raises validictory.SchemaError: if schema is not valid.
+        """
+
+        super(CompiledValidator, self).__init__()
+
+        self.schema = schema
+        self.validator = SchemaValidator(*args, **kwargs)
+
+        # detect schema errors as soon as possible
+        self._check_schema('_data', schema)
+
+    def validate(self, data, schema=None):
+        """
+        Validate data against self schema or input schema.
+
+        :raises validictory.ValidationError: if data is not valid.
+        """
+
+        if schema is None:
+            schema = self.schema
+
+        self.validator.validate(data, schema)
+
+    def _check_schema(self, fieldname, schema):
+        """
+        Raise a SchemaError if a schema node or one of its sub-schemas is not
+        valid.
+        """
+
+        if not isinstance(schema, dict):
+            raise SchemaError(
+                "Type for field '%s' must be 'dict', got: '%s'" %
+                (fieldname, type(schema).__name__))
+
+        if 'optional' in schema:
+            raise SchemaError('The "optional" attribute has been replaced'
+                              ' by "required"')
+
+        if 'requires' in schema:
+            raise SchemaError('The "requires" attribute has been replaced'
+                              ' by "dependencies"')
+
+        subschemas = []
+
+        for schemaprop in self.SUBSCHEMAS:
+            value = schema.get(schemaprop)
+
+            if isinstance(value, dict):
+                subschemas.append((fieldname, value))
+
+            elif isinstance(value, list):  # tuple typing
+                subschemas += [(fieldname, item) for item in value]
+
+        for schemaprop in self.NAMED_SUBSCHEMAS:
+            value = schema.get(schemaprop)
+
+            if isinstance(value, dict):
+                subschemas += value.items()
+
+        for subfieldname, subschema in subschemas:
+            self._check_schema(subfieldname, subschema)
+
+
+class ValidatorRegistry(object):
+    """
+    Schemas and their compiled validators by schema id.
+
+    Schemas are read from the ``schemas`` storage. They are invalidated when
+    they are put or removed through the rest web service, and read again
+    after ttl seconds in order to take into account other schema updates.
+    """
+
+    DEFAULT_TTL = 60  #: default duration in seconds before checking updates.
+
+    def __init__(self, ttl=DEFAULT_TTL, *args, **kwargs):
+        """
+        :param float ttl: duration in seconds before checking if a schema has
+            been updated. Never if not greater than 0.
+        """
+
+        super(ValidatorRegistry, self).__init__(*args, **kwargs)
+
+        self.ttl = ttl
+
+        self._entries = {}  # (schema, validator, check time) by schema id
+        self._backend = None
+        self._lock = Lock()
+
+    def _find_schema(self, schema_id):
+        """
+        Read a schema from the storage.
+
+        :returns: schema or None if it does not exist.
+        """
+
+        with self._lock:
+            if self._backend is None:
+                self._backend = get_storage(
+                    'schemas', account=Account(user='root', group='root')
+                ).get_backend()
+
+            doc = self._backend.find_one(schema_id)
+
+        return None if not doc else doc['schema']
+
+    def _get_entry(self, schema_id):
+
+        now = time()
+
+        entry = self._entries.get(schema_id)
+
+        if entry is None or (0 < self.ttl < now - entry[2]):
+            schema = self._find_schema(schema_id)
+
+            if entry is not None and entry[0] == schema:
+                # keep the compiled validator
+                entry = entry[0], entry[1], now
+
+            else:
+                validator = None if schema is None else CompiledValidator(
+                    schema, required_by_default=False
+                )
+                entry = schema, validator, now
+
+            self._entries[schema_id] = entry
+
+        if entry[0] is None:
+            raise NoSchemaError(schema_id)
+
+        return entry
+
+    def get_schema(self, schema_id):
+        """
+        Get schema from its ID.
+
+        :raises NoSchemaError: if the schema does not exist.
+        """
+
+        return self._get_entry(schema_id)[0]
+
+    def get_validator(self, schema_id):
+        """
+        Get the compiled validator of a schema.
+
+        :raises NoSchemaError: if the schema does not exist.
+        :rtype: CompiledValidator
+        """
+
+        return self._get_entry(schema_id)[1]
+
+    def invalidate(self, schema_id=None):
+        """
+        Forget a schema, or all schemas if schema_id is None, in order to read
+        it again from the storage.
+        """
+
+        if schema_id is None:
+            self._entries.clear()
+
+        else:
+            self._entries.pop(schema_id, None)
+
+
+#: validators shared by canopsis.schema and canopsis.tools.schema.
+registry = ValidatorRegistry()
 
 
 def get(schema_id):
@@ -51,17 +250,7 @@ def get(schema_id):
         :returns: schema field of Mongo document.
     """
 
-    if schema_id not in cache:
-        db = get_storage('schemas', account=Account(user='root', group='root')).get_backend()
-        doc = db.find_one(schema_id)
-        del db
-
-        if not doc:
-            raise NoSchemaError(schema_id)
-
-        cache[schema_id] = doc['schema']
-
-    return cache[schema_id]
+    return registry.get_schema(schema_id)
 
 
 def validate(dictionary, schema_id):
@@ -77,10 +266,10 @@ def validate(dictionary, schema_id):
         :returns: True if the validation succeed, False otherwise.
     """
 
-    schema = get(schema_id)
+    validator = registry.get_validator(schema_id)
 
     try:
-        validictory.validate(dictionary, schema, required_by_default=False)
+        validator.validate(dictionary)
         return True
 
     except validictory.ValidationError:
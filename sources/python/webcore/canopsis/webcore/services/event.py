@@ -90,7 +90,7 @@ def exports(ws):
         """ get eventslog log count for each days in a given period
             :param tstart: timestamp of the begin period
             :param tstop: timestamp of the end period
-            :param limit: limit the count number per day
+            :param limit: unused, kept for compatibility
             :param select: filter for eventslog collection
             :return: list in which each item contains an interval and the
             related count
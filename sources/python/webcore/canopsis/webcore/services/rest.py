@@ -24,11 +24,16 @@ from canopsis.common.ws import route
 from canopsis.common.utils import ensure_iterable
 from canopsis.context.manager import Context
 from canopsis.old.record import Record
+from canopsis.tools.schema import registry as schema_registry
 
 from base64 import b64decode
 import json
 
 
+#: namespace of schemas validated with canopsis.tools.schema.registry.
+SCHEMA_NAMESPACE = 'schemas'
+
+
 def get_records(ws, namespace, ctype=None, _id=None, **params):
     options = {
         'limit': 20,
@@ -203,6 +208,9 @@ def save_records(ws, namespace, ctype, _id, items):
         try:
             _id = ws.db.put(record, namespace=namespace)
 
+            if namespace == SCHEMA_NAMESPACE:
+                schema_registry.invalidate(str(_id))
+
             drecord = record.dump()
             drecord['_id'] = str(_id)
             drecord['id'] = drecord['_id']
@@ -246,6 +254,10 @@ def delete_records(ws, namespace, ctype, _id, data):
     try:
         ws.db.remove(ids, namespace=namespace)
 
+        if namespace == SCHEMA_NAMESPACE:
+            for schema_id in ensure_iterable(ids):
+                schema_registry.invalidate(schema_id)
+
     except Exception as err:
         return HTTPError(500, 'Impossible to remove documents: {0}'.format(
             err